@@ -1,193 +1,228 @@
-from flask import Flask, request, jsonify, render_template, send_file, redirect, url_for, session
-from flask_login import LoginManager, current_user, login_required, login_user, logout_user
+from flask import Flask, request, jsonify, render_template, redirect, url_for, session
+from flask_login import LoginManager, current_user, login_required
 from flask_cors import CORS
 from config import Config
-from models import db, init_app
-from models.user import User, PERMISSIONS, Role, ROLES
+from models import db
 from routes.auth import auth
 from routes.user_management import user_management
 from routes.projects import projects_bp
-from models.customer import Customer
-from services.sms_service import SMSService
-from services.email_service import EmailService
-from services.scheduler_service import SchedulerService
+from routes.analytics import analytics
+from routes.import_jobs import import_jobs
+from services.outbox_service import OutboxWorker
+from services.import_job_service import ImportJobRunner, get_import_runner
 from flask_jwt_extended import JWTManager
 import json
 from datetime import datetime, timedelta
-import uuid
-from models.project import Project
-import csv
-from io import StringIO
 import os
+import sys
 from dotenv import load_dotenv
-from routes.analytics import analytics
-from services.csv_service import import_customers_from_csv
-import requests
+from services.csv_service import import_customers_from_csv as import_customer_list_csv
+from services.customer_search import search_customers as search_customer_index
+from services.startup_service import prepare_database
+from services.customer_autocomplete import customer_index
+from services.project_feed import feed_query, feed_row_to_dict, parse_date
+from services.user_cache import load_user_snapshot
+from services.password_service import password_verifier
 import atexit
+import logging
+from services.logging_service import configure_logging
+
+# Importing this module only defines the app and starts no threads;
+# create_app() builds it. The scheduler (apscheduler, pytz), SendGrid
+# (requests) and Twilio clients are imported by the code that first uses
+# them, so a worker that never sends mail or runs jobs never loads them.
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Create data directory if it doesn't exist
+logger = logging.getLogger(__name__)
+
 data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
-if not os.path.exists(data_dir):
-    os.makedirs(data_dir)
-    print(f"Created data directory at: {data_dir}")
-
-# Initialize Flask app
-app = Flask(__name__, 
-           template_folder='../sav_schedule_front/templates',
-           static_folder='../sav_schedule_front/static',
-           static_url_path='/static')
-app.config.from_object(Config)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///scheduler.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Initialize JWT with additional configuration
-jwt = JWTManager(app)
-app.config['JWT_TOKEN_LOCATION'] = ['headers']
-app.config['JWT_HEADER_NAME'] = 'Authorization'
-app.config['JWT_HEADER_TYPE'] = 'Bearer'
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
-
-# Initialize CORS with support for credentials
-CORS(app, resources={
-    r"/*": {
-        "origins": ["http://127.0.0.1:5000", "http://localhost:5000"],
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "supports_credentials": True,
-        "allow_credentials": True
-    }
-})
-
-# Initialize database
-db.init_app(app)
 
 # Initialize Login Manager
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'auth.login'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # A cached snapshot of the user and role; pages never touch the users table
+    return load_user_snapshot(int(user_id))
+
+def create_app(config_class=Config, start_background=True):
+    """Build the Flask app and bring the database up to date.
+
+    With start_background=False only the logging writer thread is
+    started (it restarts itself in forked children): CLI tools use that,
+    and so does `gunicorn --preload`, which builds the app once in the
+    master and starts the background services in each worker after the
+    fork (see gunicorn.conf.py).
+    """
+    # Leveled logging through a background writer thread
+    configure_logging(config_class.LOG_LEVEL, config_class.LOG_FORMAT)
+
+    # Create data directory if it doesn't exist
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+        logger.info("Created data directory at: %s", data_dir)
+
+    app = Flask(__name__, 
+               template_folder='../sav_schedule_front/templates',
+               static_folder='../sav_schedule_front/static',
+               static_url_path='/static')
+    app.config.from_object(config_class)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///scheduler.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Initialize JWT with additional configuration
+    JWTManager(app)
+    app.config['JWT_TOKEN_LOCATION'] = ['headers']
+    app.config['JWT_HEADER_NAME'] = 'Authorization'
+    app.config['JWT_HEADER_TYPE'] = 'Bearer'
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+
+    # Initialize CORS with support for credentials
+    CORS(app, resources={
+        r"/*": {
+            "origins": ["http://127.0.0.1:5000", "http://localhost:5000"],
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization"],
+            "supports_credentials": True,
+            "allow_credentials": True
+        }
+    })
+
+    db.init_app(app)
+    login_manager.init_app(app)
 
-# Register blueprints
-app.register_blueprint(auth, url_prefix='/auth')
-app.register_blueprint(analytics, url_prefix='/analytics')
-app.register_blueprint(projects_bp, url_prefix='/projects')
-app.register_blueprint(user_management, url_prefix='/auth')  # Add auth prefix
+    # Register blueprints
+    app.register_blueprint(auth, url_prefix='/auth')
+    app.register_blueprint(analytics, url_prefix='/analytics')
+    app.register_blueprint(projects_bp, url_prefix='/projects')
+    app.register_blueprint(user_management, url_prefix='/auth')  # Add auth prefix
+    app.register_blueprint(import_jobs)
+    register_page_routes(app)
 
-def init_database():
-    """Initialize the database with required tables and initial data."""
+    # Schema, roles and the customer seed, each applied only when missing or changed
     with app.app_context():
-        # Create all tables
-        print("Creating database tables...")
-        db.create_all()
-
-        # Initialize roles
-        print("Initializing roles...")
-        for role_name, role_data in ROLES.items():
-            try:
-                role = Role.query.filter_by(name=role_name).first()
-                if not role:
-                    print(f"Creating role: {role_name}")
-                    role = Role(
-                        name=role_name,
-                        description=role_data['description'],
-                        permissions=role_data['permissions']
-                    )
-                    db.session.add(role)
-                    db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                print(f"Error creating role {role_name}: {str(e)}")
-                raise
-
-        # Import customers if CSV exists
-        csv_path = os.path.join(data_dir, 'cust_list.csv')
-        if os.path.exists(csv_path):
-            print("Importing customers from CSV...")
-            try:
-                with open(csv_path, 'r') as file:
-                    csv_reader = csv.DictReader(file)
-                    imported_count = 0
-                    for row in csv_reader:
-                        try:
-                            name = row.get('Customer', '').strip()
-                            if not name:
-                                name = f"{row.get('First_Name', '')} {row.get('Last_Name', '')}".strip()
-                            
-                            if name and row.get('Phone'):
-                                customer = Customer(
-                                    name=name,
-                                    phone=row.get('Phone'),
-                                    email=row.get('Main_Email', '')
-                                )
-                                db.session.add(customer)
-                                imported_count += 1
-                        except Exception as e:
-                            print(f"Error importing customer: {str(e)}")
-                            continue
-                    
-                    db.session.commit()
-                    print(f"Successfully imported {imported_count} customers")
-            except Exception as e:
-                db.session.rollback()
-                print(f"Error during customer import: {str(e)}")
-        else:
-            print(f"Customer CSV file not found at {csv_path}")
+        prepare_database(data_dir)
+
+        # Optional in-process autocomplete index for /search-customers
+        if app.config['CUSTOMER_AUTOCOMPLETE_INDEX']:
+            indexed = customer_index.build()
+            logger.info("Customer autocomplete index built with %d customers", indexed)
+
+    # Created here but idle until used: the import pool starts threads on
+    # its first job and the outbox worker only when start() is called
+    ImportJobRunner(app)
+    OutboxWorker(app)
+
+    if start_background:
+        start_background_services(app)
+    return app
+
+def start_background_services(app, scheduler=True):
+    """Start the threads that deliver notifications, resume imports and run scheduled jobs.
+
+    Runs once per serving process. Pass scheduler=False in processes that
+    should not run the daily jobs, so reminders are sent only once.
+    """
+    # Deliver queued customer notifications in the background
+    outbox_worker = app.extensions['outbox_worker']
+    outbox_worker.start()
 
-# Initialize database
-init_database()
+    # Pick up import jobs an earlier or crashed process did not finish
+    import_job_runner = app.extensions['import_jobs']
+    import_job_runner.start()
 
-# Initialize scheduler service
-scheduler_service = SchedulerService(app)
+    if scheduler:
+        start_scheduler(app)
+
+    # Register shutdown function
+    @atexit.register
+    def shutdown_workers():
+        outbox_worker.shutdown()
+        import_job_runner.shutdown()
+        password_verifier.shutdown()
+
+def start_scheduler(app):
+    """Start the daily reminder and history export jobs."""
+    # Imported here so processes that never run the jobs skip apscheduler
+    from services.scheduler_service import SchedulerService
+    scheduler_service = SchedulerService(app)
+    app.extensions['scheduler'] = scheduler_service
+    atexit.register(scheduler_service.shutdown)
+    return scheduler_service
+
+def after_fork(app, scheduler=False):
+    """Make a worker forked from a preloaded app safe to serve.
+
+    Connections opened in the parent are dropped without being closed
+    (the parent still owns them), then this worker's background services
+    are started. The SendGrid client goes the same way: when the master
+    runs the scheduler it has already created one, and each worker must
+    open its own pool.
+    """
+    with app.app_context():
+        db.engine.dispose(close=False)
+    # Only present when the parent imported it; importing it here would
+    # load requests into workers that never send mail
+    email_service = sys.modules.get('services.email_service')
+    if email_service is not None:
+        email_service.reset_email_service(close=False)
+    start_background_services(app, scheduler=scheduler)
 
-# Register shutdown function
-@atexit.register
-def shutdown_scheduler():
-    scheduler_service.shutdown()
+def register_page_routes(app):
+    app.add_url_rule('/', view_func=index)
+    app.add_url_rule('/login', view_func=login_redirect)
+    app.add_url_rule('/dashboard', view_func=dashboard)
+    app.add_url_rule('/calendar/<region>', view_func=calendar)
+    app.add_url_rule('/import-customers', view_func=import_customers, methods=['POST'])
+    app.add_url_rule('/search-customers', view_func=search_customers, methods=['GET'])
+    app.add_url_rule('/search-customers/index-stats', view_func=search_index_stats, methods=['GET'])
+    app.add_url_rule('/import-customers-from-csv', view_func=import_customers_from_csv, methods=['GET'])
+    app.add_url_rule('/confirmation/<region>', view_func=confirmation, methods=['GET'])
+    app.add_url_rule('/create-project/<region>', view_func=create_project, methods=['GET', 'POST'])
+    app.add_url_rule('/analytics', view_func=analytics_page)
 
-@app.route('/')
 def index():
     if current_user.is_authenticated:
         return redirect(url_for('dashboard'))
     return redirect(url_for('auth.login'))
 
-@app.route('/login')
 def login_redirect():
     return redirect(url_for('auth.login'))
 
-@app.route('/dashboard')
 @login_required
 def dashboard():
     return render_template('dashboard.html', 
                         username=current_user.username,
                         role=current_user.role.name if current_user.role else None)
 
-@app.route('/calendar/<region>')
+def default_calendar_window(today=None):
+    """First day of last month through the last day of next month."""
+    today = today or datetime.now().date()
+    first_of_month = today.replace(day=1)
+    start = (first_of_month - timedelta(days=1)).replace(day=1)
+    after_next = (first_of_month + timedelta(days=62)).replace(day=1)
+    end = after_next - timedelta(days=1)
+    return start, end
+
 @login_required
 def calendar(region):
     try:
-        # Get projects for this region
-        projects = Project.query.filter_by(region=region).all()
-        
+        # Only load the visible month plus one neighbour on each side unless
+        # the browser asks for an explicit window
+        try:
+            start = parse_date(request.args.get('start'))
+            end = parse_date(request.args.get('end'))
+        except ValueError:
+            start = end = None
+        default_start, default_end = default_calendar_window()
+        start = start or default_start
+        end = end or default_end
+
         # Format projects for the calendar
-        projects_list = []
-        for project in projects:
-            customer = Customer.query.get(project.customer_id)
-            project_data = {
-                'id': project.id,
-                'date': project.date.strftime('%Y-%m-%d'),
-                'customer_name': customer.name if customer else 'Unknown',
-                'address': project.address,
-                'city': project.city,
-                'work_type': project.work_type.split(',') if project.work_type else [],
-                'job_cost_type': project.job_cost_type.split(',') if project.job_cost_type else []
-            }
-            projects_list.append(project_data)
+        projects_list = [feed_row_to_dict(row) for row in feed_query(region, start=start, end=end)]
         
         # Convert to JSON for the template
         projects_json = json.dumps(projects_list)
@@ -197,11 +232,11 @@ def calendar(region):
                             username=current_user.username,
                             role=current_user.role.name if current_user.role else None,
                             projects=projects_list,
-                            projects_json=projects_json)
+                            projects_json=projects_json,
+                            window_start=start.strftime('%Y-%m-%d'),
+                            window_end=end.strftime('%Y-%m-%d'))
     except Exception as e:
-        print(f"Exception in calendar route: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error loading calendar for %s", region)
         return render_template('calendar.html',
                             region=region,
                             username=current_user.username,
@@ -209,7 +244,6 @@ def calendar(region):
                             projects=[],
                             projects_json='[]')
 
-@app.route('/import-customers', methods=['POST'])
 def import_customers():
     try:
         if 'file' not in request.files:
@@ -222,125 +256,59 @@ def import_customers():
         if not file.filename.endswith('.csv'):
             return jsonify({"error": "File must be a CSV"}), 400
         
-        # Read the CSV file
-        stream = StringIO(file.stream.read().decode("UTF8"), newline=None)
-        csv_data = csv.DictReader(stream)
-        
-        imported_count = 0
-        for row in csv_data:
-            # Check if customer already exists by phone number
-            existing_customer = Customer.query.filter_by(phone=row.get('phone')).first()
-            if not existing_customer:
-                customer = Customer(
-                    name=row.get('name'),
-                    phone=row.get('phone'),
-                    email=row.get('email')
-                )
-                db.session.add(customer)
-                imported_count += 1
-        
-        db.session.commit()
-        return jsonify({"message": f"Successfully imported {imported_count} customers"})
+        # The import runs as a background job; poll the status URL for progress.
+        # Customers that already exist (by phone number) are skipped
+        job = get_import_runner().create_job(file, row_format='simple', update_existing=False)
+        return jsonify({
+            "message": "Import started",
+            "job_id": job.id,
+            "status_url": url_for('import_jobs.get_import_job', job_id=job.id)
+        }), 202
         
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
-@app.route('/search-customers', methods=['GET'])
 def search_customers():
     try:
-        search_term = request.args.get('q', '')
-        print(f"Received search request with term: {search_term}")
-        
+        search_term = request.args.get('q', '').strip()
         if not search_term:
-            print("No search term provided, returning empty list")
             return jsonify([])
-        
-        # Search by name, phone, or email
-        customers = Customer.query.filter(
-            db.or_(
-                Customer.name.ilike(f'%{search_term}%'),
-                Customer.phone.ilike(f'%{search_term}%'),
-                Customer.email.ilike(f'%{search_term}%')
-            )
-        ).limit(10).all()
-        
-        print(f"Found {len(customers)} matching customers")
-        result = [{
-            'id': c.id,
-            'name': c.name,
-            'phone': c.phone,
-            'email': c.email
-        } for c in customers]
-        print(f"Returning results: {result}")
-        return jsonify(result)
+        limit = min(request.args.get('limit', 10, type=int), 50)
+
+        # Ranked prefix match on name, email and phone digits, from the
+        # in-process index when enabled, otherwise from the FTS5 table
+        if customer_index.ready:
+            customer_index.sync()
+            return jsonify(customer_index.search(search_term, limit=limit))
+        return jsonify(search_customer_index(search_term, limit=limit))
         
     except Exception as e:
-        print(f"Error in search_customers: {str(e)}")
-        print(f"Error type: {type(e).__name__}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in search_customers")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/import-customers-from-csv', methods=['GET'])
+@login_required
+def search_index_stats():
+    return jsonify(customer_index.stats())
+
 def import_customers_from_csv():
-    try:
-        csv_path = 'data/cust_list.csv'
-        imported_count = 0
-        updated_count = 0
-        
-        with open(csv_path, 'r', encoding='utf-8') as file:
-            csv_data = csv.DictReader(file)
-            # Print headers to verify what we're reading
-            print(f"CSV Headers: {csv_data.fieldnames}")
-            
-            for row in csv_data:
-                # Print first row to see the data structure
-                if imported_count == 0:
-                    print(f"First row data: {row}")
-                
-                # Check if customer already exists by phone number
-                phone = row.get('Phone', '').strip()  # Remove any whitespace
-                if not phone:  # Skip rows without phone numbers
-                    continue
-                    
-                existing_customer = Customer.query.filter_by(phone=phone).first()
-                
-                if existing_customer:
-                    # Update existing customer
-                    existing_customer.name = row.get('Customer', '')
-                    existing_customer.first_name = row.get('First_Name', '')
-                    existing_customer.last_name = row.get('Last_Name', '')
-                    existing_customer.email = row.get('Main_Email', '')
-                    updated_count += 1
-                else:
-                    # Create new customer
-                    customer = Customer(
-                        name=row.get('Customer', ''),
-                        first_name=row.get('First_Name', ''),
-                        last_name=row.get('Last_Name', ''),
-                        phone=phone,
-                        email=row.get('Main_Email', '')
-                    )
-                    db.session.add(customer)
-                    imported_count += 1
-        
-        db.session.commit()
-        return jsonify({
-            'message': f'Successfully imported {imported_count} new customers and updated {updated_count} existing customers'
-        })
-        
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error importing customers: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    result = import_customer_list_csv(os.path.join(data_dir, 'cust_list.csv'))
+    if not result['success']:
+        return jsonify({'error': result['error']}), 500
+    return jsonify({
+        'message': result['message'],
+        'imported': result['imported'],
+        'updated': result['updated'],
+        'skipped': result['skipped']
+    })
 
-@app.route('/confirmation/<region>', methods=['GET'])
 def confirmation(region):
     if 'user' not in session:
         return redirect(url_for('auth.login'))
     
     try:
+        import requests
+
         # Get the most recently created project from the backend
         response = requests.get(
             f'{BACKEND_URL}/projects/{region}/latest',
@@ -354,17 +322,15 @@ def confirmation(region):
             return redirect(url_for('create_project', region=region))
             
     except Exception as e:
-        print(f"Error in confirmation route: {str(e)}")
+        logger.exception("Error in confirmation route")
         return redirect(url_for('create_project', region=region))
 
-@app.route('/create-project/<region>', methods=['GET', 'POST'])
 @login_required
 def create_project(region):
     if 'user' not in session:
         return redirect(url_for('auth.login'))
     return render_template('create_project.html', region=region)
 
-@app.route('/analytics')
 @login_required
 def analytics_page():
     if not current_user.is_admin():
@@ -372,4 +338,4 @@ def analytics_page():
     return render_template('analytics.html')
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    create_app().run(host='0.0.0.0', port=5001, debug=True)
@@ -16,9 +16,73 @@ class Config:
     
     # SendGrid configuration
     SENDGRID_API_KEY = os.environ.get('SENDGRID_API_KEY')
+    SENDGRID_API_URL = os.environ.get('SENDGRID_API_URL') or 'https://api.sendgrid.com/v3/mail/send'
+    SENDGRID_POOL_SIZE = int(os.environ.get('SENDGRID_POOL_SIZE', 10))
+    SENDGRID_CONNECT_TIMEOUT = float(os.environ.get('SENDGRID_CONNECT_TIMEOUT', 5))  # seconds
+    SENDGRID_READ_TIMEOUT = float(os.environ.get('SENDGRID_READ_TIMEOUT', 15))  # seconds
+
+    # Analytics response cache
+    ANALYTICS_CACHE_TTL = int(os.environ.get('ANALYTICS_CACHE_TTL', 300))  # seconds
+    ANALYTICS_CACHE_SIZE = int(os.environ.get('ANALYTICS_CACHE_SIZE', 64))
+
+    # Daily reminder job
+    REMINDER_SEND_CONCURRENCY = int(os.environ.get('REMINDER_SEND_CONCURRENCY', 8))
+
+    # Notification outbox worker
+    OUTBOX_WORKERS = int(os.environ.get('OUTBOX_WORKERS', 2))
+    OUTBOX_POLL_INTERVAL = int(os.environ.get('OUTBOX_POLL_INTERVAL', 5))  # seconds
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5))
+    OUTBOX_BACKOFF_SECONDS = int(os.environ.get('OUTBOX_BACKOFF_SECONDS', 30))  # doubles per retry
+
+    # Background customer imports
+    IMPORT_JOB_WORKERS = int(os.environ.get('IMPORT_JOB_WORKERS', 1))
+    IMPORT_JOB_CHUNK_SIZE = int(os.environ.get('IMPORT_JOB_CHUNK_SIZE', 1000))  # rows per commit
+    IMPORT_JOB_STALE_SECONDS = int(os.environ.get('IMPORT_JOB_STALE_SECONDS', 300))
+    IMPORT_JOB_SWEEP_SECONDS = int(os.environ.get('IMPORT_JOB_SWEEP_SECONDS', 60))  # how often stalled jobs are looked for
+    IMPORT_UPLOAD_DIR = os.environ.get('IMPORT_UPLOAD_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'data', 'imports')
+
+    # Per-region project CSV change logs
+    EXPORT_DIR = os.environ.get('EXPORT_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'exports')
+
+    # Partitioned project history for the warehouse: parquet, ndjson, or
+    # auto (Parquet when pyarrow is installed, gzip NDJSON otherwise)
+    HISTORY_EXPORT_FORMAT = os.environ.get('HISTORY_EXPORT_FORMAT', 'auto')
+    HISTORY_EXPORT_DIR = os.environ.get('HISTORY_EXPORT_DIR') or os.path.join(EXPORT_DIR, 'history')
+
+    # In-process customer autocomplete index (the FTS5 search is used when off)
+    CUSTOMER_AUTOCOMPLETE_INDEX = os.environ.get('CUSTOMER_AUTOCOMPLETE_INDEX', 'false').lower() in ('1', 'true', 'yes')
+    CUSTOMER_INDEX_SYNC_SECONDS = int(os.environ.get('CUSTOMER_INDEX_SYNC_SECONDS', 30))  # replay other processes' customer changes
+
+    # Warn when startup database work (schema, roles, seeds) takes longer
+    STARTUP_DB_BUDGET_MS = int(os.environ.get('STARTUP_DB_BUDGET_MS', 100))
+    # `python migrations.py check-imports` fails when `import app` takes longer
+    IMPORT_TIME_BUDGET_MS = int(os.environ.get('IMPORT_TIME_BUDGET_MS', 800))
+
+    # Logging: DEBUG, INFO, WARNING or ERROR; text or json lines on stderr
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
 
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_TOKEN_LOCATION = ['headers']
     JWT_HEADER_NAME = 'Authorization'
     JWT_HEADER_TYPE = 'Bearer'
+
+    # Access tokens carry role claims; role, status and account changes bump
+    # a per-user token version, re-read by each process at most this often
+    TOKEN_REVOCATION_TTL = int(os.environ.get('TOKEN_REVOCATION_TTL', 5))  # seconds
+
+    # Cached user+role snapshots for session and pre-claims token lookups
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))  # seconds
+
+    # Password hashing: any Werkzeug method string, e.g. scrypt,
+    # scrypt:65536:8:1 or pbkdf2:sha256:600000. Stored hashes made with other
+    # settings are upgraded on the user's next login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    # Logins verify on a bounded pool; beyond workers + queue they get a 503
+    PASSWORD_VERIFY_WORKERS = int(os.environ.get('PASSWORD_VERIFY_WORKERS', 2))
+    PASSWORD_VERIFY_QUEUE = int(os.environ.get('PASSWORD_VERIFY_QUEUE', 16))
+    PASSWORD_VERIFY_TIMEOUT = float(os.environ.get('PASSWORD_VERIFY_TIMEOUT', 10))  # seconds
@@ -0,0 +1,24 @@
+import os
+
+# The app is imported and the database prepared once in the master, then
+# workers are forked from it, so starting a worker costs no imports.
+preload_app = True
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('GUNICORN_WORKERS', '2'))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+# Threads do not survive fork(); wsgi.py leaves them to the hooks below
+os.environ['APP_DEFER_BACKGROUND'] = '1'
+
+def when_ready(server):
+    # The daily jobs run in the master, so they run once however many
+    # workers there are and survive worker restarts. The master's SendGrid
+    # client is dropped in each worker by after_fork()
+    from app import start_scheduler
+    from wsgi import app
+    start_scheduler(app)
+
+def post_fork(server, worker):
+    from app import after_fork
+    from wsgi import app
+    after_fork(app)
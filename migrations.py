@@ -1,7 +1,33 @@
-from app import app, db
+import os
+import subprocess
+import sys
+from datetime import date, datetime
+from sqlalchemy import create_engine, func
+from app import create_app, db, data_dir
+from config import Config
 from models.project import Project
 from models.customer import Customer
+from models.project_daily_stat import ProjectDailyStat
 from models.user import User, Role
+from services.project_feed import feed_query
+from services.analytics_service import rebuild_daily_stats
+from services.customer_service import migrate_customer_phones
+from services.project_type_service import migrate_project_types as backfill_project_types
+from services.customer_search import ensure_search_index, rebuild_search_index
+from services.customer_autocomplete import ensure_change_log
+from services.export_service import compact_region_export, export_regions
+from services.history_export import export_history, export_all_history
+from services.startup_service import ensure_indexes, ensure_roles, schema_objects, seed_customers
+
+# Maintenance commands never start the scheduler or background workers
+app = create_app(start_background=False)
+
+# Tables whose hot queries must never fall back to a full table scan
+PLAN_CHECKED_TABLES = ('project', 'customer', 'project_daily_stats')
+
+# Packages only the code that uses them may import; `import app` must not
+# load them (scheduler, SendGrid, Twilio, Parquet export)
+DEFERRED_IMPORTS = ('apscheduler', 'requests', 'twilio', 'pyarrow')
 
 def recreate_database():
     with app.app_context():
@@ -10,19 +36,12 @@ def recreate_database():
         
         # Create all tables with new schema
         db.create_all()
+        ensure_search_index()
+        if app.config['CUSTOMER_AUTOCOMPLETE_INDEX']:
+            ensure_change_log()
         
         # Initialize roles if needed
-        from app import ROLES
-        for role_name, role_data in ROLES.items():
-            role = Role.query.filter_by(name=role_name).first()
-            if not role:
-                role = Role(
-                    name=role_name,
-                    description=role_data['description'],
-                    permissions=role_data['permissions']
-                )
-                db.session.add(role)
-        db.session.commit()
+        ensure_roles()
 
         # Create admin user if it doesn't exist
         admin_role = Role.query.filter_by(name='admin').first()
@@ -37,6 +56,173 @@ def recreate_database():
             db.session.commit()
             print("Admin user created successfully!")
 
+def create_missing_indexes():
+    """Create any model-declared index the live database is missing.
+
+    Startup does the same through ensure_schema(); this runs it on demand.
+    Existing tables and their data are left untouched.
+    """
+    with app.app_context():
+        objects = schema_objects()
+        return ensure_indexes(objects['table'], objects['index'])
+
+def migrate_project_types(batch_size=1000):
+    """Backfill the type association tables; startup does this for databases that need it."""
+    with app.app_context():
+        db.create_all()
+        return backfill_project_types(batch_size)
+
+def hot_queries():
+    """The read paths that run on every calendar load, write or reminder job."""
+    today = date.today()
+    return {
+        'calendar feed': feed_query('North', start=today, end=today),
+        'feed by work type': feed_query('North', start=today, end=today, work_type='sealing'),
+        'feed keyset page': feed_query('North', after=(today, '')).limit(100),
+        'latest project': Project.query.filter_by(region='North').order_by(Project.created_at.desc()).limit(1),
+        'history partition': Project.query.filter(Project.region == 'North', Project.updated_at >= today).order_by(Project.updated_at),
+        'projects by date': Project.query.filter_by(region='North', date=today),
+        'reminder job': Project.query.filter_by(date=today),
+        'analytics rollup': ProjectDailyStat.query.filter(ProjectDailyStat.region == 'North', ProjectDailyStat.date >= today, ProjectDailyStat.date <= today),
+        'customer project count': db.session.query(func.count(Project.id)).filter(Project.customer_id == 1),
+        'customer by phone': Customer.query.filter_by(phone_e164='+18015551234'),
+    }
+
+def check_query_plans():
+    """Return a list of (name, detail) for hot queries that full-scan or indexes the database lacks.
+
+    Plans are taken on an empty in-memory copy of the model schema, so
+    they depend only on the declared indexes and not on the row counts or
+    ANALYZE statistics of whichever database the check runs against.
+    """
+    with app.app_context():
+        failures = []
+        objects = schema_objects()
+        for table in db.metadata.sorted_tables:
+            if table.name not in objects['table']:
+                failures.append((table.name, 'table missing'))
+                continue
+            for index in table.indexes:
+                if index.name not in objects['index']:
+                    failures.append((table.name, f'index {index.name} missing'))
+
+        engine = create_engine('sqlite://')
+        db.metadata.create_all(engine)
+        with engine.connect() as conn:
+            for name, query in hot_queries().items():
+                sql = str(query.statement.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True}))
+                plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql).fetchall()
+                for row in plan:
+                    detail = row[-1]
+                    words = detail.split()
+                    # "SCAN project" is a table scan; "SEARCH ... USING INDEX" is fine
+                    if len(words) >= 2 and words[0] == 'SCAN' and words[1] in PLAN_CHECKED_TABLES:
+                        failures.append((name, detail))
+                print(f"{name}: {'; '.join(row[-1] for row in plan)}")
+        engine.dispose()
+        return failures
+
+def import_times(module='app'):
+    """{module name: cumulative import time in microseconds} for a fresh `import module`."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, 'LOG_LEVEL': 'ERROR'},
+        capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+def check_import_time(budget_ms=None, runs=3):
+    """Return failures when `import app` exceeds its budget or loads a deferred package.
+
+    Takes the best of a few runs, since the first one also pays for
+    writing bytecode caches.
+    """
+    budget_ms = budget_ms or Config.IMPORT_TIME_BUDGET_MS
+    samples = [import_times() for _ in range(runs)]
+    best_ms = min(times['app'] for times in samples) / 1000
+    print(f"import app: {best_ms:.0f} ms (budget {budget_ms} ms)")
+    failures = []
+    if best_ms > budget_ms:
+        failures.append(f"import app took {best_ms:.0f} ms, over the {budget_ms} ms budget")
+    loaded = {name.split('.')[0] for name in samples[0]}
+    for package in DEFERRED_IMPORTS:
+        if package in loaded:
+            failures.append(f"import app loads {package}; import it where it is used")
+    return failures
+
 if __name__ == '__main__':
-    recreate_database()
-    print("Database recreated successfully!") 
\ No newline at end of file
+    command = sys.argv[1] if len(sys.argv) > 1 else 'recreate'
+    if command == 'indexes':
+        created = create_missing_indexes()
+        print(f"Created {len(created)} indexes: {', '.join(created) or 'none'}")
+    elif command == 'migrate-types':
+        migrated = migrate_project_types()
+        print(f"Created {migrated} project type associations")
+    elif command == 'rebuild-stats':
+        with app.app_context():
+            db.create_all()
+            rows = rebuild_daily_stats()
+        print(f"Rebuilt project_daily_stats with {rows} rows")
+    elif command == 'normalize-phones':
+        with app.app_context():
+            result = migrate_customer_phones()
+        print(f"Normalized {result['normalized']} phone numbers, merged {result['merged']} duplicate customers "
+              f"({result['unreadable']} numbers could not be normalized)")
+    elif command == 'rebuild-search':
+        with app.app_context():
+            ensure_search_index()
+            indexed = rebuild_search_index()
+        print(f"Indexed {indexed} customers for search")
+    elif command == 'compact-exports':
+        with app.app_context():
+            for region in sys.argv[2:] or export_regions():
+                written = compact_region_export(region)
+                print(f"Compacted projects_{region}.csv to {written} projects")
+    elif command == 'export-history':
+        # python migrations.py export-history [parquet|ndjson] [since YYYY-MM-DD]
+        fmt = sys.argv[2] if len(sys.argv) > 2 else None
+        since = datetime.strptime(sys.argv[3], '%Y-%m-%d').date() if len(sys.argv) > 3 else None
+        with app.app_context():
+            if since:
+                regions = export_regions()
+                results = {region: export_history(region, since=since, fmt=fmt) for region in regions}
+            else:
+                results = export_all_history(fmt=fmt)
+        for region, written in results.items():
+            print(f"{region}: wrote {len(written)} partitions ({sum(written.values())} rows)")
+    elif command == 'seed':
+        # python migrations.py seed [--force]: import data/cust_list.csv,
+        # by default only when it changed since it was last seeded
+        with app.app_context():
+            result = seed_customers(os.path.join(data_dir, 'cust_list.csv'), force='--force' in sys.argv[2:])
+        if result is None:
+            print("Customer seed unchanged since it was last applied; use --force to re-import")
+        elif result['success']:
+            print(f"Seeded {result['imported']} customers ({result['skipped']} skipped)")
+        else:
+            print(f"Error seeding customers: {result['error']}")
+            sys.exit(1)
+    elif command == 'check-plans':
+        failures = check_query_plans()
+        for name, detail in failures:
+            print(f"FAIL {name}: {detail}")
+        sys.exit(1 if failures else 0)
+    elif command == 'check-imports':
+        failures = check_import_time()
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1 if failures else 0)
+    elif command == 'recreate':
+        recreate_database()
+        print("Database recreated successfully!")
+    else:
+        print(f"Unknown command: {command}")
+        print("Usage: python migrations.py [recreate|indexes|migrate-types|rebuild-stats|normalize-phones|rebuild-search|compact-exports [region ...]|export-history [format] [since]|seed [--force]|check-plans|check-imports]")
+        sys.exit(2)
\ No newline at end of file
@@ -0,0 +1,15 @@
+from . import db
+
+class CacheGeneration(db.Model):
+    """A counter bumped in the same transaction as writes that stale a cache.
+
+    Every process includes the current value in its cache keys, so a
+    write made by any worker retires the entries of all of them.
+    """
+    __tablename__ = 'cache_generations'
+
+    name = db.Column(db.String(50), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CacheGeneration {self.name}={self.generation}>'
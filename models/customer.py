@@ -1,5 +1,28 @@
+import re
+from sqlalchemy.orm import validates
 from . import db
 
+_EXTENSION = re.compile(r'(?:ext\.?|x|#)\s*\d+\s*$', re.IGNORECASE)
+
+def normalize_phone(phone, default_country_code='1'):
+    """Return phone in E.164 form ("+18015551234"), or None if it can't be read.
+
+    Formatting, a trailing extension and a leading 1 on US numbers are
+    ignored, so "(801) 555-1234", "801.555.1234" and "+1 801 555 1234"
+    all normalize to the same value.
+    """
+    if not phone:
+        return None
+    phone = _EXTENSION.sub('', str(phone).strip())
+    digits = re.sub(r'\D', '', phone)
+    if phone.startswith('+'):
+        return f'+{digits}' if 8 <= len(digits) <= 15 else None
+    if len(digits) == 10:
+        return f'+{default_country_code}{digits}'
+    if len(digits) == 11 and digits.startswith(default_country_code):
+        return f'+{digits}'
+    return None
+
 class Customer(db.Model):
     __tablename__ = 'customer'
     
@@ -7,10 +30,25 @@ class Customer(db.Model):
     name = db.Column(db.String(100))  # Full name
     first_name = db.Column(db.String(100))
     last_name = db.Column(db.String(100))
-    phone = db.Column(db.String(20), nullable=False)  # Keep phone as required for uniqueness
+    phone = db.Column(db.String(20), nullable=False)  # As entered, for display
+    # Identity key: one customer per normalized number, kept in sync with phone
+    phone_e164 = db.Column(db.String(16), unique=True, index=True)
     email = db.Column(db.String(120))
     # Define one-to-many relationship with Project
     projects = db.relationship('Project', back_populates='customer', lazy=True)
 
+    @validates('phone')
+    def _sync_phone_e164(self, key, phone):
+        self.phone_e164 = normalize_phone(phone)
+        return phone
+
+    @classmethod
+    def find_by_phone(cls, phone):
+        """Single unique-index probe for the customer owning this number."""
+        phone_e164 = normalize_phone(phone)
+        if not phone_e164:
+            return None
+        return cls.query.filter_by(phone_e164=phone_e164).first()
+
     def __repr__(self):
-        return f'<Customer {self.name or f"{self.first_name} {self.last_name}"}'
\ No newline at end of file
+        return f'<Customer {self.name or f"{self.first_name} {self.last_name}"}'
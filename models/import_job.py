@@ -0,0 +1,62 @@
+from . import db
+from datetime import datetime
+
+class ImportJob(db.Model):
+    """A customer CSV import running in the background.
+
+    rows_processed only advances in the same transaction as the chunk it
+    describes, so it is always a safe point to resume from.
+    """
+    __tablename__ = 'import_jobs'
+
+    id = db.Column(db.String(36), primary_key=True)
+    filename = db.Column(db.String(255))
+    path = db.Column(db.String(500), nullable=False)  # uploaded file saved on disk
+    row_format = db.Column(db.String(20), nullable=False, default='simple')  # simple or customer_list
+    update_existing = db.Column(db.Boolean, default=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    total_rows = db.Column(db.Integer)
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    inserted = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # last progress commit, used to spot abandoned jobs
+    # When the current run began and the row it began at; the rate and ETA
+    # only count rows this run processed, not those done before a resume
+    resumed_at = db.Column(db.DateTime)
+    resumed_rows = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        now = self.finished_at or datetime.utcnow()
+        since = self.resumed_at or self.started_at
+        elapsed = (now - since).total_seconds() if since else 0
+        rows = self.rows_processed - (self.resumed_rows or 0)
+        rate = rows / elapsed if elapsed > 0 else None
+        eta = None
+        if self.status == 'running' and rate and self.total_rows is not None:
+            eta = max(self.total_rows - self.rows_processed, 0) / rate
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'total_rows': self.total_rows,
+            'rows_processed': self.rows_processed,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'skipped': self.skipped,
+            'errors': self.error_count,
+            'last_error': self.last_error,
+            'rows_per_second': round(rate, 1) if rate else None,
+            'eta_seconds': round(eta, 1) if eta is not None else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<ImportJob {self.id} {self.status} {self.rows_processed}/{self.total_rows}>'
@@ -0,0 +1,41 @@
+from . import db
+from datetime import datetime
+import json
+
+class NotificationOutbox(db.Model):
+    """Customer notification waiting to be delivered by the outbox worker.
+
+    Rows are added in the same transaction as the project change that
+    triggers them, so a committed project always has its notifications
+    queued and a rolled-back one never does.
+    """
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        # Worker poll: due rows by status
+        db.Index('ix_notification_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # project_confirmation, project_update, project_sms
+    payload = db.Column(db.Text, nullable=False)  # JSON keyword arguments for the sender
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, processing, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    @classmethod
+    def enqueue(cls, kind, **payload):
+        """Queue a notification in the current session; the caller commits."""
+        message = cls(kind=kind, payload=json.dumps(payload), status='pending',
+                      attempts=0, next_attempt_at=datetime.utcnow())
+        db.session.add(message)
+        return message
+
+    @property
+    def data(self):
+        return json.loads(self.payload)
+
+    def __repr__(self):
+        return f'<NotificationOutbox {self.id} {self.kind} {self.status}>'
@@ -1,24 +1,57 @@
 from . import db
 from datetime import datetime
+from .project_type import WorkType, JobCostType, project_work_types, project_job_cost_types, clean_type_names
 
 class Project(db.Model):
     __tablename__ = 'project'
+    __table_args__ = (
+        # Serves the calendar date window and (date, id) keyset pagination
+        db.Index('ix_project_region_date_id', 'region', 'date', 'id'),
+        # Latest-project lookup per region
+        db.Index('ix_project_region_created_at', 'region', 'created_at'),
+        # Day-by-day history export partitions
+        db.Index('ix_project_region_updated_at', 'region', 'updated_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True)
-    date = db.Column(db.Date, nullable=False)
+    date = db.Column(db.Date, nullable=False, index=True)
     po = db.Column(db.String(100))
     address = db.Column(db.String(200), nullable=False)
     city = db.Column(db.String(100))
     subdivision = db.Column(db.String(100))
     lot_number = db.Column(db.String(50))
     square_footage = db.Column(db.Integer)
+    # Comma-joined display copies of the type associations below; written
+    # together by set_types() so the calendar feed can stay a single query
     job_cost_type = db.Column(db.String(100))
     work_type = db.Column(db.String(100))
     notes = db.Column(db.Text)
     region = db.Column(db.String(50), nullable=False)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
     
     # Define many-to-one relationship with Customer
     customer = db.relationship('Customer', back_populates='projects', lazy=True)
+
+    # Normalized type associations used for filtering and analytics
+    work_types = db.relationship('WorkType', secondary=project_work_types, lazy=True, order_by=WorkType.name)
+    job_cost_types = db.relationship('JobCostType', secondary=project_job_cost_types, lazy=True, order_by=JobCostType.name)
+
+    def set_types(self, work_types, job_cost_types):
+        """Set work and job cost types, keeping both representations in sync."""
+        work_types = clean_type_names(work_types)
+        job_cost_types = clean_type_names(job_cost_types)
+        self.work_type = ','.join(work_types)
+        self.job_cost_type = ','.join(job_cost_types)
+        self.work_types = WorkType.lookup(work_types)
+        self.job_cost_types = JobCostType.lookup(job_cost_types)
+
+    # Names in the order they were submitted, the same order the feed returns
+    @property
+    def work_type_names(self):
+        return clean_type_names(self.work_type)
+
+    @property
+    def job_cost_type_names(self):
+        return clean_type_names(self.job_cost_type)
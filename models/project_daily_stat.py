@@ -0,0 +1,15 @@
+from . import db
+
+class ProjectDailyStat(db.Model):
+    """Per-day project counts by type, maintained on every project write."""
+    __tablename__ = 'project_daily_stats'
+
+    # Primary key order serves "region + date range" scans for analytics
+    region = db.Column(db.String(50), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    type_kind = db.Column(db.String(20), primary_key=True)  # work_type or job_cost_type
+    type_value = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ProjectDailyStat {self.region} {self.date} {self.type_kind}={self.type_value}: {self.count}>'
@@ -0,0 +1,57 @@
+from . import db
+
+# Association tables; the (type_id, project_id) indexes serve "all projects
+# of type X" lookups, the composite primary keys serve the reverse direction
+project_work_types = db.Table(
+    'project_work_types',
+    db.Column('project_id', db.String(36), db.ForeignKey('project.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('work_type_id', db.Integer, db.ForeignKey('work_types.id'), primary_key=True),
+    db.Index('ix_project_work_types_type_project', 'work_type_id', 'project_id')
+)
+
+project_job_cost_types = db.Table(
+    'project_job_cost_types',
+    db.Column('project_id', db.String(36), db.ForeignKey('project.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('job_cost_type_id', db.Integer, db.ForeignKey('job_cost_types.id'), primary_key=True),
+    db.Index('ix_project_job_cost_types_type_project', 'job_cost_type_id', 'project_id')
+)
+
+def clean_type_names(names):
+    """Strip blanks and duplicates while keeping the submitted order."""
+    if isinstance(names, str):
+        names = names.split(',')
+    cleaned = []
+    for name in names or []:
+        name = (name or '').strip()
+        if name and name not in cleaned:
+            cleaned.append(name)
+    return cleaned
+
+class TypeLookupMixin:
+    @classmethod
+    def lookup(cls, names):
+        """Return rows for the given names in order, creating any that are new."""
+        names = clean_type_names(names)
+        if not names:
+            return []
+        found = {t.name: t for t in cls.query.filter(cls.name.in_(names))}
+        for name in names:
+            if name not in found:
+                found[name] = cls(name=name)
+                db.session.add(found[name])
+        return [found[name] for name in names]
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.name}>'
+
+class WorkType(TypeLookupMixin, db.Model):
+    __tablename__ = 'work_types'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+
+class JobCostType(TypeLookupMixin, db.Model):
+    __tablename__ = 'job_cost_types'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
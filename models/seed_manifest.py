@@ -0,0 +1,21 @@
+from . import db
+from datetime import datetime
+
+class SeedManifest(db.Model):
+    """A data file the app has seeded from, as it was when last applied.
+
+    Startup compares the file's size and mtime (and, when those differ, its
+    content hash) against this row and skips seeds that have not changed.
+    """
+    __tablename__ = 'seed_manifest'
+
+    name = db.Column(db.String(100), primary_key=True)
+    path = db.Column(db.String(500), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    mtime_ns = db.Column(db.BigInteger, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    rows = db.Column(db.Integer)
+    seeded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SeedManifest {self.name} {self.sha256[:12]}>'
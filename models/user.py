@@ -1,6 +1,8 @@
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from . import db
+from services.password_service import hash_password
+from datetime import datetime
 import uuid
 
 class Invitation(db.Model):
@@ -62,16 +64,10 @@ class User(UserMixin, db.Model):
             self.role = Role.query.filter_by(name='viewer').first()
 
     def set_password(self, password):
-        print(f"Setting password for user: {self.username}")
-        self.password_hash = generate_password_hash(password)
-        print(f"Password hash generated: {self.password_hash[:20]}...")
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        print(f"Checking password for user: {self.username}")
-        print(f"Stored hash: {self.password_hash[:20]}...")
-        result = check_password_hash(self.password_hash, password)
-        print(f"Password check result: {result}")
-        return result
+        return check_password_hash(self.password_hash, password)
 
     def has_permission(self, permission):
         if not self.role:
@@ -84,6 +80,72 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+class TokenRole:
+    """The role fields a user snapshot or access token carries."""
+
+    def __init__(self, name, permissions):
+        self.name = name
+        self.permissions = permissions
+
+class UserSnapshot(UserMixin):
+    """Read-only copy of a user and its role, safe to keep between requests.
+
+    Exposes the same fields and permission checks the routes and templates
+    use on User, without touching the database.
+    """
+
+    def __init__(self, user_id, username, email, role_name, permissions, active=True):
+        self.id = user_id
+        self.username = username
+        self.email = email
+        self.role = TokenRole(role_name, permissions or 0) if role_name else None
+        self._active = active
+
+    @classmethod
+    def from_user(cls, user):
+        role = user.role
+        return cls(user.id, user.username, user.email,
+                   role.name if role else None, role.permissions if role else 0,
+                   user.is_active is not False)
+
+    @property
+    def is_active(self):
+        return self._active
+
+    def has_permission(self, permission):
+        if not self.role:
+            return False
+        return bool(self.role.permissions & permission)
+
+    def is_admin(self):
+        return self.role and self.role.name == 'admin'
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.username}>'
+
+class TokenUser(UserSnapshot):
+    """The authenticated user as described by a signed access token."""
+
+    def __init__(self, user_id, claims):
+        super().__init__(user_id, claims.get('username'), claims.get('email'),
+                         claims.get('role'), claims.get('perms'))
+
+    def __repr__(self):
+        return f'<TokenUser {self.username}>'
+
+class TokenVersion(db.Model):
+    """Per-user access token version; tokens carrying an older one are revoked.
+
+    Only users whose role, status or account changed have a row, and rows
+    older than the token lifetime can be dropped, so the table stays short
+    enough to cache whole.
+    """
+    __tablename__ = 'token_versions'
+
+    user_id = db.Column(db.Integer, primary_key=True)  # no FK: outlives deleted users
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
 # Permission constants
 PERMISSIONS = {
     'VIEW_CALENDAR': 1,
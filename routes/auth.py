@@ -1,43 +1,57 @@
 from flask import Blueprint, request, jsonify, redirect, url_for, flash, render_template
 from flask_login import login_user, logout_user, login_required, current_user
-from models.user import User, Role, ROLES, Invitation
+from models.user import User, Role, ROLES, Invitation, TokenUser
 from models import db
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, verify_jwt_in_request, JWTManager
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity, verify_jwt_in_request, JWTManager
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
-from services.email_service import EmailService
+from services.token_service import create_user_token, has_user_claims, token_revoked, revoke_user_tokens, token_revocations
+from services.user_cache import load_user_snapshot, invalidate_user
+from services.password_service import password_verifier, PasswordVerifierBusy
 import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 auth = Blueprint('auth', __name__)
 
 # List of valid signup codes - you can modify these as needed
 VALID_SIGNUP_CODES = ['SAVAGE2024']  # Single code for simplicity
 
+def load_token_user():
+    """The user a verified access token was issued to.
+
+    Tokens carrying role claims are authorized from the claims alone,
+    after a check against the cached revocation list; older tokens fall
+    back to loading the user. Returns None for a revoked token or a
+    missing user.
+    """
+    # Convert string ID back to integer
+    user_id = int(get_jwt_identity())
+    claims = get_jwt()
+    if has_user_claims(claims):
+        if token_revoked(user_id, claims):
+            logger.info("Rejected revoked token for user %s", user_id)
+            return None
+        return TokenUser(user_id, claims)
+    current_user = load_user_snapshot(user_id)
+    if not current_user:
+        logger.info("No user found for token identity %s", user_id)
+    return current_user
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         try:
-            # Add debug logging
-            auth_header = request.headers.get('Authorization')
-            print(f"Auth header received: {auth_header}")
-            
             verify_jwt_in_request()
-            user_id = get_jwt_identity()
-            print(f"JWT identity: {user_id}")
-            
-            # Convert string ID back to integer
-            user_id = int(user_id)
-            current_user = User.query.get(user_id)
-            
+            current_user = load_token_user()
             if not current_user:
-                print(f"No user found for id: {user_id}")
-                return jsonify({'error': 'User not found'}), 401
+                return jsonify({'error': 'Token is invalid'}), 401
                 
-            print(f"User found: {current_user.username}")
             return f(current_user, *args, **kwargs)
         except Exception as e:
-            print(f"Token validation error: {str(e)}")
+            logger.info("Token validation failed: %s", e)
             return jsonify({'error': 'Token is invalid'}), 401
             
     return decorated
@@ -46,13 +60,12 @@ def admin_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
         verify_jwt_in_request()
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
+        current_user = load_token_user()
         
         if not current_user or not current_user.is_admin():
             return jsonify({'error': 'Admin privileges required'}), 403
             
-        return fn(*args, **kwargs)
+        return fn(current_user, *args, **kwargs)
     return wrapper
 
 @auth.route('/create-admin', methods=['POST'])
@@ -130,16 +143,18 @@ def create_invitation(current_user):
     invite_link = f"{request.host_url}signup?code={invitation.code}"
     
     # Send invitation email
-    email_service = EmailService()
     try:
+        # Loaded on first use; it pulls in requests for the SendGrid API
+        from services.email_service import get_email_service
+        email_service = get_email_service()
         email_service.send_invitation(
             email=data['email'],
             invite_link=invite_link,
             expires_in_days=invitation.expires_at - datetime.utcnow()
         )
     except Exception as e:
-        print(f"Error sending invitation email: {str(e)}")
         # Don't return error here, just log it
+        logger.exception("Error sending invitation email")
     
     return jsonify({
         'message': 'Invitation sent successfully',
@@ -202,7 +217,7 @@ def signup():
         return jsonify({'message': 'User created successfully'}), 201
         
     except Exception as e:
-        print(f"Error in signup: {str(e)}")
+        logger.exception("Error in signup")
         return jsonify({'error': 'Internal server error'}), 500
 
 @auth.route('/login', methods=['GET', 'POST'])
@@ -214,18 +229,31 @@ def login():
     username = request.form.get('username')
     password = request.form.get('password')
 
-    print(f"Login attempt for username: {username}")
+    logger.debug("Login attempt for username: %s", username)
     
     if not username or not password:
         return jsonify({'error': 'Missing username or password'}), 400
 
     user = User.query.filter_by(username=username).first()
     
-    if user and user.check_password(password):
+    # Verified off the request thread with a cap on concurrent checks, so
+    # a login burst is turned away instead of starving other requests
+    verified, new_hash = False, None
+    if user:
+        try:
+            verified, new_hash = password_verifier.verify(user.password_hash, password)
+        except (PasswordVerifierBusy, TimeoutError):
+            return jsonify({'error': 'Too many logins in progress, please retry'}), 503, {'Retry-After': '1'}
+
+    if verified:
+        if new_hash:
+            # Stored with older hash settings; upgrade while we have the password
+            user.password_hash = new_hash
+            db.session.commit()
         login_user(user)
-        # Create JWT token with string identity
-        token = create_access_token(identity=str(user.id))
-        print(f"Created token for user {user.username} with ID {user.id}")
+        # JWT with string identity and the role claims the decorators authorize from
+        token = create_user_token(user)
+        logger.info("User %s (id %s) logged in", user.username, user.id)
         return jsonify({
             'message': 'Login successful',
             'token': token,
@@ -260,7 +288,7 @@ def get_users(current_user):
             'role': user.role.name if user.role else None
         } for user in users]), 200
     except Exception as e:
-        print(f"Error fetching users: {str(e)}")
+        logger.exception("Error fetching users")
         return jsonify({'error': 'Failed to fetch users'}), 500
 
 @auth.route('/roles', methods=['GET'])
@@ -273,7 +301,7 @@ def get_roles():
             'description': role.description
         } for role in roles]), 200
     except Exception as e:
-        print(f"Error fetching roles: {str(e)}")
+        logger.exception("Error fetching roles")
         return jsonify({'error': 'Failed to fetch roles'}), 500
 
 @auth.route('/users/<int:user_id>/role', methods=['PUT'])
@@ -293,7 +321,10 @@ def update_user_role(user_id):
             return jsonify({'error': 'Invalid role'}), 400
 
         user.role = role
+        revoke_user_tokens(user.id)
         db.session.commit()
+        token_revocations.invalidate()
+        invalidate_user(user.id)
 
         return jsonify({
             'message': 'User role updated successfully',
@@ -304,7 +335,7 @@ def update_user_role(user_id):
             }
         }), 200
     except Exception as e:
-        print(f"Error updating user role: {str(e)}")
+        logger.exception("Error updating user role")
         db.session.rollback()
         return jsonify({'error': 'Failed to update user role'}), 500
 
@@ -312,7 +343,6 @@ def update_user_role(user_id):
 @token_required
 def validate_token(current_user):
     try:
-        print(f"Validating token for user: {current_user.username}")
         return jsonify({
             'valid': True,
             'user': {
@@ -323,7 +353,7 @@ def validate_token(current_user):
             }
         })
     except Exception as e:
-        print(f"Error in validate_token: {str(e)}")
+        logger.exception("Error in validate_token")
         return jsonify({'error': str(e)}), 500
 
 @auth.route('/user/<int:user_id>', methods=['PUT'])
@@ -357,7 +387,11 @@ def update_user(current_user, user_id):
         if 'password' in data:
             user.set_password(data['password'])
             
+        # Outstanding tokens carry the old username and email
+        revoke_user_tokens(user.id)
         db.session.commit()
+        token_revocations.invalidate()
+        invalidate_user(user.id)
         
         return jsonify({
             'message': 'User updated successfully',
@@ -369,6 +403,6 @@ def update_user(current_user, user_id):
             }
         }), 200
     except Exception as e:
-        print(f"Error updating user: {str(e)}")
+        logger.exception("Error updating user")
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
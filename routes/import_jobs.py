@@ -0,0 +1,52 @@
+from flask import Blueprint, jsonify, request, url_for
+from models import db
+from models.import_job import ImportJob
+from services.import_job_service import get_import_runner
+
+import_jobs = Blueprint('import_jobs', __name__)
+
+@import_jobs.route('/import-jobs', methods=['POST'])
+def create_import_job():
+    try:
+        if 'file' not in request.files:
+            return jsonify({"error": "No file provided"}), 400
+
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({"error": "No file selected"}), 400
+
+        if not file.filename.endswith('.csv'):
+            return jsonify({"error": "File must be a CSV"}), 400
+
+        row_format = request.form.get('format', 'simple')
+        update_existing = request.form.get('update_existing', 'false').lower() in ('1', 'true', 'yes')
+        job = get_import_runner().create_job(file, row_format=row_format, update_existing=update_existing)
+        return jsonify({
+            "message": "Import started",
+            "job_id": job.id,
+            "status_url": url_for('import_jobs.get_import_job', job_id=job.id)
+        }), 202
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@import_jobs.route('/import-jobs/<job_id>', methods=['GET'])
+def get_import_job(job_id):
+    job = db.session.get(ImportJob, job_id)
+    if not job:
+        return jsonify({"error": "Import job not found"}), 404
+    return jsonify(job.to_dict())
+
+@import_jobs.route('/import-jobs/<job_id>/resume', methods=['POST'])
+def resume_import_job(job_id):
+    job = db.session.get(ImportJob, job_id)
+    if not job:
+        return jsonify({"error": "Import job not found"}), 404
+    try:
+        get_import_runner().resume_job(job)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(job.to_dict()), 202
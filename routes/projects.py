@@ -1,171 +1,71 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_login import current_user, login_required
 from models import db
 from models.project import Project
 from models.customer import Customer
-from services.sms_service import SMSService
-from services.email_service import EmailService
+from models.notification import NotificationOutbox
+from services.outbox_service import wake_outbox_worker
+from services.customer_service import resolve_customer
+from services.customer_autocomplete import customer_index
+from services.export_service import append_project_change, project_export_row, download_query, stream_projects_csv
+from services.history_export import history_query, stream_ndjson
+from services.analytics_service import apply_stat_changes, project_stat_keys, analytics_cache
+from services.project_feed import feed_query, feed_row_to_dict, fetch_page, stream_json_array, parse_date, decode_cursor
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 import uuid
+import logging
 from routes.auth import token_required
-import csv
-import io
-import os
+
+logger = logging.getLogger(__name__)
 
 projects_bp = Blueprint('projects', __name__)
 
 @projects_bp.route('/<region>', methods=['GET'])
 def get_projects(region):
     try:
-        print(f"Getting projects for region: {region}")
-        # Use subquery to ensure we get unique projects
-        subquery = db.session.query(Project.id).filter_by(region=region).group_by(Project.id).subquery()
-        projects = Project.query.filter(Project.id.in_(subquery)).order_by(Project.date).all()
-        print(f"Found {len(projects)} projects")
-        
-        project_list = []
-        seen_ids = set()  # Extra safety check
-        
-        for project in projects:
-            if project.id not in seen_ids:  # Extra safety check
-                seen_ids.add(project.id)
-                print(f"Project {project.id}: Found customer {project.customer.name if project.customer else 'Unknown'}")
-                
-                project_dict = {
-                    'id': project.id,
-                    'date': project.date.strftime('%Y-%m-%d'),
-                    'po': project.po,
-                    'customer_name': project.customer.name if project.customer else "Unknown",
-                    'customer_phone': project.customer.phone if project.customer else "",
-                    'customer_email': project.customer.email if project.customer else "",
-                    'address': project.address,
-                    'city': project.city,
-                    'subdivision': project.subdivision,
-                    'lot_number': project.lot_number,
-                    'square_footage': project.square_footage,
-                    'job_cost_type': project.job_cost_type.split(',') if project.job_cost_type else [],
-                    'work_type': project.work_type.split(',') if project.work_type else [],
-                    'notes': project.notes,
-                    'region': project.region
-                }
-                project_list.append(project_dict)
-        
-        print(f"Returning {len(project_list)} unique projects")
-        return jsonify(project_list)
-    except Exception as e:
-        print(f"Error getting projects: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        try:
+            start = parse_date(request.args.get('start'))
+            end = parse_date(request.args.get('end'))
+            work_type = request.args.get('work_type')
+            job_cost_type = request.args.get('job_cost_type')
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+            limit = request.args.get('limit', type=int)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-def export_region_projects(region):
-    try:
-        # Get all projects for the specific region
-        projects = Project.query.filter_by(region=region).all()
-        
-        # Create export directory if it doesn't exist
-        export_dir = 'exports'
-        if not os.path.exists(export_dir):
-            os.makedirs(export_dir)
-        
-        # Fixed filename for each region
-        filepath = os.path.join(export_dir, f'projects_{region}.csv')
-        
-        # Check if file exists to determine if we need to write headers
-        file_exists = os.path.exists(filepath)
-        
-        # Open file in append mode
-        with open(filepath, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            
-            # Write header only if file is new
-            if not file_exists:
-                writer.writerow([
-                    'Project ID',
-                    'Customer Name',
-                    'Customer Email',
-                    'Customer Phone',
-                    'Date',
-                    'PO',
-                    'Address',
-                    'City',
-                    'Subdivision',
-                    'Lot Number',
-                    'Square Footage',
-                    'Job Cost Type',
-                    'Work Type',
-                    'Notes',
-                    'Created At',
-                    'Updated At'
-                ])
-            
-            # Write only the most recently added project
-            latest_project = projects[-1] if projects else None
-            if latest_project:
-                writer.writerow([
-                    latest_project.id,
-                    latest_project.customer.name if latest_project.customer else 'N/A',
-                    latest_project.customer.email if latest_project.customer else 'N/A',
-                    latest_project.customer.phone if latest_project.customer else 'N/A',
-                    latest_project.date.strftime('%Y-%m-%d'),
-                    latest_project.po or 'N/A',
-                    latest_project.address,
-                    latest_project.city or 'N/A',
-                    latest_project.subdivision or 'N/A',
-                    latest_project.lot_number or 'N/A',
-                    latest_project.square_footage or 'N/A',
-                    latest_project.job_cost_type or 'N/A',
-                    latest_project.work_type or 'N/A',
-                    latest_project.notes or 'N/A',
-                    latest_project.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    latest_project.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-            
-        print(f"Added new project to {filepath}")
-        
+        # One joined, column-projected query; rows are serialized as they are read
+        query = feed_query(region, start=start, end=end, after=after,
+                           work_type=work_type, job_cost_type=job_cost_type)
+        if limit:
+            rows, next_cursor = fetch_page(query, limit)
+            response = jsonify([feed_row_to_dict(row) for row in rows])
+            if next_cursor:
+                response.headers['X-Next-Cursor'] = next_cursor
+            return response
+        return Response(stream_with_context(stream_json_array(query)), mimetype='application/json')
     except Exception as e:
-        print(f"Error exporting {region} projects: {str(e)}")
+        logger.exception("Error getting projects for %s", region)
+        return jsonify({"error": str(e)}), 500
 
 @projects_bp.route('/<region>', methods=['POST'])
 def create_project(region):
     try:
-        print(f"\n=== Creating Project in {region} Region ===")
         project_data = request.json
-        print(f"Project data received:")
-        print(f"  Work Types: {project_data.get('work_type', [])}")
-        print(f"  Job Cost Types: {project_data.get('job_cost_type', [])}")
-        
-        # Check if customer already exists
-        customer = Customer.query.filter_by(
-            phone=project_data['customer_phone']
-        ).first()
         
-        # Create new customer if:
-        # 1. Customer doesn't exist, or
-        # 2. Customer exists but has a different name
-        if not customer or customer.name != project_data['customer_name']:
-            print(f"Creating new customer: {project_data['customer_name']}")
-            customer = Customer(
-                name=project_data['customer_name'],
-                phone=project_data['customer_phone'],
-                email=project_data.get('customer_email')
+        # One unique-index probe on the normalized number; an existing
+        # customer keeps its record and picks up the submitted name and email
+        try:
+            customer, created = resolve_customer(
+                project_data['customer_name'],
+                project_data['customer_phone'],
+                project_data.get('customer_email')
             )
-            db.session.add(customer)
-            db.session.flush()
-        else:
-            print(f"Found existing customer: {customer.name}")
-            # Only update email if provided and different
-            if project_data.get('customer_email') and project_data.get('customer_email') != customer.email:
-                customer.email = project_data.get('customer_email')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         # Create new project
-        work_type_str = ','.join(project_data.get('work_type', []))
-        job_cost_type_str = ','.join(project_data.get('job_cost_type', []))
-        
-        print("\nCreating project with types:")
-        print(f"  Work Types (raw): {project_data.get('work_type', [])}")
-        print(f"  Work Types (joined): {work_type_str}")
-        print(f"  Job Cost Types (raw): {project_data.get('job_cost_type', [])}")
-        print(f"  Job Cost Types (joined): {job_cost_type_str}")
-        
         project = Project(
             id=str(uuid.uuid4()),
             date=datetime.strptime(project_data['date'], '%Y-%m-%d').date(),
@@ -175,59 +75,53 @@ def create_project(region):
             subdivision=project_data.get('subdivision'),
             lot_number=project_data.get('lot_number'),
             square_footage=project_data.get('square_footage'),
-            job_cost_type=job_cost_type_str,
-            work_type=work_type_str,
             notes=project_data.get('notes'),
             region=region,
             customer_id=customer.id
         )
+        project.set_types(project_data.get('work_type', []), project_data.get('job_cost_type', []))
         
         db.session.add(project)
-        db.session.commit()
-        print(f"\nCreated project with ID: {project.id}")
-        
-        # Send email confirmation if customer has email
+        apply_stat_changes(added_keys=project_stat_keys(project))
+
+        # Queue customer notifications in the same transaction as the project;
+        # the outbox worker delivers them after the response has gone out
         if customer.email:
-            try:
-                print(f"Attempting to send email to {customer.email}")
-                email_service = EmailService()
-                email_service.send_project_confirmation(
-                    customer_email=customer.email,
-                    customer_name=customer.name,
-                    project_date=project_data['date'],
-                    address=project_data['address'],
-                    work_type=project_data.get('work_type', []),
-                    job_cost_type=project_data.get('job_cost_type', []),
-                    city=project_data.get('city'),
-                    subdivision=project_data.get('subdivision'),
-                    lot_number=project_data.get('lot_number'),
-                    square_footage=project_data.get('square_footage'),
-                    notes=project_data.get('notes'),
-                    customer_phone=project_data.get('customer_phone'),
-                    region=region
-                )
-            except Exception as e:
-                print(f"Error sending email: {str(e)}")
-        
-        # Schedule SMS notification
-        sms_service = SMSService()
-        try:
-            print(f"Attempting to send SMS to {customer.phone}")
-            sms_service.schedule_project_notification(
-                phone_number=customer.phone,
+            NotificationOutbox.enqueue(
+                'project_confirmation',
+                customer_email=customer.email,
                 customer_name=customer.name,
                 project_date=project_data['date'],
-                address=project_data['address']
+                address=project_data['address'],
+                work_type=project_data.get('work_type', []),
+                job_cost_type=project_data.get('job_cost_type', []),
+                city=project_data.get('city'),
+                subdivision=project_data.get('subdivision'),
+                lot_number=project_data.get('lot_number'),
+                square_footage=project_data.get('square_footage'),
+                notes=project_data.get('notes'),
+                customer_phone=project_data.get('customer_phone'),
+                region=region
             )
-        except Exception as e:
-            print(f"Error sending SMS: {str(e)}")
-            # Don't fail the request if SMS fails
+        NotificationOutbox.enqueue(
+            'project_sms',
+            phone_number=customer.phone,
+            customer_name=customer.name,
+            project_date=project_data['date'],
+            address=project_data['address']
+        )
+
+        db.session.commit()
+        analytics_cache.invalidate()
+        customer_index.add_customer(customer)
+        wake_outbox_worker()
+        logger.info("Created project %s in %s", project.id, region)
         
-        # Export project to CSV
+        # Append the new project to the region's CSV change log
         try:
-            export_region_projects(region)
+            append_project_change(region, 'created', project_id=project.id)
         except Exception as e:
-            print(f"Error exporting project: {str(e)}")
+            logger.exception("Error exporting project %s", project.id)
         
         return jsonify({
             'message': 'Project created successfully',
@@ -240,7 +134,7 @@ def create_project(region):
         })
         
     except Exception as e:
-        print(f"Error creating project: {str(e)}")
+        logger.exception("Error creating project in %s", region)
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -267,34 +161,31 @@ def get_project(region, project_id):
             "subdivision": project.subdivision,
             "lot_number": project.lot_number,
             "square_footage": project.square_footage,
-            "job_cost_type": project.job_cost_type.split(',') if project.job_cost_type else [],
-            "work_type": project.work_type.split(',') if project.work_type else [],
+            "job_cost_type": project.job_cost_type_names,
+            "work_type": project.work_type_names,
             "notes": project.notes,
             "region": project.region
         }
         return jsonify(project_dict)
     except Exception as e:
-        print(f"Error getting project: {str(e)}")
+        logger.exception("Error getting project %s", project_id)
         return jsonify({"error": str(e)}), 500
 
 @projects_bp.route('/<region>/<project_id>', methods=['PUT'])
 @token_required
 def update_project(current_user, region, project_id):
     try:
-        print(f"Received update request for project {project_id} in region {region}")
         project_data = request.json
-        print(f"Update data received: {project_data}")
         
         project = Project.query.get(project_id)
         if not project:
-            print(f"Project {project_id} not found")
             return jsonify({"error": "Project not found"}), 404
         
         if project.region != region:
-            print(f"Project {project_id} belongs to region {project.region}, not {region}")
             return jsonify({"error": "Project does not belong to this region"}), 400
 
         # Update project details
+        old_stat_keys = project_stat_keys(project)
         try:
             project.date = datetime.strptime(project_data['date'], '%Y-%m-%d').date()
             project.po = project_data.get('po')
@@ -303,85 +194,65 @@ def update_project(current_user, region, project_id):
             project.subdivision = project_data.get('subdivision')
             project.lot_number = project_data.get('lot_number')
             project.square_footage = project_data.get('square_footage')
-            project.job_cost_type = ','.join(project_data.get('job_cost_type', []))
-            project.work_type = ','.join(project_data.get('work_type', []))
+            project.set_types(project_data.get('work_type', []), project_data.get('job_cost_type', []))
             project.notes = project_data.get('notes')
-            print(f"Updated project details for {project_id}")
         except KeyError as e:
-            print(f"Missing required field: {str(e)}")
             return jsonify({"error": f"Missing required field: {str(e)}"}), 400
         except Exception as e:
-            print(f"Error updating project details: {str(e)}")
+            logger.exception("Error updating project details for %s", project_id)
             return jsonify({"error": f"Error updating project details: {str(e)}"}), 500
+        apply_stat_changes(removed_keys=old_stat_keys, added_keys=project_stat_keys(project))
 
         # Handle customer updates
         try:
-            current_customer = Customer.query.get(project.customer_id)
-            
-            # If customer name or phone has changed, create a new customer
-            if (current_customer.name != project_data['customer_name'] or 
-                current_customer.phone != project_data['customer_phone']):
-                print(f"Customer details changed, creating new customer record")
-                new_customer = Customer(
-                    name=project_data['customer_name'],
-                    phone=project_data['customer_phone'],
-                    email=project_data.get('customer_email')
-                )
-                db.session.add(new_customer)
-                db.session.flush()  # Get the new customer ID
-                project.customer_id = new_customer.id
-                customer = new_customer
-            else:
-                # Only update email if it changed
-                if project_data.get('customer_email') and project_data['customer_email'] != current_customer.email:
-                    current_customer.email = project_data['customer_email']
-                customer = current_customer
-                
-            print(f"Updated customer details for project {project_id}")
+            # A changed number points the project at that number's customer;
+            # name and email changes update the customer record in place
+            customer, created = resolve_customer(
+                project_data['customer_name'],
+                project_data['customer_phone'],
+                project_data.get('customer_email')
+            )
+            project.customer_id = customer.id
         except KeyError as e:
-            print(f"Missing required customer field: {str(e)}")
             return jsonify({"error": f"Missing required customer field: {str(e)}"}), 400
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
-            print(f"Error updating customer details: {str(e)}")
+            logger.exception("Error updating customer details for project %s", project_id)
             return jsonify({"error": f"Error updating customer details: {str(e)}"}), 500
 
-        # Send update email if customer has email
+        # Queue the update email; it is only sent if this transaction commits
         if customer and customer.email:
-            email_service = EmailService()
-            try:
-                print(f"Attempting to send update email to {customer.email}")
-                email_service.send_project_update(
-                    customer_email=customer.email,
-                    customer_name=customer.name,
-                    project_date=project_data['date'],
-                    address=project_data['address'],
-                    customer_phone=customer.phone,
-                    po=project_data.get('po'),
-                    city=project_data.get('city'),
-                    subdivision=project_data.get('subdivision'),
-                    lot_number=project_data.get('lot_number'),
-                    square_footage=project_data.get('square_footage'),
-                    job_cost_type=project_data.get('job_cost_type', []),
-                    work_type=project_data.get('work_type', []),
-                    notes=project_data.get('notes'),
-                    region=region
-                )
-                print("Update email sent successfully")
-            except Exception as e:
-                print(f"Error sending update email: {str(e)}")
-                # Don't return error here, just log it
+            NotificationOutbox.enqueue(
+                'project_update',
+                customer_email=customer.email,
+                customer_name=customer.name,
+                project_date=project_data['date'],
+                address=project_data['address'],
+                customer_phone=customer.phone,
+                po=project_data.get('po'),
+                city=project_data.get('city'),
+                subdivision=project_data.get('subdivision'),
+                lot_number=project_data.get('lot_number'),
+                square_footage=project_data.get('square_footage'),
+                job_cost_type=project_data.get('job_cost_type', []),
+                work_type=project_data.get('work_type', []),
+                notes=project_data.get('notes'),
+                region=region
+            )
 
         try:
             db.session.commit()
-            print(f"Successfully committed updates for project {project_id}")
+            analytics_cache.invalidate()
+            customer_index.add_customer(customer)
+            wake_outbox_worker()
+            logger.info("Updated project %s in %s", project_id, region)
             
-            # Export updated projects to CSV after update
+            # Append the updated project to the region's CSV change log
             try:
-                print(f"Exporting projects for region {region} to CSV...")
-                export_region_projects(region)
-                print("CSV export completed successfully")
+                append_project_change(region, 'updated', project_id=project_id)
             except Exception as e:
-                print(f"Warning: Failed to export to CSV: {str(e)}")
+                logger.exception("Failed to export project %s to CSV", project_id)
             
             return jsonify({
                 "message": "Project updated successfully",
@@ -397,20 +268,20 @@ def update_project(current_user, region, project_id):
                     "subdivision": project.subdivision,
                     "lot_number": project.lot_number,
                     "square_footage": project.square_footage,
-                    "job_cost_type": project.job_cost_type.split(',') if project.job_cost_type else [],
-                    "work_type": project.work_type.split(',') if project.work_type else [],
+                    "job_cost_type": project.job_cost_type_names,
+                    "work_type": project.work_type_names,
                     "notes": project.notes,
                     "region": project.region
                 }
             })
         except Exception as e:
             db.session.rollback()
-            print(f"Error committing updates: {str(e)}")
+            logger.exception("Error committing updates for project %s", project_id)
             return jsonify({"error": f"Error saving updates: {str(e)}"}), 500
             
     except Exception as e:
         db.session.rollback()
-        print(f"Unexpected error updating project: {str(e)}")
+        logger.exception("Unexpected error updating project %s", project_id)
         return jsonify({"error": str(e)}), 500
 
 @projects_bp.route('/<project_id>', methods=['DELETE'])
@@ -425,98 +296,86 @@ def delete_project(current_user, project_id):
         region = project.region
         customer_id = project.customer_id
         
+        # Snapshot the exported row while the project and customer still exist
+        export_row = project_export_row(project)
+
         # Delete the project
+        apply_stat_changes(removed_keys=project_stat_keys(project))
         db.session.delete(project)
         
         # Check if customer has any other projects
         other_projects = Project.query.filter_by(customer_id=customer_id).count()
+        customer_deleted = False
         if other_projects == 0:
             # If this was the customer's only project, delete the customer too
             customer = Customer.query.get(customer_id)
             if customer:
                 db.session.delete(customer)
+                customer_deleted = True
         
         db.session.commit()
+        analytics_cache.invalidate()
+        if customer_deleted:
+            customer_index.remove(customer_id)
 
-        # Export updated projects to CSV after deletion
+        # Record the deletion in the region's CSV change log
         try:
-            print(f"Exporting projects for region {region} to CSV...")
-            export_region_projects(region)
-            print("CSV export completed successfully")
+            append_project_change(region, 'deleted', row=export_row)
         except Exception as e:
-            print(f"Warning: Failed to export to CSV: {str(e)}")
+            logger.exception("Failed to export deletion of project %s to CSV", project_id)
+        logger.info("Deleted project %s from %s", project_id, region)
         
         return jsonify({"message": "Project deleted successfully"})
     except Exception as e:
         db.session.rollback()
-        print(f"Error deleting project: {str(e)}")
+        logger.exception("Error deleting project %s", project_id)
         return jsonify({"error": str(e)}), 500
 
 @projects_bp.route('/export', methods=['GET'])
 def export_projects():
     try:
-        # Get all projects with their customer information
-        projects = Project.query.all()
-        
-        # Create a StringIO object to write CSV data
-        si = io.StringIO()
-        writer = csv.writer(si)
-        
-        # Write header
-        writer.writerow([
-            'Project ID',
-            'Customer Name',
-            'Customer Email',
-            'Date',
-            'Region',
-            'Description',
-            'Work Type',
-            'Status',
-            'Created At',
-            'Updated At'
-        ])
-        
-        # Write data
-        for project in projects:
-            writer.writerow([
-                project.id,
-                project.customer.name if project.customer else 'N/A',
-                project.customer.email if project.customer else 'N/A',
-                project.date.strftime('%Y-%m-%d'),
-                project.region,
-                project.description,
-                project.work_type,
-                project.status,
-                project.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                project.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-        
-        # Create the response
-        output = si.getvalue()
-        si.close()
-        
-        return send_file(
-            io.BytesIO(output.encode('utf-8')),
+        try:
+            region = request.args.get('region')
+            start = parse_date(request.args.get('start'))
+            end = parse_date(request.args.get('end'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        export_format = request.args.get('format', 'csv')
+        if export_format not in ('csv', 'ndjson'):
+            return jsonify({"error": "format must be csv or ndjson"}), 400
+
+        # Streamed straight from the cursor; nothing is buffered beyond one batch
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if export_format == 'ndjson':
+            # Typed rows (nulls, type lists) for warehouse loads
+            query = history_query(region=region, start=start, end=end)
+            return Response(
+                stream_with_context(stream_ndjson(query)),
+                mimetype='application/x-ndjson',
+                headers={'Content-Disposition': f'attachment; filename=projects_export_{timestamp}.ndjson'}
+            )
+        query = download_query(region=region, start=start, end=end)
+        filename = f'projects_export_{timestamp}.csv'
+        return Response(
+            stream_with_context(stream_projects_csv(query)),
             mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'projects_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
         
     except Exception as e:
+        logger.exception("Error exporting projects")
         return jsonify({'error': str(e)}), 500
 
 @projects_bp.route('/<region>/latest', methods=['GET'])
 def get_latest_project(region):
     try:
-        print(f"Getting latest project for region: {region}")
         # Get the most recent project for the region
         project = Project.query.filter_by(region=region).order_by(Project.created_at.desc()).first()
         
         if not project:
             return jsonify({"error": "No projects found"}), 404
-            
-        print(f"Found latest project {project.id}")
-        
+
+
         project_dict = {
             'id': project.id,
             'date': project.date.strftime('%Y-%m-%d'),
@@ -529,22 +388,20 @@ def get_latest_project(region):
             'subdivision': project.subdivision,
             'lot_number': project.lot_number,
             'square_footage': project.square_footage,
-            'job_cost_type': project.job_cost_type.split(',') if project.job_cost_type else [],
-            'work_type': project.work_type.split(',') if project.work_type else [],
+            'job_cost_type': project.job_cost_type_names,
+            'work_type': project.work_type_names,
             'notes': project.notes,
             'region': project.region
         }
-        
-        print(f"Returning latest project data")
+
         return jsonify(project_dict)
     except Exception as e:
-        print(f"Error getting latest project: {str(e)}")
+        logger.exception("Error getting latest project for %s", region)
         return jsonify({"error": str(e)}), 500
 
 @projects_bp.route('/<region>/date/<date>', methods=['GET'])
 def get_projects_by_date(region, date):
     try:
-        print(f"Getting projects for region {region} on date {date}")
         # Parse the date string to a datetime object
         target_date = datetime.strptime(date, '%Y-%m-%d').date()
         
@@ -552,13 +409,11 @@ def get_projects_by_date(region, date):
         projects = Project.query.filter_by(
             region=region,
             date=target_date
-        ).all()
+        ).options(joinedload(Project.customer)).all()
         
-        print(f"Found {len(projects)} projects")
         project_list = []
         
         for project in projects:
-            print(f"Processing project {project.id}")
             project_dict = {
                 'id': project.id,
                 'date': project.date.strftime('%Y-%m-%d'),
@@ -571,17 +426,16 @@ def get_projects_by_date(region, date):
                 'subdivision': project.subdivision,
                 'lot_number': project.lot_number,
                 'square_footage': project.square_footage,
-                'job_cost_type': project.job_cost_type.split(',') if project.job_cost_type else [],
-                'work_type': project.work_type.split(',') if project.work_type else [],
+                'job_cost_type': project.job_cost_type_names,
+                'work_type': project.work_type_names,
                 'notes': project.notes,
                 'region': project.region
             }
             project_list.append(project_dict)
-        
-        print(f"Returning {len(project_list)} projects")
+
         return jsonify(project_list)
     except Exception as e:
-        print(f"Error getting projects by date: {str(e)}")
+        logger.exception("Error getting projects for %s on %s", region, date)
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
@@ -3,6 +3,11 @@ from flask_login import current_user
 from models.user import User, Role, ROLES, PERMISSIONS
 from models import db
 from routes.auth import token_required
+from services.token_service import revoke_user_tokens, token_revocations
+from services.user_cache import invalidate_user
+import logging
+
+logger = logging.getLogger(__name__)
 
 user_management = Blueprint('user_management', __name__)
 
@@ -28,12 +33,8 @@ def get_users(current_user):
     if not current_user.is_admin():
         return jsonify({'error': 'Admin privileges required'}), 403
         
-    print("GET /users endpoint called")
-    print(f"Current user: {current_user}")
-    
     try:
         users = User.query.all()
-        print(f"Found {len(users)} users")
         user_list = [{
             'id': user.id,
             'username': user.username,
@@ -45,21 +46,15 @@ def get_users(current_user):
         if not user_list:
             # Return an empty list instead of an error when there are no other users
             return jsonify([])
-            
-        print(f"Returning user list: {user_list}")
+
         return jsonify(user_list)
     except Exception as e:
-        print(f"Error in get_users: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in get_users")
         return jsonify({'error': str(e)}), 500
 
 @user_management.route('/user/<int:user_id>/role', methods=['PUT'], endpoint='update_role')
 @admin_required
 def update_user_role(current_user, user_id):
-    print(f"PUT /user/{user_id}/role endpoint called")
-    print(f"Current user: {current_user}")
-    
     data = request.get_json()
     if not data or 'role' not in data:
         return jsonify({'error': 'Role must be specified'}), 400
@@ -74,18 +69,19 @@ def update_user_role(current_user, user_id):
             return jsonify({'error': 'Invalid role'}), 400
             
         user.role = role
+        revoke_user_tokens(user.id)
         db.session.commit()
+        token_revocations.invalidate()
+        invalidate_user(user_id)
+        logger.info("User %s set role of user %s to %s", current_user.id, user_id, role.name)
         return jsonify({'message': 'User role updated successfully'})
     except Exception as e:
-        print(f"Error in update_user_role: {str(e)}")
+        logger.exception("Error in update_user_role")
         return jsonify({'error': str(e)}), 500
 
 @user_management.route('/user/<int:user_id>/status', methods=['PUT'], endpoint='update_status')
 @admin_required
 def update_user_status(current_user, user_id):
-    print(f"PUT /user/{user_id}/status endpoint called")
-    print(f"Current user: {current_user}")
-    
     data = request.get_json()
     if not data or 'is_active' not in data:
         return jsonify({'error': 'Active status must be specified'}), 400
@@ -96,40 +92,35 @@ def update_user_status(current_user, user_id):
             return jsonify({'error': 'User not found'}), 404
             
         user.is_active = data['is_active']
+        revoke_user_tokens(user.id)
         db.session.commit()
+        token_revocations.invalidate()
+        invalidate_user(user_id)
+        logger.info("User %s set is_active of user %s to %s", current_user.id, user_id, user.is_active)
         return jsonify({'message': 'User status updated successfully'})
     except Exception as e:
-        print(f"Error in update_user_status: {str(e)}")
+        logger.exception("Error in update_user_status")
         return jsonify({'error': str(e)}), 500
 
 @user_management.route('/roles', methods=['GET'], endpoint='list_roles')
 @admin_required
 def get_roles(current_user):
-    print("GET /roles endpoint called")
-    print(f"Current user: {current_user}")
-    print(f"Is authenticated: {current_user.is_authenticated}")
-    
     try:
         roles = Role.query.all()
-        print(f"Found {len(roles)} roles")
         role_list = [{
             'name': role.name,
             'description': role.description,
             'permissions': role.permissions,
             'display_name': ROLES[role.name]['display_name'] if role.name in ROLES else role.name.title()
         } for role in roles]
-        print(f"Returning role list: {role_list}")
         return jsonify(role_list)
     except Exception as e:
-        print(f"Error in get_roles: {str(e)}")
+        logger.exception("Error in get_roles")
         return jsonify({'error': str(e)}), 500
 
 @user_management.route('/user/<int:user_id>', methods=['DELETE'], endpoint='delete_user')
 @admin_required
 def delete_user(current_user, user_id):
-    print(f"DELETE /user/{user_id} endpoint called")
-    print(f"Current user: {current_user}")
-    
     try:
         user = User.query.get(user_id)
         if not user:
@@ -140,8 +131,12 @@ def delete_user(current_user, user_id):
             return jsonify({'error': 'Cannot delete your own account'}), 400
             
         db.session.delete(user)
+        revoke_user_tokens(user.id)
         db.session.commit()
+        token_revocations.invalidate()
+        invalidate_user(user_id)
+        logger.info("User %s deleted user %s", current_user.id, user_id)
         return jsonify({'message': 'User deleted successfully'})
     except Exception as e:
-        print(f"Error in delete_user: {str(e)}")
+        logger.exception("Error in delete_user")
         return jsonify({'error': str(e)}), 500 
\ No newline at end of file
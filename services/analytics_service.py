@@ -0,0 +1,156 @@
+from datetime import datetime
+from collections import Counter
+from sqlalchemy import text, bindparam, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from models import db
+from models.project_daily_stat import ProjectDailyStat
+from models.cache_generation import CacheGeneration
+from models.project_type import clean_type_names, project_work_types, project_job_cost_types
+from services.cache import TTLCache
+from config import Config
+
+# Regions reported on the analytics dashboard, keyed by their response name
+REGIONS = {'North': 'north', 'South': 'south'}
+
+# Dashboard responses; cleared by every project write in this process.
+# Keys carry the shared generation, so writes by other processes retire
+# entries too (see analytics_generation()).
+analytics_cache = TTLCache(maxsize=Config.ANALYTICS_CACHE_SIZE, ttl=Config.ANALYTICS_CACHE_TTL)
+
+# CacheGeneration row bumped whenever the daily rollup changes
+ANALYTICS_GENERATION = 'analytics'
+
+# Analytics read the daily rollup, so a year view sums at most a few
+# hundred small rows per region instead of touching every project.
+TYPE_COUNTS_SQL = text("""
+    SELECT region, type_kind, type_value, SUM(count) AS total
+    FROM project_daily_stats
+    WHERE region IN :regions AND date BETWEEN :start AND :end
+    GROUP BY region, type_kind, type_value
+    HAVING SUM(count) > 0
+    ORDER BY region, type_kind, total DESC, type_value
+""").bindparams(
+    bindparam('regions', expanding=True),
+    bindparam('start', type_=db.Date),
+    bindparam('end', type_=db.Date),
+)
+
+# Recomputes the rollup from the association tables in one statement
+REBUILD_STATS_SQL = text("""
+    INSERT INTO project_daily_stats (region, date, type_kind, type_value, count)
+    SELECT p.region, p.date, 'work_type', t.name, COUNT(*)
+    FROM project p
+    JOIN project_work_types pt ON pt.project_id = p.id
+    JOIN work_types t ON t.id = pt.work_type_id
+    GROUP BY p.region, p.date, t.name
+    UNION ALL
+    SELECT p.region, p.date, 'job_cost_type', t.name, COUNT(*)
+    FROM project p
+    JOIN project_job_cost_types pt ON pt.project_id = p.id
+    JOIN job_cost_types t ON t.id = pt.job_cost_type_id
+    GROUP BY p.region, p.date, t.name
+""")
+
+def _as_date(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+def empty_stats():
+    return {
+        'work_type': {'labels': [], 'values': []},
+        'job_cost_type': {'labels': [], 'values': []}
+    }
+
+def get_type_counts(start_date, end_date):
+    """Work type and job cost type counts for every region in one query.
+
+    Returns {'north': {...}, 'south': {...}} in the shape the analytics
+    dashboard charts expect.
+    """
+    result = {key: empty_stats() for key in REGIONS.values()}
+    rows = db.session.execute(TYPE_COUNTS_SQL, {
+        'regions': list(REGIONS),
+        'start': _as_date(start_date),
+        'end': _as_date(end_date),
+    })
+    for region, kind, value, total in rows:
+        stats = result[REGIONS[region]][kind]
+        stats['labels'].append(value)
+        stats['values'].append(total)
+    return result
+
+def analytics_generation():
+    """The rollup's current generation, as committed by any process."""
+    generation = (
+        db.session.query(CacheGeneration.generation)
+        .filter_by(name=ANALYTICS_GENERATION)
+        .scalar()
+    )
+    return generation or 0
+
+def bump_analytics_generation():
+    """Advance the rollup's generation inside the caller's transaction."""
+    table = CacheGeneration.__table__
+    stmt = insert(table).values(name=ANALYTICS_GENERATION, generation=1)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'generation': table.c.generation + 1}
+    ))
+
+def project_stat_keys(project):
+    """Rollup keys a project contributes to, from its current type columns."""
+    keys = [(project.region, project.date, 'work_type', name)
+            for name in clean_type_names(project.work_type)]
+    keys += [(project.region, project.date, 'job_cost_type', name)
+             for name in clean_type_names(project.job_cost_type)]
+    return keys
+
+def apply_stat_changes(removed_keys=(), added_keys=()):
+    """Adjust the daily rollup inside the caller's transaction.
+
+    Call with the project's keys from before and after a write; keys that
+    appear on both sides cancel out and are not touched.
+    """
+    deltas = Counter(added_keys)
+    deltas.subtract(Counter(removed_keys))
+    rows = [
+        {'region': region, 'date': day, 'type_kind': kind, 'type_value': value, 'count': delta}
+        for (region, day, kind, value), delta in deltas.items() if delta
+    ]
+    if not rows:
+        return
+    table = ProjectDailyStat.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['region', 'date', 'type_kind', 'type_value'],
+        set_={'count': table.c.count + stmt.excluded.count}
+    )
+    db.session.execute(stmt, rows)
+    bump_analytics_generation()
+
+    # Drop keys that no longer have any projects so the rollup stays small
+    decremented = [key for key, delta in deltas.items() if delta < 0]
+    if decremented:
+        db.session.execute(
+            table.delete()
+            .where(tuple_(table.c.region, table.c.date, table.c.type_kind, table.c.type_value).in_(decremented))
+            .where(table.c.count <= 0)
+        )
+
+def daily_stats_pending():
+    """True when the rollup is empty although projects have types, e.g. right after an upgrade."""
+    if db.session.query(ProjectDailyStat.region).first() is not None:
+        return False
+    return any(db.session.query(table.c.project_id).first() is not None
+               for table in (project_work_types, project_job_cost_types))
+
+def rebuild_daily_stats():
+    """Repair the rollup by recomputing it from the project tables."""
+    ProjectDailyStat.query.delete(synchronize_session=False)
+    db.session.execute(REBUILD_STATS_SQL)
+    bump_analytics_generation()
+    db.session.commit()
+    return ProjectDailyStat.query.count()
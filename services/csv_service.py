@@ -1,56 +1,153 @@
 import csv
+import io
+import logging
+from itertools import islice
+from sqlalchemy.dialects.sqlite import insert
 from models import db
-from models.customer import Customer
+from models.customer import Customer, normalize_phone
+from services.customer_autocomplete import customer_index
 
-def import_customers_from_csv(csv_path):
+logger = logging.getLogger(__name__)
+
+# Rows read, matched and written per round trip
+DEFAULT_CHUNK_SIZE = 1000
+
+# Columns written by the importers, in a fixed order so every chunk can be
+# sent as a single executemany
+IMPORT_COLUMNS = ('name', 'first_name', 'last_name', 'phone', 'phone_e164', 'email')
+
+def map_customer_list_row(row):
+    """Map a cust_list.csv row (Customer, First_Name, Last_Name, Phone, Main_Email)."""
+    phone = (row.get('Phone') or '').strip()
+    if not phone:
+        return None
+    first_name = (row.get('First_Name') or '').strip()
+    last_name = (row.get('Last_Name') or '').strip()
+    name = (row.get('Customer') or '').strip() or f"{first_name} {last_name}".strip()
+    return {
+        'name': name,
+        'first_name': first_name,
+        'last_name': last_name,
+        'phone': phone,
+        'email': (row.get('Main_Email') or '').strip()
+    }
+
+def map_simple_row(row):
+    """Map an upload row with lowercase name, phone and email columns."""
+    phone = (row.get('phone') or '').strip()
+    if not phone:
+        return None
+    return {
+        'name': row.get('name'),
+        'first_name': None,
+        'last_name': None,
+        'phone': phone,
+        'email': row.get('email')
+    }
+
+def iter_upload_rows(stream, encoding='utf-8'):
+    """Yield CSV dict rows from a binary upload stream, decoding incrementally.
+
+    The stream is wrapped rather than read, so only one buffer of text is
+    held at a time no matter how large the upload is. The wrapper is
+    detached afterwards to leave closing the stream to its owner.
+    """
+    text = io.TextIOWrapper(stream, encoding=encoding, newline='')
+    try:
+        for row in csv.DictReader(text):
+            yield row
+    finally:
+        text.detach()
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def bulk_import_customers(rows, row_mapper, update_existing=True, chunk_size=DEFAULT_CHUNK_SIZE, on_chunk=None):
+    """Import customer rows in chunks, matching existing customers by phone.
+
+    Rows are keyed on their normalized (E.164) number. Each chunk costs one
+    IN query on the unique phone_e164 index, used to tell inserts from
+    updates, and one INSERT .. ON CONFLICT(phone_e164) executemany that
+    updates known customers in place, or leaves them alone with
+    update_existing=False. Rows the mapper rejects, numbers that can't be
+    normalized, and repeats of a number within a chunk count as skipped.
+    on_chunk(result) runs just before each chunk commits, so progress
+    written to the session lands atomically with the rows it describes.
+    """
+    result = {'rows': 0, 'inserted': 0, 'updated': 0, 'skipped': 0}
+    table = Customer.__table__
+    upsert = insert(table)
+    if update_existing:
+        upsert = upsert.on_conflict_do_update(
+            index_elements=['phone_e164'],
+            set_={column: upsert.excluded[column] for column in IMPORT_COLUMNS if column != 'phone_e164'}
+        )
+    else:
+        upsert = upsert.on_conflict_do_nothing(index_elements=['phone_e164'])
+
+    for chunk in _chunks(rows, chunk_size):
+        records = {}
+        for row in chunk:
+            result['rows'] += 1
+            record = row_mapper(row)
+            phone_e164 = normalize_phone(record['phone']) if record else None
+            if not phone_e164:
+                result['skipped'] += 1
+                continue
+            if phone_e164 in records:
+                # The first row for a number wins, as with rows from earlier chunks
+                result['skipped'] += 1
+                continue
+            record['phone_e164'] = phone_e164
+            records[phone_e164] = record
+
+        existing = {
+            phone_e164 for (phone_e164,) in
+            db.session.query(Customer.phone_e164).filter(Customer.phone_e164.in_(list(records)))
+        }
+        batch = []
+        for phone_e164, record in records.items():
+            if phone_e164 in existing:
+                if not update_existing:
+                    result['skipped'] += 1
+                    continue
+                result['updated'] += 1
+            else:
+                result['inserted'] += 1
+            batch.append({column: record.get(column) for column in IMPORT_COLUMNS})
+        if batch:
+            db.session.execute(upsert, batch)
+        if on_chunk:
+            on_chunk(result)
+        db.session.commit()
+        customer_index.refresh_phones(row['phone_e164'] for row in batch)
+    return result
+
+def import_customers_from_csv(csv_path, update_existing=True):
     """Import customers from a CSV file."""
     try:
-        imported_count = 0
-        updated_count = 0
-        
         with open(csv_path, 'r', encoding='utf-8') as file:
             csv_data = csv.DictReader(file)
-            print(f"CSV Headers: {csv_data.fieldnames}")
-            
-            for row in csv_data:
-                if imported_count == 0:
-                    print(f"First row data: {row}")
-                
-                phone = row.get('Phone', '').strip()
-                if not phone:
-                    continue
-                    
-                existing_customer = Customer.query.filter_by(phone=phone).first()
-                
-                if existing_customer:
-                    existing_customer.name = row.get('Customer', '')
-                    existing_customer.first_name = row.get('First_Name', '')
-                    existing_customer.last_name = row.get('Last_Name', '')
-                    existing_customer.email = row.get('Main_Email', '')
-                    updated_count += 1
-                else:
-                    customer = Customer(
-                        name=row.get('Customer', ''),
-                        first_name=row.get('First_Name', ''),
-                        last_name=row.get('Last_Name', ''),
-                        phone=phone,
-                        email=row.get('Main_Email', '')
-                    )
-                    db.session.add(customer)
-                    imported_count += 1
-        
-        db.session.commit()
+            logger.debug("CSV headers: %s", csv_data.fieldnames)
+            result = bulk_import_customers(csv_data, map_customer_list_row, update_existing=update_existing)
+
         return {
-            'imported': imported_count,
-            'updated': updated_count,
+            'imported': result['inserted'],
+            'updated': result['updated'],
+            'skipped': result['skipped'],
             'success': True,
-            'message': f'Successfully imported {imported_count} new customers and updated {updated_count} existing customers'
+            'message': f"Successfully imported {result['inserted']} new customers and updated {result['updated']} existing customers"
         }
-        
+
     except Exception as e:
         db.session.rollback()
-        print(f"Error importing customers: {str(e)}")
+        logger.exception("Error importing customers from %s", csv_path)
         return {
             'success': False,
             'error': str(e)
-        } 
\ No newline at end of file
+        }
@@ -0,0 +1,375 @@
+import re
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from models import db
+from models.customer import Customer, normalize_phone
+from config import Config
+
+# Ids of customers inserted, edited or deleted by any process, in commit
+# order (SQLite has one writer at a time). Each process's index replays
+# the entries past the last one it has seen. Entries older than
+# CHANGE_RETENTION are pruned; an index that fell behind further than
+# that rebuilds instead. Only installed while the index is enabled.
+CREATE_CHANGE_LOG = """
+    CREATE TABLE IF NOT EXISTS customer_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id INTEGER NOT NULL,
+        changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+CHANGE_TRIGGERS = {
+    'customer_changes_ai': """
+        CREATE TRIGGER customer_changes_ai AFTER INSERT ON customer BEGIN
+            INSERT INTO customer_changes (customer_id) VALUES (new.id);
+        END
+    """,
+    'customer_changes_ad': """
+        CREATE TRIGGER customer_changes_ad AFTER DELETE ON customer BEGIN
+            INSERT INTO customer_changes (customer_id) VALUES (old.id);
+        END
+    """,
+    'customer_changes_au': """
+        CREATE TRIGGER customer_changes_au AFTER UPDATE OF name, email, phone ON customer BEGIN
+            INSERT INTO customer_changes (customer_id) VALUES (new.id);
+        END
+    """,
+}
+
+CHANGE_RETENTION = '-1 day'  # SQLite datetime() modifier
+PRUNE_INTERVAL = 3600  # seconds between prunes by one process
+
+def ensure_change_log():
+    """Create the customer change log and its triggers if any are missing; returns True if it did."""
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql(CREATE_CHANGE_LOG)
+        existing = {row[0] for row in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'customer'")}
+        if set(CHANGE_TRIGGERS) <= existing:
+            return False
+        for name, sql in CHANGE_TRIGGERS.items():
+            conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS {name}')
+            conn.exec_driver_sql(sql)
+    return True
+
+def drop_change_log():
+    """Remove the change log and its triggers, so customer writes stop logging."""
+    with db.engine.begin() as conn:
+        for name in CHANGE_TRIGGERS:
+            conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS {name}')
+        conn.exec_driver_sql('DROP TABLE IF EXISTS customer_changes')
+
+def prune_change_log():
+    """Drop change log entries past the retention window; returns how many."""
+    with db.engine.begin() as conn:
+        return conn.exec_driver_sql(
+            f"DELETE FROM customer_changes WHERE changed_at < datetime('now', '{CHANGE_RETENTION}')").rowcount
+
+def latest_change():
+    """Sequence number of the newest change ever logged, 0 if none."""
+    with db.engine.connect() as conn:
+        seq = conn.exec_driver_sql(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'customer_changes'").scalar()
+    return seq or 0
+
+# Same candidate bound and ranking rules as the FTS5 search. Candidates are
+# taken in key order rather than rowid order, so for very broad terms the
+# two can surface different (equally ranked) customers.
+MAX_CANDIDATES = 200
+
+def name_words(name):
+    return re.findall(r'\w+', (name or '').lower())
+
+def phone_keys(phone):
+    """Digits a phone can be found by: national and full form when normalized."""
+    phone_e164 = normalize_phone(phone)
+    if phone_e164:
+        if phone_e164.startswith('+1'):
+            return [phone_e164[2:], phone_e164[1:]]
+        return [phone_e164[1:]]
+    digits = re.sub(r'\D', '', phone or '')
+    return [digits] if digits else []
+
+class _SortedKeys:
+    """Sorted string keys with a parallel array of customer ids.
+
+    Two flat arrays instead of a tree keep memory close to the size of the
+    strings themselves; a prefix lookup is one bisect plus a forward walk.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.ids = array('q')
+
+    def load(self, pairs):
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.ids = array('q', (customer_id for _, customer_id in pairs))
+
+    def add(self, key, customer_id):
+        position = bisect_left(self.keys, key)
+        while position < len(self.keys) and self.keys[position] == key and self.ids[position] < customer_id:
+            position += 1
+        self.keys.insert(position, key)
+        self.ids.insert(position, customer_id)
+
+    def remove(self, key, customer_id):
+        position = bisect_left(self.keys, key)
+        while position < len(self.keys) and self.keys[position] == key:
+            if self.ids[position] == customer_id:
+                del self.keys[position]
+                del self.ids[position]
+                return
+            position += 1
+
+    def prefixed(self, prefix):
+        """Ids whose key starts with prefix, in key order."""
+        return self.ids[bisect_left(self.keys, prefix):bisect_left(self.keys, prefix + '\U0010ffff')]
+
+    def count_prefixed(self, prefix):
+        return bisect_left(self.keys, prefix + '\U0010ffff') - bisect_left(self.keys, prefix)
+
+    def __len__(self):
+        return len(self.keys)
+
+def estimate_memory(text, phones, records):
+    """Approximate bytes held by the index structures, counting shared strings once."""
+    seen = set()
+    total = sys.getsizeof(records)
+    total += sys.getsizeof(text.keys) + sys.getsizeof(phones.keys)
+    total += sys.getsizeof(text.ids) + sys.getsizeof(phones.ids)
+    values = [*text.keys, *phones.keys]
+    for record in records.values():
+        total += sys.getsizeof(record)
+        values.extend(value for value in record if value is not None)
+    # Interned keys are shared between customers; count each string once
+    for value in values:
+        if id(value) not in seen:
+            seen.add(id(value))
+            total += sys.getsizeof(value)
+    return total
+
+class CustomerPrefixIndex:
+    """In-process autocomplete index over customer names, emails and phones.
+
+    Built once from the customer table, then kept current by add() and
+    remove() after this process's writes commit. Each process holds its
+    own copy; inserts, edits and deletes made by other processes are
+    replayed from the customer_changes log by sync() at most every
+    sync_seconds. build() and sync() also prune the log, at most every
+    PRUNE_INTERVAL.
+    """
+
+    def __init__(self, sync_seconds=30):
+        self.sync_seconds = sync_seconds
+        self.ready = False
+        self._text = _SortedKeys()
+        self._phones = _SortedKeys()
+        self._records = {}  # id -> (name, phone, email, words)
+        self._seq = 0  # last customer_changes entry reflected in the index
+        self._synced_at = 0.0
+        self._pruned_at = None
+        self._bytes_per_customer = 0
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+
+    @staticmethod
+    def _text_keys(name, email):
+        keys = name_words(name)
+        if email:
+            keys.append(email.lower())
+        # Interned so repeated first and last names share one string
+        return {sys.intern(key) for key in keys}
+
+    def _record(self, name, phone, email, keys):
+        # " john smith j@x.com": lets a search check the other words of a
+        # query with substring tests instead of re-tokenizing every candidate
+        return (name, phone, email, ' ' + ' '.join(keys))
+
+    def build(self, batch_size=5000):
+        """Load every customer; returns the number indexed."""
+        self._prune_if_due()
+        # Read first: changes committed while loading are replayed again, harmlessly
+        seq = latest_change()
+        text_pairs, phone_pairs, records = [], [], {}
+        rows = (
+            db.session.query(Customer.id, Customer.name, Customer.phone, Customer.email)
+            .yield_per(batch_size)
+        )
+        for customer_id, name, phone, email in rows:
+            keys = self._text_keys(name, email)
+            records[customer_id] = self._record(name, phone, email, keys)
+            text_pairs.extend((key, customer_id) for key in keys)
+            phone_pairs.extend((key, customer_id) for key in phone_keys(phone))
+        text, phones = _SortedKeys(), _SortedKeys()
+        text.load(text_pairs)
+        phones.load(phone_pairs)
+        # Estimated here, before the structures are shared, so stats() never walks the index
+        per_customer = round(estimate_memory(text, phones, records) / len(records)) if records else 0
+        with self._lock:
+            self._text = text
+            self._phones = phones
+            self._records = records
+            self._seq = seq
+            self._synced_at = time.monotonic()
+            self._bytes_per_customer = per_customer
+            self.ready = True
+        return len(records)
+
+    def add(self, customer_id, name, phone, email):
+        """Index a customer, replacing whatever was indexed for it before."""
+        keys = self._text_keys(name, email)
+        with self._lock:
+            self._remove(customer_id)
+            self._records[customer_id] = self._record(name, phone, email, keys)
+            for key in keys:
+                self._text.add(key, customer_id)
+            for key in phone_keys(phone):
+                self._phones.add(key, customer_id)
+
+    def add_customer(self, customer):
+        if self.ready:
+            self.add(customer.id, customer.name, customer.phone, customer.email)
+
+    def remove(self, customer_id):
+        with self._lock:
+            self._remove(customer_id)
+
+    def _remove(self, customer_id):
+        record = self._records.pop(customer_id, None)
+        if record is None:
+            return
+        name, phone, email, words = record
+        for key in self._text_keys(name, email):
+            self._text.remove(key, customer_id)
+        for key in phone_keys(phone):
+            self._phones.remove(key, customer_id)
+
+    def refresh_phones(self, phones_e164, batch_size=500):
+        """Re-read and index the customers owning these normalized numbers."""
+        if not self.ready or not phones_e164:
+            return
+        phones_e164 = list(phones_e164)
+        for start in range(0, len(phones_e164), batch_size):
+            rows = (
+                db.session.query(Customer.id, Customer.name, Customer.phone, Customer.email)
+                .filter(Customer.phone_e164.in_(phones_e164[start:start + batch_size]))
+            )
+            for row in rows:
+                self.add(*row)
+
+    def refresh(self, customer_ids, batch_size=500):
+        """Re-read these customers, indexing those that exist and dropping those that are gone."""
+        if not self.ready:
+            return
+        customer_ids = list(customer_ids)
+        for start in range(0, len(customer_ids), batch_size):
+            chunk = customer_ids[start:start + batch_size]
+            rows = (
+                db.session.query(Customer.id, Customer.name, Customer.phone, Customer.email)
+                .filter(Customer.id.in_(chunk))
+                .all()
+            )
+            for row in rows:
+                self.add(*row)
+            for customer_id in set(chunk) - {row[0] for row in rows}:
+                self.remove(customer_id)
+
+    def sync(self, force=False):
+        """Apply customer changes committed by any process since the last sync; returns how many."""
+        if not self.ready or (not force and time.monotonic() - self._synced_at < self.sync_seconds):
+            return 0
+        # One request thread syncs; the others keep searching the current index
+        if not self._sync_lock.acquire(blocking=False):
+            return 0
+        try:
+            self._synced_at = time.monotonic()
+            self._prune_if_due()
+            if latest_change() <= self._seq:
+                return 0
+            with db.engine.connect() as conn:
+                oldest = conn.exec_driver_sql("SELECT MIN(seq) FROM customer_changes").scalar()
+                if oldest is None or oldest > self._seq + 1:
+                    # Entries this index never saw were pruned already
+                    return self.build()
+                rows = conn.exec_driver_sql(
+                    "SELECT seq, customer_id FROM customer_changes WHERE seq > ? ORDER BY seq",
+                    (self._seq,)).fetchall()
+            if not rows:
+                return 0
+            self.refresh({customer_id for _, customer_id in rows})
+            self._seq = rows[-1][0]
+            return len(rows)
+        finally:
+            self._sync_lock.release()
+
+    def _prune_if_due(self):
+        if self._pruned_at is None or time.monotonic() - self._pruned_at >= PRUNE_INTERVAL:
+            self._pruned_at = time.monotonic()
+            prune_change_log()
+
+    def search(self, term, limit=10):
+        """Ranked prefix search with the same matching rules as the FTS5 search."""
+        term = term.strip().lower()
+        with self._lock:
+            if re.search(r'[^\W\d_]', term):
+                words = name_words(term)
+                # Walk the word with the fewest keys, check the others per record
+                lead = min(words, key=self._text.count_prefixed)
+                rest = [f' {word}' for word in words if word != lead]
+                candidates = self._text.prefixed(lead)
+            else:
+                digits = re.sub(r'\D', '', term)
+                if not digits:
+                    return []
+                rest = []
+                candidates = self._phones.prefixed(digits)
+
+            matches = {}
+            records = self._records
+            for customer_id in candidates:
+                record = records[customer_id]
+                for word in rest:
+                    if word not in record[3]:
+                        break
+                else:
+                    matches[customer_id] = record
+                    if len(matches) >= MAX_CANDIDATES:
+                        break
+
+        leading = re.sub(r'^\W+', '', term)
+
+        def rank(item):
+            customer_id, (name, phone, email, words) = item
+            name = (name or '').lower()
+            if name.startswith(leading):
+                tier = 0
+            elif (email or '').lower().startswith(leading):
+                tier = 1
+            else:
+                tier = 2
+            return (tier, len(name), customer_id)
+
+        ranked = sorted(matches.items(), key=rank)[:limit]
+        return [
+            {'id': customer_id, 'name': name, 'phone': phone, 'email': email}
+            for customer_id, (name, phone, email, words) in ranked
+        ]
+
+    def stats(self):
+        """Entry counts and the memory estimate taken at build time; does not lock the index."""
+        customers = len(self._records)
+        return {
+            'ready': self.ready,
+            'customers': customers,
+            'text_keys': len(self._text),
+            'phone_keys': len(self._phones),
+            'memory_bytes': self._bytes_per_customer * customers,
+            'bytes_per_customer': self._bytes_per_customer
+        }
+
+# Process-wide index; stays empty (and unused) unless enabled at startup
+customer_index = CustomerPrefixIndex(sync_seconds=Config.CUSTOMER_INDEX_SYNC_SECONDS)
@@ -0,0 +1,144 @@
+import re
+from sqlalchemy import text
+from models import db
+
+# Full-text index over customer.name, customer.email and the phone digits.
+# It is contentless (rows live only in customer) and kept current by the
+# triggers below; prefix indexes make short autocomplete prefixes cheap.
+CREATE_SEARCH_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS customer_search USING fts5(
+        name, email, phone_digits,
+        content='', prefix='1 2 3 4'
+    )
+"""
+
+# National and full digits for normalized numbers, so "801555" and
+# "1801555" both match; raw phones that never normalized are stripped of
+# common punctuation instead.
+PHONE_DIGITS_SQL = """
+    CASE
+        WHEN {row}.phone_e164 LIKE '+1%' THEN substr({row}.phone_e164, 3) || ' ' || substr({row}.phone_e164, 2)
+        WHEN {row}.phone_e164 IS NOT NULL THEN substr({row}.phone_e164, 2)
+        ELSE replace(replace(replace(replace(replace(replace(
+            {row}.phone, '(', ''), ')', ''), '-', ''), ' ', ''), '.', ''), '+', '')
+    END
+"""
+
+def _indexed_values(row):
+    return f"{row}.name, {row}.email, {PHONE_DIGITS_SQL.format(row=row)}"
+
+# A contentless table can only forget a row if it is handed the exact values
+# that were indexed, which the triggers have as old.*
+SEARCH_TRIGGERS = {
+    'customer_search_ai': f"""
+        CREATE TRIGGER customer_search_ai AFTER INSERT ON customer BEGIN
+            INSERT INTO customer_search (rowid, name, email, phone_digits)
+            VALUES (new.id, {_indexed_values('new')});
+        END
+    """,
+    'customer_search_ad': f"""
+        CREATE TRIGGER customer_search_ad AFTER DELETE ON customer BEGIN
+            INSERT INTO customer_search (customer_search, rowid, name, email, phone_digits)
+            VALUES ('delete', old.id, {_indexed_values('old')});
+        END
+    """,
+    'customer_search_au': f"""
+        CREATE TRIGGER customer_search_au AFTER UPDATE OF name, email, phone, phone_e164 ON customer BEGIN
+            INSERT INTO customer_search (customer_search, rowid, name, email, phone_digits)
+            VALUES ('delete', old.id, {_indexed_values('old')});
+            INSERT INTO customer_search (rowid, name, email, phone_digits)
+            VALUES (new.id, {_indexed_values('new')});
+        END
+    """,
+}
+
+REBUILD_SEARCH_SQL = f"""
+    INSERT INTO customer_search (rowid, name, email, phone_digits)
+    SELECT customer.id, {_indexed_values('customer')} FROM customer
+"""
+
+# At most this many index hits are ranked per search. FTS5 hands them back
+# in rowid order without materializing the full match set, so the cost of
+# a lookup does not grow with the table. (bm25() was measured and rejected:
+# it scores against the whole match set, ~160ms for a two-letter prefix
+# over 500k customers.) Once a term is specific enough to match fewer
+# customers than this, ranking covers every match.
+SEARCH_CANDIDATES = 200
+
+# Ranks the candidates: names starting with the term first, then emails
+# starting with it, then word-level matches; shorter names break ties.
+SEARCH_SQL = text("""
+    WITH hits AS (
+        SELECT rowid FROM customer_search
+        WHERE customer_search MATCH :query
+        LIMIT :candidates
+    )
+    SELECT c.id, c.name, c.phone, c.email
+    FROM hits
+    JOIN customer c ON c.id = hits.rowid
+    ORDER BY
+        CASE
+            WHEN c.name LIKE :prefix ESCAPE '\\' THEN 0
+            WHEN c.email LIKE :prefix ESCAPE '\\' THEN 1
+            ELSE 2
+        END,
+        length(c.name), c.id
+    LIMIT :limit
+""")
+
+def ensure_search_index():
+    """Create the search table and triggers, rebuilding the index if they were missing.
+
+    The triggers disappear whenever the customer table is dropped, so a
+    missing trigger means the index can no longer be trusted.
+    """
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql(CREATE_SEARCH_TABLE)
+        existing = {row[0] for row in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'customer'")}
+        if set(SEARCH_TRIGGERS) <= existing:
+            return False
+        for name, sql in SEARCH_TRIGGERS.items():
+            conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS {name}')
+            conn.exec_driver_sql(sql)
+        _rebuild(conn)
+    return True
+
+def rebuild_search_index():
+    """Re-index every customer; returns the number of customers indexed."""
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql(CREATE_SEARCH_TABLE)
+        return _rebuild(conn)
+
+def _rebuild(conn):
+    conn.exec_driver_sql("INSERT INTO customer_search (customer_search) VALUES ('delete-all')")
+    return conn.exec_driver_sql(REBUILD_SEARCH_SQL).rowcount
+
+def build_match_query(term):
+    """Turn free text into an FTS5 prefix query, or None if nothing is searchable.
+
+    A term with letters must prefix-match the name or email word by word;
+    a term without letters ("(801) 555") prefix-matches the phone digits.
+    """
+    if re.search(r'[^\W\d_]', term):
+        words = re.findall(r'\w+', term.lower())
+        return '{name email} : (' + ' AND '.join(f'"{word}"*' for word in words) + ')'
+    digits = re.sub(r'\D', '', term)
+    if digits:
+        return f'phone_digits : "{digits}"*'
+    return None
+
+def search_customers(term, limit=10):
+    """Ranked prefix search over customer names, emails and phone numbers."""
+    query = build_match_query(term)
+    if not query:
+        return []
+    leading = re.sub(r'^\W+', '', term.strip())
+    prefix = re.sub(r'([\\%_])', r'\\\1', leading) + '%'
+    rows = db.session.execute(SEARCH_SQL, {
+        'query': query,
+        'prefix': prefix,
+        'candidates': SEARCH_CANDIDATES,
+        'limit': limit
+    })
+    return [{'id': id, 'name': name, 'phone': phone, 'email': email} for id, name, phone, email in rows]
@@ -0,0 +1,135 @@
+from collections import defaultdict
+from sqlalchemy import bindparam
+from sqlalchemy.dialects.sqlite import insert
+from models import db
+from models.customer import Customer, normalize_phone
+from models.project import Project
+from services.customer_autocomplete import customer_index
+
+# Customer fields a surviving record inherits from a duplicate when it has none
+MERGED_FIELDS = ('name', 'first_name', 'last_name', 'email')
+
+def resolve_customer(name, phone, email=None):
+    """Return (customer, created) for a phone number, refreshing the stored details.
+
+    Customers are identified by their normalized number alone, so a new
+    name or email updates the existing record instead of creating another.
+    """
+    customer = Customer.find_by_phone(phone)
+    if customer is None:
+        phone_e164 = normalize_phone(phone)
+        if not phone_e164:
+            raise ValueError(f"Invalid phone number: {phone}")
+        # Another request may create the same number after the lookup above;
+        # the insert then does nothing and both requests share its row
+        inserted = db.session.execute(
+            insert(Customer)
+            .values(name=name, phone=phone, phone_e164=phone_e164, email=email)
+            .on_conflict_do_nothing(index_elements=['phone_e164'])
+        ).rowcount
+        customer = Customer.query.filter_by(phone_e164=phone_e164).one()
+        if inserted:
+            return customer, True
+    if name and customer.name != name:
+        customer.name = name
+    if email and customer.email != email:
+        customer.email = email
+    return customer, False
+
+def phone_e164_missing():
+    columns = {column['name'] for column in db.inspect(db.engine).get_columns('customer')}
+    return 'phone_e164' not in columns
+
+def migrate_customer_phones(batch_size=1000):
+    """Backfill customer.phone_e164 and merge customers sharing a number.
+
+    Adds the column to databases created before it existed. For every
+    normalized number the oldest customer is kept: projects of the others
+    are moved to it, blank fields are filled from them, and they are
+    deleted. The unique index is created last. Safe to re-run.
+    """
+    if phone_e164_missing():
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql('ALTER TABLE customer ADD COLUMN phone_e164 VARCHAR(16)')
+
+    groups = defaultdict(list)
+    stored = {}
+    unreadable = 0
+    rows = (
+        db.session.query(Customer.id, Customer.phone, Customer.phone_e164)
+        .order_by(Customer.id)
+        .yield_per(batch_size)
+    )
+    for customer_id, phone, phone_e164 in rows:
+        normalized = normalize_phone(phone)
+        if normalized:
+            groups[normalized].append(customer_id)
+        else:
+            unreadable += 1
+        stored[customer_id] = (phone_e164, normalized)
+
+    duplicates = {}
+    for ids in groups.values():
+        for duplicate_id in ids[1:]:
+            duplicates[duplicate_id] = ids[0]
+
+    if duplicates:
+        # Fill blanks on the surviving record before its duplicates go away
+        merge_groups = [ids for ids in groups.values() if len(ids) > 1]
+        for start in range(0, len(merge_groups), batch_size):
+            chunk = merge_groups[start:start + batch_size]
+            customers = {c.id: c for c in Customer.query.filter(Customer.id.in_([i for ids in chunk for i in ids]))}
+            for ids in chunk:
+                survivor = customers[ids[0]]
+                for duplicate_id in ids[1:]:
+                    for field in MERGED_FIELDS:
+                        if not getattr(survivor, field) and getattr(customers[duplicate_id], field):
+                            setattr(survivor, field, getattr(customers[duplicate_id], field))
+            db.session.flush()
+
+        project = Project.__table__
+        customer = Customer.__table__
+        moves = [{'old_id': old_id, 'new_id': new_id} for old_id, new_id in duplicates.items()]
+        db.session.execute(
+            project.update()
+            .where(project.c.customer_id == bindparam('old_id'))
+            .values(customer_id=bindparam('new_id')),
+            moves
+        )
+        duplicate_ids = list(duplicates)
+        for start in range(0, len(duplicate_ids), batch_size):
+            db.session.execute(customer.delete().where(customer.c.id.in_(duplicate_ids[start:start + batch_size])))
+
+    # Write normalized numbers only after duplicates are gone, so a unique
+    # index left by an earlier run is never violated
+    changes = [
+        {'customer_id': customer_id, 'normalized': normalized}
+        for customer_id, (current, normalized) in stored.items()
+        if customer_id not in duplicates and current != normalized
+    ]
+    if changes:
+        customer = Customer.__table__
+        db.session.execute(
+            customer.update()
+            .where(customer.c.id == bindparam('customer_id'))
+            .values(phone_e164=bindparam('normalized')),
+            changes
+        )
+    db.session.commit()
+    # Merged-away customers leave this process's autocomplete index; the
+    # survivors may have picked up a name or email from them
+    for duplicate_id in duplicates:
+        customer_index.remove(duplicate_id)
+    customer_index.refresh(set(duplicates.values()))
+
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('DROP INDEX IF EXISTS ix_customer_phone')
+    for index in Customer.__table__.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+
+    return {
+        'customers': len(stored) - len(duplicates),
+        'normalized': len(changes),
+        'merged': len(duplicates),
+        'unreadable': unreadable
+    }
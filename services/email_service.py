@@ -1,28 +1,124 @@
 import os
+import logging
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class EmailDeliveryError(Exception):
+    """SendGrid did not accept a message; the text carries the status and response body."""
+
+_shared_service = None
+_shared_lock = threading.Lock()
+
+def get_email_service():
+    """Return the process-wide EmailService, creating it on first use."""
+    global _shared_service
+    if _shared_service is None:
+        with _shared_lock:
+            if _shared_service is None:
+                _shared_service = EmailService()
+    return _shared_service
+
+def reset_email_service(close=True):
+    """Drop the shared service, closing its pooled connections.
+
+    A process forked from one that already sent mail passes close=False:
+    the sockets still belong to the parent, and the child opens its own
+    on its next send.
+    """
+    global _shared_service
+    with _shared_lock:
+        if _shared_service is not None and close:
+            _shared_service.close()
+        _shared_service = None
+
+def _new_lock_after_fork():
+    # The parent's scheduler thread may have held the lock at fork time
+    global _shared_lock
+    _shared_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_new_lock_after_fork)
 
 class EmailService:
-    def __init__(self):
+    """SendGrid client meant to live for the whole process.
+
+    Holds one keep-alive requests.Session so repeated sends reuse pooled
+    TLS connections instead of handshaking with SendGrid every time. Use
+    get_email_service() rather than constructing one per request.
+    """
+
+    def __init__(self, api_key=None, api_url=None, pool_size=None, timeout=None):
         try:
-            self.api_key = os.environ.get('SENDGRID_API_KEY')
-            print(f"Initializing SendGrid with API key: {self.api_key[:5]}...")  # Only print first 5 chars for security
+            self.api_key = api_key or os.environ.get('SENDGRID_API_KEY')
             if not self.api_key:
                 raise ValueError("SendGrid API key not found in environment")
-            print("EmailService initialized successfully")
-        except Exception as e:
-            print(f"Error initializing EmailService: {str(e)}")
-            print(f"Error type: {type(e).__name__}")
-            print(f"Full error details: {str(e)}")
+            self.api_url = api_url or Config.SENDGRID_API_URL
+            self.timeout = timeout or (Config.SENDGRID_CONNECT_TIMEOUT, Config.SENDGRID_READ_TIMEOUT)
+            pool_size = pool_size or Config.SENDGRID_POOL_SIZE
+
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+            self.session.headers.update({
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            })
+
+            self._stats_lock = threading.Lock()
+            self._calls = 0
+            self._total_ms = 0.0
+            self._max_ms = 0.0
+            self.last_latency_ms = None
+            logger.debug("EmailService initialized")
+        except Exception:
+            logger.exception("Error initializing EmailService")
             raise
 
-    def send_project_confirmation(self, customer_email, customer_name, project_date, address, customer_phone=None, po=None, city=None, subdivision=None, lot_number=None, square_footage=None, job_cost_type=None, work_type=None, notes=None, region=None):
+    def _post(self, data):
+        """POST a mail/send payload over the pooled session, recording latency."""
+        started = time.perf_counter()
+        try:
+            return self.session.post(self.api_url, json=data, timeout=self.timeout)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._stats_lock:
+                self._calls += 1
+                self._total_ms += elapsed_ms
+                self._max_ms = max(self._max_ms, elapsed_ms)
+                self.last_latency_ms = elapsed_ms
+            logger.debug("SendGrid call took %.1f ms", elapsed_ms)
+
+    def _send(self, data, label):
+        """POST a message and raise EmailDeliveryError unless SendGrid accepts it (202)."""
+        response = self._post(data)
+        if response.status_code != 202:
+            raise EmailDeliveryError(f"SendGrid rejected {label} email ({response.status_code}): {response.text[:500]}")
+        return response
+
+    def latency_stats(self):
+        with self._stats_lock:
+            return {
+                'calls': self._calls,
+                'avg_ms': round(self._total_ms / self._calls, 2) if self._calls else 0.0,
+                'max_ms': round(self._max_ms, 2),
+                'last_ms': round(self.last_latency_ms, 2) if self.last_latency_ms is not None else None
+            }
+
+    def close(self):
+        self.session.close()
+
+    def send_project_confirmation(self, customer_email, customer_name, project_date, address, customer_phone=None, po=None, city=None, subdivision=None, lot_number=None, square_footage=None, job_cost_type=None, work_type=None, notes=None, region=None, raise_errors=False):
         if not customer_email:
-            print("No email provided, skipping email notification")
+            logger.debug("No email provided, skipping confirmation email")
             return False
 
         try:
-            print(f"Preparing to send confirmation email to {customer_email}")
-            
             # Format work types and job cost types
             def format_type(type_str):
                 # Replace underscores with spaces and capitalize each word
@@ -133,40 +229,22 @@ class EmailService:
                 }]
             }
             
-            print(f"Using SendGrid API key: {self.api_key[:5]}...")
-            print("Sending email via SendGrid API...")
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            response = requests.post(
-                "https://api.sendgrid.com/v3/mail/send",
-                headers=headers,
-                json=data
-            )
-            print(f"SendGrid API Response Status Code: {response.status_code}")
-            if response.status_code != 202:  # SendGrid returns 202 for successful sends
-                print(f"SendGrid API Error Response: {response.text}")
-                return False
-            print("Email sent successfully")
+            self._send(data, 'confirmation')
+            logger.debug("Confirmation email sent")
             return True
             
-        except Exception as e:
-            print(f"Error sending email: {str(e)}")
-            print(f"Error type: {type(e).__name__}")
-            if hasattr(e, 'response'):
-                print(f"Response status code: {e.response.status_code}")
-                print(f"Response text: {e.response.text}")
+        except Exception:
+            if raise_errors:
+                raise
+            logger.exception("Error sending confirmation email")
             return False
 
-    def send_project_update(self, customer_email, customer_name, project_date, address, customer_phone=None, po=None, city=None, subdivision=None, lot_number=None, square_footage=None, job_cost_type=None, work_type=None, notes=None, region=None, update_type="modification"):
+    def send_project_update(self, customer_email, customer_name, project_date, address, customer_phone=None, po=None, city=None, subdivision=None, lot_number=None, square_footage=None, job_cost_type=None, work_type=None, notes=None, region=None, update_type="modification", raise_errors=False):
         if not customer_email:
-            print("No email provided for update, skipping")
+            logger.debug("No email provided, skipping update email")
             return False
 
         try:
-            print(f"Preparing to send update email to {customer_email}")
-            
             # Format work types and job cost types
             def format_type(type_str):
                 # Replace underscores with spaces and capitalize each word
@@ -277,32 +355,22 @@ class EmailService:
                 }]
             }
             
-            print("Sending update email via SendGrid API...")
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            response = requests.post(
-                "https://api.sendgrid.com/v3/mail/send",
-                headers=headers,
-                json=data
-            )
-            print(f"Update email sent successfully with status code {response.status_code}")
+            self._send(data, 'update')
+            logger.debug("Update email sent")
             return True
             
-        except Exception as e:
-            print(f"Error sending update email: {str(e)}")
-            print(f"Full error details: {type(e).__name__}")
+        except Exception:
+            if raise_errors:
+                raise
+            logger.exception("Error sending update email")
             return False 
 
-    def send_project_reminder(self, customer_email, customer_name, project_date, address, customer_phone=None, po=None, city=None, subdivision=None, lot_number=None, square_footage=None, job_cost_type=None, work_type=None, notes=None, region=None):
+    def send_project_reminder(self, customer_email, customer_name, project_date, address, customer_phone=None, po=None, city=None, subdivision=None, lot_number=None, square_footage=None, job_cost_type=None, work_type=None, notes=None, region=None, raise_errors=False):
         if not customer_email:
-            print("No email provided, skipping reminder email")
+            logger.debug("No email provided, skipping reminder email")
             return False
 
         try:
-            print(f"Preparing to send reminder email to {customer_email}")
-            
             # Format lists for display
             job_cost_types_display = ", ".join(job_cost_type) if isinstance(job_cost_type, list) else str(job_cost_type) if job_cost_type else "Not specified"
             work_types_display = ", ".join(work_type) if isinstance(work_type, list) else str(work_type) if work_type else "Not specified"
@@ -408,28 +476,12 @@ class EmailService:
                 }]
             }
             
-            print(f"Using SendGrid API key: {self.api_key[:5]}...")
-            print("Sending reminder email via SendGrid API...")
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            response = requests.post(
-                "https://api.sendgrid.com/v3/mail/send",
-                headers=headers,
-                json=data
-            )
-            print(f"SendGrid API Response Status Code: {response.status_code}")
-            if response.status_code != 202:  # SendGrid returns 202 for successful sends
-                print(f"SendGrid API Error Response: {response.text}")
-                return False
-            print("Reminder email sent successfully")
+            self._send(data, 'reminder')
+            logger.debug("Reminder email sent")
             return True
             
-        except Exception as e:
-            print(f"Error sending reminder email: {str(e)}")
-            print(f"Error type: {type(e).__name__}")
-            if hasattr(e, 'response'):
-                print(f"Response status code: {e.response.status_code}")
-                print(f"Response text: {e.response.text}")
+        except Exception:
+            if raise_errors:
+                raise
+            logger.exception("Error sending reminder email")
             return False 
\ No newline at end of file
@@ -0,0 +1,251 @@
+import csv
+import io
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy.orm import joinedload
+from models import db
+from models.project import Project
+from models.customer import Customer
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends and compactions are only serialized per process
+    fcntl = None
+
+# Region files are a change log: one row per create, update or delete,
+# newest last. Compaction rewrites a file to one 'created' row per live project.
+EXPORT_HEADER = [
+    'Operation',
+    'Project ID',
+    'Customer Name',
+    'Customer Email',
+    'Customer Phone',
+    'Date',
+    'PO',
+    'Address',
+    'City',
+    'Subdivision',
+    'Lot Number',
+    'Square Footage',
+    'Job Cost Type',
+    'Work Type',
+    'Notes',
+    'Created At',
+    'Updated At'
+]
+
+OPERATIONS = ('created', 'updated', 'deleted')
+
+# Serializes appends and compactions within this process; _region_lock()
+# adds a lock file so other processes take turns with it too
+_export_lock = threading.Lock()
+
+def export_path(region, export_dir=None):
+    return os.path.join(export_dir or Config.EXPORT_DIR, f'projects_{region}.csv')
+
+@contextmanager
+def _region_lock(filepath):
+    """Hold the region file's lock across threads and processes.
+
+    Compaction reads the database and swaps in a new file; an append from
+    another worker in between would be lost without it.
+    """
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with _export_lock, open(f'{filepath}.lock', 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def legacy_archive_path(filepath):
+    """Where a file in the old layout is kept before compaction replaces it.
+
+    Named so export_regions() does not mistake it for a region.
+    """
+    directory, name = os.path.split(filepath)
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    return os.path.join(directory, f"legacy_{name[:-len('.csv')]}_{stamp}.csv")
+
+def project_export_row(project):
+    """The exported columns for a project, without the operation."""
+    customer = project.customer
+    return [
+        project.id,
+        customer.name if customer else 'N/A',
+        customer.email if customer else 'N/A',
+        customer.phone if customer else 'N/A',
+        project.date.strftime('%Y-%m-%d'),
+        project.po or 'N/A',
+        project.address,
+        project.city or 'N/A',
+        project.subdivision or 'N/A',
+        project.lot_number or 'N/A',
+        project.square_footage or 'N/A',
+        project.job_cost_type or 'N/A',
+        project.work_type or 'N/A',
+        project.notes or 'N/A',
+        project.created_at.strftime('%Y-%m-%d %H:%M:%S') if project.created_at else 'N/A',
+        project.updated_at.strftime('%Y-%m-%d %H:%M:%S') if project.updated_at else 'N/A'
+    ]
+
+def _format_row(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+def _has_current_header(filepath):
+    with open(filepath, newline='', encoding='utf-8') as f:
+        return next(csv.reader(f), None) == EXPORT_HEADER
+
+def append_project_change(region, operation, project_id=None, row=None, export_dir=None):
+    """Append one project's change to its region file.
+
+    Created and updated projects are read back by primary key after the
+    commit; deletes pass the row captured before the project was deleted.
+    A file still in the old layout (no Operation column) is archived
+    and compacted instead, which already reflects this change.
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown export operation: {operation}")
+    if row is None:
+        project = db.session.get(Project, project_id, options=[joinedload(Project.customer)])
+        if project is None:
+            return False
+        row = project_export_row(project)
+
+    filepath = export_path(region, export_dir)
+    with _region_lock(filepath):
+        if os.path.exists(filepath) and not _has_current_header(filepath):
+            _compact(region, filepath)
+            return True
+        write_header = not os.path.exists(filepath)
+        with open(filepath, 'a', newline='', encoding='utf-8') as f:
+            # One write per change keeps appends from different processes whole
+            f.write((_format_row(EXPORT_HEADER) if write_header else '') + _format_row([operation] + row))
+    return True
+
+def compact_region_export(region, export_dir=None, batch_size=1000):
+    """Rewrite a region file to current state; returns the number of projects written."""
+    filepath = export_path(region, export_dir)
+    with _region_lock(filepath):
+        return _compact(region, filepath, batch_size)
+
+def _compact(region, filepath, batch_size=1000):
+    # Callers hold _region_lock. Stream into a temporary file beside the
+    # export and swap it in, so readers only ever see a complete file
+    temp_path = f'{filepath}.tmp'
+    query = (
+        Project.query
+        .options(joinedload(Project.customer))
+        .filter_by(region=region)
+        .order_by(Project.created_at, Project.id)
+        .yield_per(batch_size)
+    )
+    written = 0
+    with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_HEADER)
+        for project in query:
+            writer.writerow(['created'] + project_export_row(project))
+            written += 1
+    if os.path.exists(filepath) and not _has_current_header(filepath):
+        # Old-layout rows are history the compacted file no longer carries
+        shutil.copyfile(filepath, legacy_archive_path(filepath))
+    os.replace(temp_path, filepath)
+    return written
+
+def export_regions(export_dir=None):
+    """Regions with projects or an existing export file."""
+    regions = {region for (region,) in db.session.query(Project.region).distinct() if region}
+    export_dir = export_dir or Config.EXPORT_DIR
+    if os.path.isdir(export_dir):
+        for name in os.listdir(export_dir):
+            if name.startswith('projects_') and name.endswith('.csv'):
+                regions.add(name[len('projects_'):-len('.csv')])
+    return sorted(regions)
+
+# Columns of the /projects/export download, read in one joined query
+DOWNLOAD_COLUMNS = (
+    Project.id,
+    Customer.name.label('customer_name'),
+    Customer.email.label('customer_email'),
+    Customer.phone.label('customer_phone'),
+    Project.region,
+    Project.date,
+    Project.po,
+    Project.address,
+    Project.city,
+    Project.subdivision,
+    Project.lot_number,
+    Project.square_footage,
+    Project.job_cost_type,
+    Project.work_type,
+    Project.notes,
+    Project.created_at,
+    Project.updated_at,
+)
+
+DOWNLOAD_HEADER = EXPORT_HEADER[1:5] + ['Region'] + EXPORT_HEADER[5:]
+
+def download_query(region=None, start=None, end=None):
+    """Projects joined with their customers, in (region, date, id) index order."""
+    query = (
+        db.session.query(*DOWNLOAD_COLUMNS)
+        .outerjoin(Customer, Customer.id == Project.customer_id)
+    )
+    if region:
+        query = query.filter(Project.region == region)
+    if start:
+        query = query.filter(Project.date >= start)
+    if end:
+        query = query.filter(Project.date <= end)
+    return query.order_by(Project.region, Project.date, Project.id)
+
+def download_row(row):
+    return [
+        row.id,
+        row.customer_name or 'N/A',
+        row.customer_email or 'N/A',
+        row.customer_phone or 'N/A',
+        row.region,
+        row.date.strftime('%Y-%m-%d'),
+        row.po or 'N/A',
+        row.address,
+        row.city or 'N/A',
+        row.subdivision or 'N/A',
+        row.lot_number or 'N/A',
+        row.square_footage or 'N/A',
+        row.job_cost_type or 'N/A',
+        row.work_type or 'N/A',
+        row.notes or 'N/A',
+        row.created_at.strftime('%Y-%m-%d %H:%M:%S') if row.created_at else 'N/A',
+        row.updated_at.strftime('%Y-%m-%d %H:%M:%S') if row.updated_at else 'N/A'
+    ]
+
+def stream_projects_csv(query, batch_size=1000):
+    """Yield the CSV download a batch of rows at a time.
+
+    Rows come off the cursor with yield_per and each batch is sent as
+    soon as it is formatted, so memory stays flat and the first bytes go
+    out before the query has finished.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(DOWNLOAD_HEADER)
+    pending = 0
+    for row in query.yield_per(batch_size):
+        writer.writerow(download_row(row))
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
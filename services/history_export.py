@@ -0,0 +1,242 @@
+import functools
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from models import db
+from models.project import Project
+from models.customer import Customer
+from models.project_type import clean_type_names
+from config import Config
+
+@functools.lru_cache(maxsize=None)
+def _arrow():
+    """(pyarrow, pyarrow.parquet), or (None, None) when not installed.
+
+    Imported on first export rather than with this module, which the
+    projects routes load into every web worker.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:  # gzip NDJSON is written instead
+        return None, None
+    return pa, pq
+
+# Typed project history for the warehouse. Each partition holds the
+# projects of one region whose updated_at falls on one UTC day, in their
+# state at export time; the newest updated_at per id is the current row.
+HISTORY_COLUMNS = (
+    Project.id,
+    Project.region,
+    Project.date,
+    Project.po,
+    Project.address,
+    Project.city,
+    Project.subdivision,
+    Project.lot_number,
+    Project.square_footage,
+    Project.work_type,
+    Project.job_cost_type,
+    Project.notes,
+    Project.customer_id,
+    Customer.name.label('customer_name'),
+    Customer.email.label('customer_email'),
+    Customer.phone.label('customer_phone'),
+    Project.created_at,
+    Project.updated_at,
+)
+
+# Partitions are complete once their day has ended; this file records the
+# last day written for a region so loaders know which partitions are final
+WATERMARK_FILE = '_exported_through'
+
+FORMATS = ('parquet', 'ndjson')
+
+def arrow_schema():
+    pa, _ = _arrow()
+    return pa.schema([
+        ('id', pa.string()),
+        ('region', pa.string()),
+        ('date', pa.date32()),
+        ('po', pa.string()),
+        ('address', pa.string()),
+        ('city', pa.string()),
+        ('subdivision', pa.string()),
+        ('lot_number', pa.string()),
+        ('square_footage', pa.int64()),
+        ('work_types', pa.list_(pa.string())),
+        ('job_cost_types', pa.list_(pa.string())),
+        ('notes', pa.string()),
+        ('customer_id', pa.int64()),
+        ('customer_name', pa.string()),
+        ('customer_email', pa.string()),
+        ('customer_phone', pa.string()),
+        ('created_at', pa.timestamp('s')),
+        ('updated_at', pa.timestamp('s')),
+    ])
+
+def resolve_format(fmt=None):
+    """Pick the output format; 'auto' means Parquet when pyarrow is installed."""
+    fmt = fmt or Config.HISTORY_EXPORT_FORMAT
+    pa, _ = _arrow()
+    if fmt == 'auto':
+        return 'parquet' if pa is not None else 'ndjson'
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == 'parquet' and pa is None:
+        raise ValueError("Parquet export needs pyarrow installed")
+    return fmt
+
+def history_query(region=None, start=None, end=None, updated_from=None, updated_to=None):
+    """History columns joined with customers.
+
+    start/end bound the project date (inclusive); updated_from/updated_to
+    bound updated_at (half-open) and order rows by it for partitioning.
+    """
+    query = (
+        db.session.query(*HISTORY_COLUMNS)
+        .outerjoin(Customer, Customer.id == Project.customer_id)
+    )
+    if region:
+        query = query.filter(Project.region == region)
+    if start:
+        query = query.filter(Project.date >= start)
+    if end:
+        query = query.filter(Project.date <= end)
+    if updated_from or updated_to:
+        if updated_from:
+            query = query.filter(Project.updated_at >= updated_from)
+        if updated_to:
+            query = query.filter(Project.updated_at < updated_to)
+        return query.order_by(Project.updated_at, Project.id)
+    return query.order_by(Project.region, Project.date, Project.id)
+
+def history_record(row):
+    """A typed record: real nulls, type lists instead of comma-joined strings."""
+    return {
+        'id': row.id,
+        'region': row.region,
+        'date': row.date,
+        'po': row.po,
+        'address': row.address,
+        'city': row.city,
+        'subdivision': row.subdivision,
+        'lot_number': row.lot_number,
+        'square_footage': row.square_footage,
+        'work_types': clean_type_names(row.work_type),
+        'job_cost_types': clean_type_names(row.job_cost_type),
+        'notes': row.notes,
+        'customer_id': row.customer_id,
+        'customer_name': row.customer_name,
+        'customer_email': row.customer_email,
+        'customer_phone': row.customer_phone,
+        'created_at': row.created_at,
+        'updated_at': row.updated_at,
+    }
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def ndjson_line(record):
+    return json.dumps(record, default=_json_default, separators=(',', ':')) + '\n'
+
+def stream_ndjson(query, batch_size=1000):
+    """Yield NDJSON for the /projects/export?format=ndjson download."""
+    lines = []
+    for row in query.yield_per(batch_size):
+        lines.append(ndjson_line(history_record(row)))
+        if len(lines) >= batch_size:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines)
+
+def region_dir(region, export_dir=None):
+    return os.path.join(export_dir or Config.HISTORY_EXPORT_DIR, f'region={region}')
+
+def partition_path(region, day, fmt, export_dir=None):
+    extension = 'parquet' if fmt == 'parquet' else 'ndjson.gz'
+    return os.path.join(region_dir(region, export_dir), f'updated_date={day.isoformat()}', f'projects.{extension}')
+
+def read_watermark(region, export_dir=None):
+    path = os.path.join(region_dir(region, export_dir), WATERMARK_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return datetime.strptime(f.read().strip(), '%Y-%m-%d').date()
+
+def _write_watermark(region, day, export_dir=None):
+    directory = region_dir(region, export_dir)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, WATERMARK_FILE)
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        f.write(day.isoformat())
+    os.replace(f'{path}.tmp', path)
+
+def _write_partition(path, records, fmt):
+    # Written beside the final name and swapped in, so a loader never
+    # sees a partial partition
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    if fmt == 'parquet':
+        pa, pq = _arrow()
+        pq.write_table(pa.Table.from_pylist(records, schema=arrow_schema()), temp_path, compression='zstd')
+    else:
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            for record in records:
+                f.write(ndjson_line(record))
+    os.replace(temp_path, path)
+
+def export_history(region, since=None, through=None, fmt=None, export_dir=None, batch_size=1000):
+    """Write the partitions of one region for each finished day not yet exported.
+
+    Runs from the day after the region's watermark (or its first change)
+    through yesterday, UTC, by default. Rows are streamed in updated_at
+    order and each day is written as soon as it is complete, so memory
+    is bounded by one day of changes. Returns {day: rows} for the
+    partitions written.
+    """
+    fmt = resolve_format(fmt)
+    through = through or datetime.utcnow().date() - timedelta(days=1)
+    if since is None:
+        watermark = read_watermark(region, export_dir)
+        if watermark:
+            since = watermark + timedelta(days=1)
+        else:
+            first = db.session.query(db.func.min(Project.updated_at)).filter(Project.region == region).scalar()
+            if first is None:
+                return {}
+            since = first.date()
+    if since > through:
+        return {}
+
+    written = {}
+    current_day, records = None, []
+    query = history_query(
+        region=region,
+        updated_from=datetime.combine(since, datetime.min.time()),
+        updated_to=datetime.combine(through + timedelta(days=1), datetime.min.time())
+    )
+    for row in query.yield_per(batch_size):
+        day = row.updated_at.date()
+        if day != current_day and records:
+            _write_partition(partition_path(region, current_day, fmt, export_dir), records, fmt)
+            written[current_day] = len(records)
+            records = []
+        current_day = day
+        records.append(history_record(row))
+    if records:
+        _write_partition(partition_path(region, current_day, fmt, export_dir), records, fmt)
+        written[current_day] = len(records)
+
+    watermark = read_watermark(region, export_dir)
+    if watermark is None or through > watermark:
+        _write_watermark(region, through, export_dir)
+    return written
+
+def export_all_history(fmt=None, export_dir=None):
+    """Export new partitions for every region; returns {region: {day: rows}}."""
+    regions = [region for (region,) in db.session.query(Project.region).distinct() if region]
+    return {region: export_history(region, fmt=fmt, export_dir=export_dir) for region in sorted(regions)}
@@ -0,0 +1,233 @@
+import os
+import logging
+import threading
+import uuid
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+from flask import current_app
+from models import db
+from models.import_job import ImportJob
+from services.csv_service import bulk_import_customers, iter_upload_rows, map_customer_list_row, map_simple_row
+
+logger = logging.getLogger(__name__)
+
+# Row mappers an import job can be created with
+ROW_FORMATS = {
+    'simple': map_simple_row,
+    'customer_list': map_customer_list_row
+}
+
+def count_data_lines(path):
+    """Estimate the number of CSV rows by counting newlines past the header."""
+    lines = 0
+    last = b''
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            lines += block.count(b'\n')
+            last = block
+    if last and not last.endswith(b'\n'):
+        lines += 1
+    return max(lines - 1, 0)
+
+class ImportJobRunner:
+    """Runs customer import jobs on a small thread pool.
+
+    A job commits its progress together with each chunk of customers, so
+    after a crash or failure it picks up after the last committed chunk.
+    Once started, a sweeper thread requeues jobs whose process died.
+    """
+
+    def __init__(self, app, workers=None, upload_dir=None, stale_seconds=None, sweep_interval=None):
+        self.app = app
+        self.workers = workers or app.config.get('IMPORT_JOB_WORKERS', 1)
+        self.upload_dir = upload_dir or app.config.get('IMPORT_UPLOAD_DIR')
+        # A running job without progress for this long is treated as abandoned
+        self.stale_seconds = stale_seconds or app.config.get('IMPORT_JOB_STALE_SECONDS', 300)
+        self.sweep_interval = sweep_interval or app.config.get('IMPORT_JOB_SWEEP_SECONDS', 60)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='import-job')
+        self._stop = threading.Event()
+        self._sweeper = None
+        os.makedirs(self.upload_dir, exist_ok=True)
+        app.extensions['import_jobs'] = self
+
+    def create_job(self, upload, row_format='simple', update_existing=False):
+        """Save an uploaded file to disk, queue an import for it and return the job."""
+        if row_format not in ROW_FORMATS:
+            raise ValueError(f"Unknown import format: {row_format}")
+        job_id = str(uuid.uuid4())
+        path = os.path.join(self.upload_dir, f'{job_id}.csv')
+        upload.save(path)
+        job = ImportJob(
+            id=job_id,
+            filename=upload.filename,
+            path=path,
+            row_format=row_format,
+            update_existing=update_existing,
+            status='queued',
+            heartbeat_at=datetime.utcnow()
+        )
+        db.session.add(job)
+        db.session.commit()
+        self.submit(job_id)
+        return job
+
+    def is_stale(self, job):
+        """True for a running job whose process stopped committing progress."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        return job.status == 'running' and (job.heartbeat_at is None or job.heartbeat_at <= cutoff)
+
+    def resume_job(self, job):
+        """Requeue a failed or abandoned job; it continues from its last committed chunk."""
+        if job.status != 'failed' and not self.is_stale(job):
+            raise ValueError(f"Only failed or stalled jobs can be resumed (job is {job.status})")
+        if not os.path.exists(job.path):
+            raise ValueError("The uploaded file for this job is no longer available")
+        if job.status == 'running':
+            if not self._requeue_stale(job.id, job.heartbeat_at):
+                raise ValueError("The job was resumed by another process")
+            db.session.refresh(job)
+        else:
+            job.status = 'queued'
+            job.finished_at = None
+            job.heartbeat_at = datetime.utcnow()
+            db.session.commit()
+        self.submit(job.id)
+        return job
+
+    def start(self):
+        """Resume unfinished jobs now, then keep sweeping for abandoned ones.
+
+        A process that dies just before a restart leaves a heartbeat too
+        fresh to count as abandoned at startup, so one sweep is not enough.
+        """
+        self.resume_abandoned()
+        self._sweeper = threading.Thread(target=self._sweep, name='import-job-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def _sweep(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.resume_abandoned()
+            except Exception:
+                logger.exception("Import job sweep failed")
+
+    def _requeue_stale(self, job_id, heartbeat_at):
+        # Only one process gets to move a stale job back to the queue
+        updated = (
+            ImportJob.query
+            .filter_by(id=job_id, status='running', heartbeat_at=heartbeat_at)
+            .update({'status': 'queued', 'heartbeat_at': datetime.utcnow()},
+                    synchronize_session=False)
+        )
+        db.session.commit()
+        return bool(updated)
+
+    def resume_abandoned(self):
+        """Queue jobs left behind by a dead process; returns how many."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        with self.app.app_context():
+            jobs = (
+                db.session.query(ImportJob.id, ImportJob.status, ImportJob.heartbeat_at)
+                .filter(ImportJob.status.in_(('queued', 'running')))
+                .all()
+            )
+            resumed = 0
+            for job_id, status, heartbeat_at in jobs:
+                if status == 'running':
+                    if heartbeat_at and heartbeat_at > cutoff:
+                        continue
+                    if not self._requeue_stale(job_id, heartbeat_at):
+                        continue
+                self.submit(job_id)
+                resumed += 1
+            db.session.remove()
+        if resumed:
+            logger.info("Resuming %d unfinished import jobs", resumed)
+        return resumed
+
+    def submit(self, job_id):
+        return self._executor.submit(self._run, job_id)
+
+    def shutdown(self, wait=False):
+        self._stop.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            try:
+                self._process(job_id)
+            except Exception:
+                logger.exception("Import job %s crashed", job_id)
+            finally:
+                db.session.remove()
+
+    def _process(self, job_id):
+        now = datetime.utcnow()
+        # Claim the job so it is never processed twice
+        claimed = (
+            ImportJob.query
+            .filter_by(id=job_id, status='queued')
+            .update({'status': 'running', 'heartbeat_at': now}, synchronize_session=False)
+        )
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(ImportJob, job_id)
+        if job.started_at is None:
+            job.started_at = now
+        job.resumed_at = now
+        job.resumed_rows = job.rows_processed
+        if job.total_rows is None:
+            job.total_rows = count_data_lines(job.path)
+        db.session.commit()
+
+        base = {
+            'rows': job.rows_processed,
+            'inserted': job.inserted,
+            'updated': job.updated,
+            'skipped': job.skipped
+        }
+        logger.info("Import job %s starting at row %d of ~%s", job_id, base['rows'], job.total_rows)
+
+        def record_progress(result):
+            # Runs inside the chunk's transaction, so progress and rows commit together
+            job.rows_processed = base['rows'] + result['rows']
+            job.inserted = base['inserted'] + result['inserted']
+            job.updated = base['updated'] + result['updated']
+            job.skipped = base['skipped'] + result['skipped']
+            job.heartbeat_at = datetime.utcnow()
+
+        try:
+            with open(job.path, 'rb') as file, closing(iter_upload_rows(file)) as reader:
+                rows = islice(reader, base['rows'], None)
+                bulk_import_customers(rows, ROW_FORMATS[job.row_format],
+                                      update_existing=job.update_existing,
+                                      chunk_size=current_app.config.get('IMPORT_JOB_CHUNK_SIZE', 1000),
+                                      on_chunk=record_progress)
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(ImportJob, job_id)
+            job.status = 'failed'
+            job.error_count += 1
+            job.last_error = str(e)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            logger.error("Import job %s failed after %d rows: %s", job_id, job.rows_processed, e)
+            return
+
+        job.status = 'completed'
+        job.total_rows = job.rows_processed
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        try:
+            os.remove(job.path)
+        except OSError:
+            pass
+        logger.info("Import job %s completed: %d inserted, %d updated, %d skipped",
+                    job_id, job.inserted, job.updated, job.skipped)
+
+def get_import_runner():
+    return current_app.extensions['import_jobs']
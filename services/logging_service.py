@@ -0,0 +1,128 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+
+REDACTED = '[REDACTED]'
+
+# Secrets that must never reach the log output, whatever a caller passes in
+REDACTION_PATTERNS = (
+    (re.compile(r'(Bearer\s+)[\w\-.~+/]+=*', re.IGNORECASE), r'\1' + REDACTED),
+    (re.compile(r'eyJ[\w-]+\.[\w-]+\.[\w-]+'), REDACTED),  # JWTs
+    (re.compile(r'SG\.[\w-]{10,}\.[\w-]+'), REDACTED),  # SendGrid API keys
+    (re.compile(r'\b(?:scrypt|pbkdf2)[:\w]*\$\S+'), REDACTED),  # Werkzeug password hashes
+    (re.compile(r'((?:password|api_key|apikey|secret|token|authorization)["\']?\s*[:=]\s*["\']?)[^\s"\',}]+',
+                re.IGNORECASE), r'\1' + REDACTED),
+)
+
+# Records waiting for the writer thread; when full, new records are dropped
+# rather than blocking the request that logged them
+QUEUE_SIZE = 10000
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+def redact(text):
+    for pattern, replacement in REDACTION_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+class RedactingFormatter(logging.Formatter):
+    """Formats a record, then masks tokens, keys and hashes in the whole line."""
+
+    def format(self, record):
+        return redact(super().format(record))
+
+class JsonFormatter(RedactingFormatter):
+    """One JSON object per line for log shippers."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return redact(json.dumps(entry))
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread without formatting or blocking.
+
+    Only the %-arguments are merged here, since they may change after the
+    call returns; formatting, redaction and the write itself happen on the
+    listener thread.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener = None
+_queue_handler = None
+
+def configure_logging(level='INFO', log_format='text', stream=None):
+    """Route every logger through a queue to a single writer thread.
+
+    Safe to call more than once; later calls only change the level.
+    """
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return _queue_handler
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == 'json' else RedactingFormatter(TEXT_FORMAT))
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _queue_handler
+
+def _restart_after_fork():
+    """Give a forked child its own queue and writer thread.
+
+    Threads do not survive fork(), so a worker forked from a preloaded
+    parent would otherwise queue records that nothing ever writes.
+    """
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    _queue_handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+def stop_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,167 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db
+from models.notification import NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+class LiveTransport:
+    """Delivers outbox messages through SendGrid and Twilio."""
+
+    def __init__(self):
+        self._email_service = None
+
+    @property
+    def email_service(self):
+        if self._email_service is None:
+            from services.email_service import get_email_service
+            self._email_service = get_email_service()
+        return self._email_service
+
+    def send(self, kind, payload):
+        # Email sends raise with SendGrid's status and body, which end up in last_error
+        if kind == 'project_confirmation':
+            ok = self.email_service.send_project_confirmation(**payload, raise_errors=True)
+        elif kind == 'project_update':
+            ok = self.email_service.send_project_update(**payload, raise_errors=True)
+        elif kind == 'project_sms':
+            from services.sms_service import SMSService
+            ok = SMSService().schedule_project_notification(**payload)
+        else:
+            raise ValueError(f"Unknown notification kind: {kind}")
+        if not ok:
+            raise RuntimeError(f"{kind} delivery was rejected")
+
+class FakeTransport:
+    """In-memory transport for tests and local development.
+
+    Records every delivered message in `sent`; the first `fail_times`
+    sends raise so retry handling can be exercised.
+    """
+
+    def __init__(self, fail_times=0):
+        self.sent = []
+        self.fail_times = fail_times
+        self._lock = threading.Lock()
+
+    def send(self, kind, payload):
+        with self._lock:
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise RuntimeError('Simulated delivery failure')
+            self.sent.append((kind, payload))
+
+class OutboxWorker:
+    """Pool of threads draining notification_outbox with retries and backoff."""
+
+    def __init__(self, app, transport=None, workers=None, poll_interval=None,
+                 max_attempts=None, backoff_seconds=None, batch_size=10):
+        self.app = app
+        self.transport = transport or LiveTransport()
+        self.workers = workers or app.config.get('OUTBOX_WORKERS', 2)
+        self.poll_interval = poll_interval or app.config.get('OUTBOX_POLL_INTERVAL', 5)
+        self.max_attempts = max_attempts or app.config.get('OUTBOX_MAX_ATTEMPTS', 5)
+        self.backoff_seconds = backoff_seconds or app.config.get('OUTBOX_BACKOFF_SECONDS', 30)
+        # How long a claimed message stays reserved before another worker may retry it
+        self.lease_seconds = app.config.get('OUTBOX_LEASE_SECONDS', 300)
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        app.extensions['outbox_worker'] = self
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'outbox-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Outbox worker started with %d threads", self.workers)
+
+    def wake(self):
+        """Skip the poll wait; called right after new messages are committed."""
+        self._wake.set()
+
+    def shutdown(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.drain()
+            except Exception:
+                logger.exception("Outbox worker error")
+                processed = 0
+            if not processed:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def drain(self):
+        """Deliver every message that is currently due; returns how many were attempted."""
+        total = 0
+        with self.app.app_context():
+            while not self._stop.is_set():
+                claimed = self._claim_batch()
+                if not claimed:
+                    break
+                for message_id, kind, payload, attempts in claimed:
+                    self._deliver(message_id, kind, payload, attempts)
+                total += len(claimed)
+            db.session.remove()
+        return total
+
+    def _claim_batch(self):
+        now = datetime.utcnow()
+        candidates = (
+            db.session.query(NotificationOutbox.id, NotificationOutbox.attempts)
+            .filter(NotificationOutbox.status.in_(('pending', 'processing')))
+            .filter(NotificationOutbox.next_attempt_at <= now)
+            .order_by(NotificationOutbox.next_attempt_at, NotificationOutbox.id)
+            .limit(self.batch_size)
+            .all()
+        )
+        claimed = []
+        lease_until = now + timedelta(seconds=self.lease_seconds)
+        for message_id, attempts in candidates:
+            # Optimistic claim: only one worker can move attempts past the value it saw
+            updated = (
+                NotificationOutbox.query
+                .filter_by(id=message_id, attempts=attempts)
+                .update({'status': 'processing', 'attempts': attempts + 1, 'next_attempt_at': lease_until},
+                        synchronize_session=False)
+            )
+            db.session.commit()
+            if updated:
+                message = db.session.get(NotificationOutbox, message_id)
+                claimed.append((message.id, message.kind, message.data, message.attempts))
+        return claimed
+
+    def _deliver(self, message_id, kind, payload, attempts):
+        try:
+            self.transport.send(kind, payload)
+            values = {'status': 'sent', 'sent_at': datetime.utcnow(), 'last_error': None}
+        except Exception as e:
+            if attempts >= self.max_attempts:
+                values = {'status': 'failed', 'last_error': str(e)}
+                logger.error("Giving up on notification %s after %d attempts: %s", message_id, attempts, e)
+            else:
+                delay = self.backoff_seconds * (2 ** (attempts - 1))
+                values = {
+                    'status': 'pending',
+                    'last_error': str(e),
+                    'next_attempt_at': datetime.utcnow() + timedelta(seconds=delay)
+                }
+                logger.warning("Notification %s failed (attempt %d), retrying in %ds: %s", message_id, attempts, delay, e)
+        NotificationOutbox.query.filter_by(id=message_id).update(values, synchronize_session=False)
+        db.session.commit()
+
+def wake_outbox_worker():
+    """Nudge the app's outbox worker, if one is running, after a commit."""
+    worker = current_app.extensions.get('outbox_worker')
+    if worker:
+        worker.wake()
@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+from config import Config
+
+class PasswordVerifierBusy(Exception):
+    """Raised when every verification slot is taken; the caller should retry later."""
+
+_method_prefixes = {}
+
+def method_prefix(method):
+    """The method as Werkzeug writes it into a hash, e.g. 'scrypt' -> 'scrypt:32768:8:1'."""
+    if method not in _method_prefixes:
+        # Werkzeug fills in its defaults for whatever the method leaves out;
+        # hashing an empty password once is the simplest way to learn them
+        _method_prefixes[method] = generate_password_hash('', method=method).split('$', 1)[0]
+    return _method_prefixes[method]
+
+def hash_password(password, method=None):
+    return generate_password_hash(password, method=method or Config.PASSWORD_HASH_METHOD)
+
+def needs_rehash(password_hash, method=None):
+    """True when a stored hash was made with other settings than the configured ones."""
+    if not password_hash:
+        return False
+    return password_hash.split('$', 1)[0] != method_prefix(method or Config.PASSWORD_HASH_METHOD)
+
+def verify_and_rehash(password_hash, password, method=None):
+    """Check a password; returns (ok, new_hash), new_hash set when the stored one is outdated."""
+    if not password_hash or not check_password_hash(password_hash, password):
+        return False, None
+    if needs_rehash(password_hash, method):
+        return True, hash_password(password, method)
+    return True, None
+
+class PasswordVerifier:
+    """Runs password checks on a small pool with a cap on admitted work.
+
+    Hashing is CPU-bound and deliberately slow. At most `workers` checks
+    run at once and at most `queue_size` more wait; beyond that verify()
+    raises PasswordVerifierBusy right away instead of tying up another
+    request thread, so a burst of logins cannot starve other traffic.
+    """
+
+    def __init__(self, workers=2, queue_size=16, timeout=10):
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-verifier')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+
+    def verify(self, password_hash, password):
+        """(ok, new_hash) as from verify_and_rehash(), computed on the pool."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordVerifierBusy()
+        try:
+            future = self._executor.submit(verify_and_rehash, password_hash, password)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._finished)
+        return future.result(timeout=self.timeout)
+
+    def _finished(self, future):
+        self._slots.release()
+        with self._lock:
+            self.completed += 1
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.workers, 'completed': self.completed, 'rejected': self.rejected}
+
+password_verifier = PasswordVerifier(
+    workers=Config.PASSWORD_VERIFY_WORKERS,
+    queue_size=Config.PASSWORD_VERIFY_QUEUE,
+    timeout=Config.PASSWORD_VERIFY_TIMEOUT
+)
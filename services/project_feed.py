@@ -0,0 +1,139 @@
+import base64
+import json
+import logging
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import tuple_
+from models import db
+from models.project import Project
+from models.customer import Customer
+from models.project_type import WorkType, JobCostType, project_work_types, project_job_cost_types
+
+logger = logging.getLogger(__name__)
+
+# Rows are pulled from the cursor in batches of this size while streaming
+FEED_BATCH_SIZE = 500
+
+# Upper bound for a single keyset page
+MAX_PAGE_SIZE = 1000
+
+# Only the columns the calendar actually renders - no full ORM entities
+FEED_COLUMNS = (
+    Project.id,
+    Project.date,
+    Project.po,
+    Project.address,
+    Project.city,
+    Project.subdivision,
+    Project.lot_number,
+    Project.square_footage,
+    Project.job_cost_type,
+    Project.work_type,
+    Project.notes,
+    Project.region,
+    Customer.name.label('customer_name'),
+    Customer.phone.label('customer_phone'),
+    Customer.email.label('customer_email'),
+)
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD string, returning None for empty values."""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def encode_cursor(row):
+    """Opaque keyset cursor pointing just past the given feed row."""
+    raw = f"{row.date.strftime('%Y-%m-%d')}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on malformed input."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        date_str, project_id = raw.split('|', 1)
+        return parse_date(date_str), project_id
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def feed_query(region, start=None, end=None, after=None, work_type=None, job_cost_type=None):
+    """Single joined query returning project + customer columns for a region.
+
+    start/end bound the date window (inclusive) and after is a decoded
+    (date, id) cursor; all three ride the (region, date, id) index.
+    work_type/job_cost_type restrict to projects tagged with that type
+    through the indexed association tables.
+    """
+    query = (
+        db.session.query(*FEED_COLUMNS)
+        .outerjoin(Customer, Customer.id == Project.customer_id)
+        .filter(Project.region == region)
+    )
+    if start:
+        query = query.filter(Project.date >= start)
+    if end:
+        query = query.filter(Project.date <= end)
+    if after:
+        query = query.filter(tuple_(Project.date, Project.id) > tuple_(*after))
+    if work_type:
+        query = (query.join(project_work_types, project_work_types.c.project_id == Project.id)
+                 .join(WorkType, WorkType.id == project_work_types.c.work_type_id)
+                 .filter(WorkType.name == work_type))
+    if job_cost_type:
+        query = (query.join(project_job_cost_types, project_job_cost_types.c.project_id == Project.id)
+                 .join(JobCostType, JobCostType.id == project_job_cost_types.c.job_cost_type_id)
+                 .filter(JobCostType.name == job_cost_type))
+    return query.order_by(Project.date, Project.id)
+
+def fetch_page(query, limit):
+    """Return (rows, next_cursor) for one keyset page of a feed query."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+def feed_row_to_dict(row):
+    """Convert a feed row into the dict shape the calendar front end expects."""
+    return {
+        'id': row.id,
+        'date': row.date.strftime('%Y-%m-%d'),
+        'po': row.po,
+        'customer_name': row.customer_name if row.customer_name is not None else "Unknown",
+        'customer_phone': row.customer_phone or "",
+        'customer_email': row.customer_email or "",
+        'address': row.address,
+        'city': row.city,
+        'subdivision': row.subdivision,
+        'lot_number': row.lot_number,
+        'square_footage': row.square_footage,
+        'job_cost_type': row.job_cost_type.split(',') if row.job_cost_type else [],
+        'work_type': row.work_type.split(',') if row.work_type else [],
+        'notes': row.notes,
+        'region': row.region
+    }
+
+def stream_json_array(query):
+    """Return a generator of JSON array chunks so the response never holds every row.
+
+    The query runs and its first batch is serialized before this returns,
+    so a failing query or row still lets the caller answer with an error
+    instead of a 200 it cannot take back.
+    """
+    rows = iter(query.yield_per(FEED_BATCH_SIZE))
+    first = [json.dumps(feed_row_to_dict(row)) for row in islice(rows, FEED_BATCH_SIZE)]
+    return _json_array_chunks(first, rows)
+
+def _json_array_chunks(first, rows):
+    yield '[' + ','.join(first)
+    try:
+        for row in rows:
+            yield ',' + json.dumps(feed_row_to_dict(row))
+    except Exception:
+        # Too late for an error status; re-raising makes the server drop the
+        # connection, so the client sees an incomplete body rather than a
+        # well-formed array that is silently missing rows
+        logger.exception("Project feed failed after the response started")
+        raise
+    yield ']'
@@ -0,0 +1,48 @@
+from models import db
+from models.project import Project
+from models.project_type import WorkType, JobCostType, project_work_types, project_job_cost_types, clean_type_names
+
+# (string column, lookup model, association table, association type column)
+TYPE_COLUMNS = (
+    (Project.work_type, WorkType, project_work_types, 'work_type_id'),
+    (Project.job_cost_type, JobCostType, project_job_cost_types, 'job_cost_type_id'),
+)
+
+def project_types_pending():
+    """True when projects carry type names but the association tables were never filled."""
+    for _, _, table, _ in TYPE_COLUMNS:
+        if db.session.query(table.c.project_id).first() is not None:
+            return False
+    tagged = db.session.query(Project.id).filter((Project.work_type != '') | (Project.job_cost_type != ''))
+    return tagged.first() is not None
+
+def migrate_project_types(batch_size=1000):
+    """Backfill the type association tables from the comma-joined columns.
+
+    Only touches projects that have no association rows yet, so it is
+    safe to re-run. Returns the number of association rows written.
+    """
+    migrated = 0
+    for column, model, table, type_column in TYPE_COLUMNS:
+        type_ids = {t.name: t.id for t in model.query.all()}
+        done = {row[0] for row in db.session.query(table.c.project_id).distinct()}
+        pending = []
+        for project_id, value in db.session.query(Project.id, column).yield_per(batch_size):
+            if project_id in done:
+                continue
+            for name in clean_type_names(value):
+                if name not in type_ids:
+                    new_type = model(name=name)
+                    db.session.add(new_type)
+                    db.session.flush()
+                    type_ids[name] = new_type.id
+                pending.append({'project_id': project_id, type_column: type_ids[name]})
+            if len(pending) >= batch_size:
+                db.session.execute(table.insert(), pending)
+                migrated += len(pending)
+                pending = []
+        if pending:
+            db.session.execute(table.insert(), pending)
+            migrated += len(pending)
+    db.session.commit()
+    return migrated
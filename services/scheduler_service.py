@@ -4,14 +4,24 @@ from datetime import datetime, timedelta
 from models import db
 from models.project import Project
 from models.customer import Customer
-from services.email_service import EmailService
+from models.project_type import clean_type_names
+from concurrent.futures import ThreadPoolExecutor
+from services.email_service import get_email_service
+from services.history_export import export_all_history
+import logging
 import pytz
+import time
+
+logger = logging.getLogger(__name__)
 
 class SchedulerService:
     def __init__(self, app):
         self.app = app
         self.scheduler = BackgroundScheduler()
-        self.email_service = EmailService()
+        self.email_service = get_email_service()
+        # Reminders are sent by a bounded pool sharing the pooled SendGrid session
+        self.send_concurrency = app.config.get('REMINDER_SEND_CONCURRENCY', 8)
+        self.last_run_report = None
         
         # Add job to check for upcoming projects and send reminders
         self.scheduler.add_job(
@@ -22,70 +32,111 @@ class SchedulerService:
             replace_existing=True
         )
         
+        # Write yesterday's project history partitions for the nightly warehouse load
+        self.scheduler.add_job(
+            func=self.export_project_history,
+            trigger=CronTrigger(hour=1, timezone=pytz.utc),
+            id='export_project_history',
+            name='Export finished days of project history',
+            replace_existing=True
+        )
+        
         # Start the scheduler
         self.scheduler.start()
-        print("\n=== Scheduler Service Initialized ===")
-        print("Production mode: checking for upcoming projects daily at 9:00 AM")
-        print("Next check scheduled for: 9:00 AM tomorrow")
-        print("=======================================\n")
+        logger.info("Scheduler started: reminders daily at 9:00 AM, history export at 01:00 UTC")
 
-    def check_upcoming_projects(self):
-        """Check for projects scheduled for tomorrow and send reminder emails."""
-        with self.app.app_context():
-            try:
-                # Get tomorrow's date
-                tomorrow = datetime.now().date() + timedelta(days=1)
-                print(f"\n=== Checking Projects [{datetime.now()}] ===")
-                print(f"Looking for projects scheduled for: {tomorrow}")
+    def load_reminders(self, day):
+        """Reminder keyword arguments for every project on `day`, in one joined query."""
+        rows = (
+            db.session.query(Project, Customer)
+            .outerjoin(Customer, Customer.id == Project.customer_id)
+            .filter(Project.date == day)
+            .order_by(Project.id)
+            .all()
+        )
+        reminders = []
+        skipped = 0
+        for project, customer in rows:
+            if not customer or not customer.email:
+                logger.debug("No customer or email found for project %s", project.id)
+                skipped += 1
+                continue
+            reminders.append({
+                'customer_email': customer.email,
+                'customer_name': customer.name,
+                'project_date': project.date.strftime('%Y-%m-%d'),
+                'address': project.address,
+                'customer_phone': customer.phone,
+                'po': project.po,
+                'city': project.city,
+                'subdivision': project.subdivision,
+                'lot_number': project.lot_number,
+                'square_footage': project.square_footage,
+                'job_cost_type': clean_type_names(project.job_cost_type),
+                'work_type': clean_type_names(project.work_type),
+                'notes': project.notes,
+                'region': project.region
+            })
+        return reminders, skipped
 
-                # Query for projects scheduled for tomorrow
-                projects = Project.query.filter_by(date=tomorrow).all()
-                print(f"Found {len(projects)} projects scheduled for tomorrow")
+    def _send_reminder(self, reminder):
+        try:
+            return bool(self.email_service.send_project_reminder(**reminder))
+        except Exception:
+            logger.exception("Error sending reminder for %s", reminder['project_date'])
+            return False
 
-                # Send reminders for each project
-                for project in projects:
-                    try:
-                        # Get customer details
-                        customer = Customer.query.get(project.customer_id)
-                        if not customer or not customer.email:
-                            print(f"No customer or email found for project {project.id}")
-                            continue
+    def check_upcoming_projects(self):
+        """Check for projects scheduled for tomorrow and send reminder emails.
 
-                        print(f"Sending reminder for project {project.id}")
-                        print(f"Customer: {customer.name}")
-                        print(f"Email: {customer.email}")
-                        print(f"Project Date: {project.date}")
-                        print(f"Address: {project.address}")
-                        
-                        # Send reminder email
-                        self.email_service.send_project_reminder(
-                            customer_email=customer.email,
-                            customer_name=customer.name,
-                            project_date=project.date.strftime('%Y-%m-%d'),
-                            address=project.address,
-                            customer_phone=customer.phone,
-                            po=project.po,
-                            city=project.city,
-                            subdivision=project.subdivision,
-                            lot_number=project.lot_number,
-                            square_footage=project.square_footage,
-                            job_cost_type=project.job_cost_type.split(',') if project.job_cost_type else [],
-                            work_type=project.work_type.split(',') if project.work_type else [],
-                            notes=project.notes,
-                            region=project.region
-                        )
-                        print(f"✓ Reminder sent successfully for project {project.id}")
+        Returns a per-run report with sent/failed/skipped counts and
+        throughput, also kept on self.last_run_report.
+        """
+        started = time.perf_counter()
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        logger.info("Checking for projects scheduled for %s", tomorrow)
+        report = {'date': tomorrow.isoformat(), 'projects': 0, 'sent': 0, 'failed': 0, 'skipped': 0}
+        try:
+            # Only the load needs the app context; sending happens after it is released
+            with self.app.app_context():
+                reminders, report['skipped'] = self.load_reminders(tomorrow)
+                db.session.remove()
+            report['projects'] = len(reminders) + report['skipped']
+            logger.debug("Found %d projects scheduled for tomorrow", report['projects'])
 
-                    except Exception as e:
-                        print(f"Error sending reminder for project {project.id}: {str(e)}")
-                        continue
+            if reminders:
+                with ThreadPoolExecutor(max_workers=self.send_concurrency,
+                                        thread_name_prefix='reminder-sender') as pool:
+                    for ok in pool.map(self._send_reminder, reminders):
+                        if ok:
+                            report['sent'] += 1
+                        else:
+                            report['failed'] += 1
+        except Exception:
+            logger.exception("Error checking upcoming projects")
 
-                print("=== Check Complete ===\n")
+        elapsed = time.perf_counter() - started
+        report['seconds'] = round(elapsed, 3)
+        report['per_second'] = round(report['sent'] / elapsed, 2) if elapsed > 0 else 0.0
+        self.last_run_report = report
+        logger.info("Reminders: %d sent, %d failed, %d skipped in %ss (%s/s)",
+                    report['sent'], report['failed'], report['skipped'], report['seconds'], report['per_second'])
+        return report
 
-            except Exception as e:
-                print(f"Error checking upcoming projects: {str(e)}")
+    def export_project_history(self):
+        """Write every finished day of project changes not yet exported."""
+        try:
+            with self.app.app_context():
+                results = export_all_history()
+                db.session.remove()
+            for region, written in results.items():
+                logger.info("History export for %s: %d partitions, %d rows", region, len(written), sum(written.values()))
+            return results
+        except Exception:
+            logger.exception("Error exporting project history")
+            return None
 
     def shutdown(self):
         """Shut down the scheduler."""
         self.scheduler.shutdown()
-        print("Scheduler shut down") 
\ No newline at end of file
+        logger.info("Scheduler shut down") 
\ No newline at end of file
@@ -1,6 +1,10 @@
+import logging
 from twilio.rest import Client
 from flask import current_app
 from datetime import datetime, timedelta
+from models.customer import normalize_phone
+
+logger = logging.getLogger(__name__)
 
 class SMSService:
     def __init__(self):
@@ -11,9 +15,11 @@ class SMSService:
 
     def schedule_project_notification(self, phone_number, customer_name, project_date, address):
         try:
-            # Format phone number if needed
-            if not phone_number.startswith('+'):
-                phone_number = '+1' + phone_number  # Add US country code if missing
+            # Twilio needs E.164; raw form input like "(801) 555-1234" is normalized here
+            normalized = normalize_phone(phone_number)
+            if not normalized:
+                raise ValueError(f"Invalid phone number: {phone_number}")
+            phone_number = normalized
 
             # Schedule message for day before project
             notification_date = datetime.strptime(project_date, '%Y-%m-%d') - timedelta(days=1)
@@ -25,20 +31,15 @@ class SMSService:
                 f"If you have any questions, please contact us."
             )
 
-            print(f"Attempting to send SMS to {phone_number}")  # Debug log
-            print(f"Message content: {message}")  # Debug log
-            print(f"Scheduled for: {notification_date}")  # Debug log
-
             # Send message immediately for testing
             message = self.client.messages.create(
                 to=phone_number,
                 from_=current_app.config['TWILIO_PHONE_NUMBER'],
                 body=message
             )
-            
-            print(f"Message SID: {message.sid}")  # Debug log
+            logger.debug("Sent SMS %s", message.sid)
             return True
 
         except Exception as e:
-            print(f"Error sending SMS: {str(e)}")  # Debug log
+            logger.exception("Error sending SMS")
             raise e 
\ No newline at end of file
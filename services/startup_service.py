@@ -0,0 +1,211 @@
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime
+from flask import current_app
+from models import db
+from models.user import Role, ROLES
+from models.seed_manifest import SeedManifest
+from services.csv_service import import_customers_from_csv
+from services.customer_service import migrate_customer_phones
+from services.project_type_service import migrate_project_types, project_types_pending
+from services.analytics_service import daily_stats_pending, rebuild_daily_stats
+from services.customer_search import ensure_search_index, SEARCH_TRIGGERS
+from services.customer_autocomplete import ensure_change_log, drop_change_log, CHANGE_TRIGGERS
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Manifest name of data/cust_list.csv
+CUSTOMER_SEED = 'customers'
+
+# Columns added to existing tables after their first release: (table, column, DDL)
+ADDED_COLUMNS = (
+    ('import_jobs', 'resumed_at', 'DATETIME'),
+    ('import_jobs', 'resumed_rows', 'INTEGER NOT NULL DEFAULT 0'),
+)
+
+# Kept in PRAGMA user_version once the data backfills below have run
+# against a database; bump it when adding one, so it runs on next start
+DATA_VERSION = 1
+
+def schema_objects():
+    """{'table': {name: sql}, 'index': {...}, 'trigger': {...}, 'data_version': n} in a single read."""
+    objects = {'table': {}, 'index': {}, 'trigger': {}, 'data_version': 0}
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT type, name, sql FROM sqlite_master WHERE type IN ('table', 'index', 'trigger') "
+            "UNION ALL SELECT 'data_version', NULL, user_version FROM pragma_user_version")
+        for kind, name, sql in rows:
+            if kind == 'data_version':
+                objects[kind] = sql or 0
+            else:
+                objects[kind][name] = sql or ''
+    return objects
+
+def ensure_schema():
+    """Create or migrate only what the live schema is missing; returns the steps taken."""
+    objects = schema_objects()
+    tables = objects['table']
+    steps = []
+    if not set(db.metadata.tables) <= set(tables):
+        db.create_all()
+        steps.append('create_all')
+    # Columns added to tables that already existed; create_all skips those
+    added = [(table, column, ddl) for table, column, ddl in ADDED_COLUMNS
+             if table in tables and column not in tables[table]]
+    if added:
+        with db.engine.begin() as conn:
+            for table, column, ddl in added:
+                conn.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}')
+        steps.append('add_columns')
+    # Databases from before customer.phone_e164 get it backfilled and deduped;
+    # ALTER TABLE rewrites the stored CREATE statement, so the column shows there
+    if 'customer' in tables and 'phone_e164' not in tables['customer']:
+        migrate_customer_phones()
+        steps.append('normalize_phones')
+    # Data backfills look at rows rather than the schema, so they are only
+    # checked until they have run once against this database
+    if objects['data_version'] < DATA_VERSION:
+        # Databases from before the type tables get them filled from the
+        # comma-joined columns, or type filters and analytics find nothing
+        if 'project' in tables and ('project_work_types' not in tables or project_types_pending()):
+            migrate_project_types()
+            steps.append('project_types')
+        # The rollup is computed from the association tables, so it is rebuilt
+        # after the backfill above; until then analytics would show zeros
+        if 'project' in tables and daily_stats_pending():
+            rebuild_daily_stats()
+            steps.append('daily_stats')
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql(f'PRAGMA user_version = {DATA_VERSION}')
+    # create_all only indexes the tables it creates; indexes added to the
+    # models later are created here on the tables that already existed
+    indexes = schema_objects()['index'] if steps else objects['index']
+    if ensure_indexes(tables, indexes):
+        steps.append('indexes')
+    # Customer search index and the triggers that keep it in sync
+    if 'customer_search' not in tables or not set(SEARCH_TRIGGERS) <= set(objects['trigger']):
+        ensure_search_index()
+        steps.append('search_index')
+    # Change log the autocomplete indexes of all processes replay; without
+    # the index nothing reads it, so customer writes are not logged at all
+    triggers = set(objects['trigger'])
+    if current_app.config.get('CUSTOMER_AUTOCOMPLETE_INDEX'):
+        if 'customer_changes' not in tables or not set(CHANGE_TRIGGERS) <= triggers:
+            ensure_change_log()
+            steps.append('change_log')
+    elif 'customer_changes' in tables or set(CHANGE_TRIGGERS) & triggers:
+        drop_change_log()
+        steps.append('drop_change_log')
+    return steps
+
+def ensure_indexes(tables, indexes):
+    """Create model-declared indexes missing from existing tables; returns their names."""
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(bind=db.engine, checkfirst=True)
+                created.append(index.name)
+    if created:
+        # Refresh planner statistics so SQLite picks the new indexes
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql('ANALYZE')
+    return created
+
+def ensure_roles():
+    """Insert any predefined role the database lacks; returns the names created."""
+    existing = {name for (name,) in db.session.query(Role.name).filter(Role.name.in_(list(ROLES)))}
+    created = [name for name in ROLES if name not in existing]
+    for name in created:
+        db.session.add(Role(
+            name=name,
+            description=ROLES[name]['description'],
+            permissions=ROLES[name]['permissions']
+        ))
+    if created:
+        db.session.commit()
+    return created
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def seed_customers(csv_path, force=False):
+    """Import the customer seed file unless it is unchanged since it was last applied.
+
+    Unchanged means the same size and mtime, or failing that the same
+    content hash. Existing customers (matched by phone) are left alone.
+    Returns the import result, or None when the file was skipped.
+    """
+    stat = os.stat(csv_path)
+    manifest = db.session.get(SeedManifest, CUSTOMER_SEED)
+    if manifest and not force:
+        if manifest.size == stat.st_size and manifest.mtime_ns == stat.st_mtime_ns:
+            return None
+        sha256 = file_sha256(csv_path)
+        if manifest.sha256 == sha256:
+            # Touched but not changed; remember the new mtime so the hash is skipped next time
+            manifest.path = csv_path
+            manifest.mtime_ns = stat.st_mtime_ns
+            db.session.commit()
+            return None
+    else:
+        sha256 = file_sha256(csv_path)
+
+    result = import_customers_from_csv(csv_path, update_existing=False)
+    if not result['success']:
+        # No manifest update, so the next start tries again
+        return result
+    if manifest is None:
+        manifest = SeedManifest(name=CUSTOMER_SEED)
+        db.session.add(manifest)
+    manifest.path = csv_path
+    manifest.size = stat.st_size
+    manifest.mtime_ns = stat.st_mtime_ns
+    manifest.sha256 = sha256
+    manifest.rows = result['imported'] + result['skipped']
+    manifest.seeded_at = datetime.utcnow()
+    db.session.commit()
+    return result
+
+def prepare_database(data_dir):
+    """Idempotent startup: schema, roles and seed data, each skipped when already current.
+
+    A restart against an up-to-date database costs one read of
+    sqlite_master and the data version, one roles query, one seed
+    manifest lookup and a stat() of the seed file. Row-level checks (type
+    backfill, empty rollup) only run while the data version is behind.
+    Logs a warning when the work exceeds STARTUP_DB_BUDGET_MS.
+    """
+    started = time.perf_counter()
+    steps = ensure_schema()
+    for name in ensure_roles():
+        logger.info("Created role: %s", name)
+
+    csv_path = os.path.join(data_dir, 'cust_list.csv')
+    if os.path.exists(csv_path):
+        result = seed_customers(csv_path)
+        if result is None:
+            logger.debug("Customer seed unchanged, skipped")
+        elif result['success']:
+            logger.info("Seeded %d customers (%d skipped)", result['imported'], result['skipped'])
+        else:
+            logger.error("Error seeding customers: %s", result['error'])
+    else:
+        logger.debug("Customer CSV file not found at %s", csv_path)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms > Config.STARTUP_DB_BUDGET_MS:
+        logger.warning("Database startup took %.0f ms, over the %d ms budget (%s)",
+                       elapsed_ms, Config.STARTUP_DB_BUDGET_MS, ', '.join(steps) or 'no schema changes')
+    else:
+        logger.info("Database startup took %.0f ms", elapsed_ms)
+    return elapsed_ms
@@ -0,0 +1,88 @@
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from flask_jwt_extended import create_access_token
+from sqlalchemy.dialects.sqlite import insert
+from models import db
+from models.user import TokenVersion
+from config import Config
+
+class RevocationList:
+    """Process-wide copy of the token_versions table, reloaded every ttl seconds.
+
+    A token is rejected when its 'ver' claim is below its user's listed
+    version. Other processes see a revocation within ttl seconds; this
+    process sees it as soon as invalidate() is called after the commit.
+    """
+
+    def __init__(self, ttl=5):
+        self.ttl = ttl
+        self._versions = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        self._versions = dict(db.session.query(TokenVersion.user_id, TokenVersion.version))
+        self._loaded_at = time.monotonic()
+
+    def version(self, user_id):
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self._load()
+            return self._versions.get(user_id, 0)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+token_revocations = RevocationList(ttl=Config.TOKEN_REVOCATION_TTL)
+
+def current_token_version(user_id):
+    version = db.session.query(TokenVersion.version).filter_by(user_id=user_id).scalar()
+    return version or 0
+
+def user_token_claims(user):
+    """Signed claims that let the decorators authorize without a user lookup."""
+    return {
+        'username': user.username,
+        'email': user.email,
+        'role': user.role.name if user.role else None,
+        'perms': (user.role.permissions or 0) if user.role else 0,
+        'ver': current_token_version(user.id)
+    }
+
+def create_user_token(user):
+    return create_access_token(identity=str(user.id), additional_claims=user_token_claims(user))
+
+def has_user_claims(claims):
+    """False for tokens issued before claims were added; those are checked against the database."""
+    return 'perms' in claims and 'ver' in claims
+
+def token_revoked(user_id, claims):
+    return claims['ver'] < token_revocations.version(user_id)
+
+def revoke_user_tokens(user_id):
+    """Bump the user's token version in the current transaction.
+
+    Every token issued before the bump is rejected once the caller
+    commits; call token_revocations.invalidate() after the commit so this
+    process does not wait for its next reload.
+
+    Versions start from the current Unix time, so a user whose row was
+    pruned gets a version above any token issued before the prune. Rows
+    older than the token lifetime are pruned, since every token issued
+    before their revocation has expired.
+    """
+    now = datetime.utcnow()
+    stmt = insert(TokenVersion).values(user_id=user_id, version=int(time.time()), updated_at=now)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[TokenVersion.user_id],
+        set_={'version': db.func.max(TokenVersion.version + 1, stmt.excluded.version), 'updated_at': now}
+    ))
+    expires = current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+    (
+        TokenVersion.query
+        .filter(TokenVersion.updated_at < now - expires, TokenVersion.user_id != user_id)
+        .delete(synchronize_session=False)
+    )
@@ -0,0 +1,28 @@
+from sqlalchemy.orm import joinedload
+from models import db
+from models.user import User, UserSnapshot
+from services.cache import TTLCache
+from config import Config
+
+# User id -> UserSnapshot for the session loader and pre-claims tokens.
+# Cleared per user by the routes that change a user's role, status or
+# account; other processes pick those changes up within the TTL.
+user_cache = TTLCache(maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
+
+def load_user_snapshot(user_id):
+    """The user and role as a snapshot, or None when the user does not exist."""
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+    # Unknown ids are not cached, so a user created afterwards is found at once
+    generation = user_cache.generation
+    user = db.session.get(User, user_id, options=[joinedload(User.role)])
+    if user is None:
+        return None
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.set(user_id, snapshot, generation=generation)
+    return snapshot
+
+def invalidate_user(user_id):
+    """Drop a user's snapshot; call after committing a change to the user or its role."""
+    user_cache.invalidate(user_id)
@@ -0,0 +1,138 @@
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import uuid
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from models import db
+from models.customer import Customer
+from models.project import Project
+from routes.projects import projects_bp
+from services.startup_service import ensure_schema, ensure_roles
+
+@pytest.fixture
+def app(tmp_path):
+    """A bare app on a throwaway SQLite file, schema built the way startup builds it."""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config['TESTING'] = True
+    db.init_app(app)
+    app.register_blueprint(projects_bp, url_prefix='/projects')
+    with app.app_context():
+        ensure_schema()
+        ensure_roles()
+        yield app
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def auth_app(app):
+    """The app with the auth and user management routes, as create_app() registers them."""
+    import app as app_module
+    from flask_jwt_extended import JWTManager
+    from routes.auth import auth
+    from routes.user_management import user_management
+    from services.token_service import token_revocations
+    from services.user_cache import user_cache
+    JWTManager(app)
+    app_module.login_manager.init_app(app)
+    app.register_blueprint(auth, url_prefix='/auth')
+    app.register_blueprint(user_management, url_prefix='/auth')
+    # Process-wide caches must not carry users over from another test's database
+    token_revocations.invalidate()
+    user_cache.invalidate()
+    yield app
+    token_revocations.invalidate()
+    user_cache.invalidate()
+
+def add_user(username, role='viewer', password='pw'):
+    from models.user import Role, User
+    user = User(username, f'{username}@example.com', role=Role.query.filter_by(name=role).first())
+    user.set_password(password)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@contextmanager
+def count_queries():
+    """Collect every SQL statement sent to the database inside the block."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+def add_projects(count, region='north', day=date(2024, 5, 1), work_types=('sealing',)):
+    """Insert projects, each with its own customer; returns the projects."""
+    projects = []
+    first = db.session.query(Customer).count()
+    for i in range(first, first + count):
+        customer = Customer(name=f'Customer {i}', phone=f'801555{i:04d}', email=f'c{i}@example.com')
+        db.session.add(customer)
+        project = Project(id=str(uuid.uuid4()), date=day, address=f'{i} Main St', region=region, customer=customer)
+        db.session.add(project)
+        project.set_types(list(work_types), ['labor'])
+        projects.append(project)
+    db.session.commit()
+    return projects
+
+class SendGridStub(ThreadingHTTPServer):
+    """Local stand-in for the SendGrid API with keep-alive connections.
+
+    Answers every POST with `status` and counts accepted TCP connections
+    and requests, so tests can check retries and connection reuse.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SendGridHandler)
+        self.status = 202
+        self.body = b''
+        self.connections = 0
+        self.requests = 0
+        self.url = f'http://127.0.0.1:{self.server_address[1]}/v3/mail/send'
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+class _SendGridHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.requests += 1
+        self.send_response(self.server.status)
+        self.send_header('Content-Length', str(len(self.server.body)))
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def sendgrid():
+    server = SendGridStub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,44 @@
+from datetime import date
+
+import pytest
+
+from conftest import count_queries
+from models import db
+from routes.analytics import analytics
+from services.analytics_service import analytics_cache, apply_stat_changes
+
+@pytest.fixture
+def dashboard(app, client):
+    app.register_blueprint(analytics, url_prefix='/analytics')
+    analytics_cache.invalidate()
+    yield lambda: client.get('/analytics/data?timeFrame=year').get_json()
+    analytics_cache.invalidate()
+
+def other_worker_writes(*keys):
+    """Commit a rollup change the way a project write in another process does.
+
+    This process's analytics_cache.invalidate() is never called.
+    """
+    apply_stat_changes(added_keys=keys)
+    db.session.commit()
+
+def sealing(region='North'):
+    return (region, date.today(), 'work_type', 'sealing')
+
+def test_writes_from_another_process_retire_cached_counts(app, dashboard):
+    other_worker_writes(sealing())
+    assert dashboard()['north']['work_type'] == {'labels': ['sealing'], 'values': [1]}
+
+    other_worker_writes(sealing(), sealing('South'))
+    result = dashboard()
+    assert result['north']['work_type']['values'] == [2]
+    assert result['south']['work_type']['values'] == [1]
+
+def test_unchanged_counts_are_served_from_the_cache(app, dashboard):
+    other_worker_writes(sealing())
+    dashboard()
+    with count_queries() as statements:
+        assert dashboard()['north']['work_type']['values'] == [1]
+    # Only the generation check reaches the database
+    assert len(statements) == 1
+    assert 'cache_generations' in statements[0]
@@ -0,0 +1,64 @@
+import pytest
+from flask import jsonify
+from flask_jwt_extended import create_access_token
+
+from conftest import add_user, count_queries
+from models import db
+from routes.auth import token_required
+from services.token_service import create_user_token
+from services.user_cache import user_cache
+
+@pytest.fixture
+def client(auth_app):
+    @token_required
+    def whoami(current_user):
+        return jsonify(id=current_user.id, admin=bool(current_user.is_admin()))
+
+    auth_app.add_url_rule('/whoami', view_func=whoami)
+    return auth_app.test_client()
+
+def bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+def test_claims_tokens_are_authorized_without_queries(client):
+    token = create_user_token(add_user('admin', role='admin'))
+    client.get('/whoami', headers=bearer(token))  # loads the revocation list
+
+    with count_queries() as statements:
+        for _ in range(10):
+            response = client.get('/whoami', headers=bearer(token))
+            assert response.get_json()['admin'] is True
+    assert statements == []
+
+def test_pre_claims_tokens_fall_back_to_the_database(client):
+    user_id = add_user('old').id
+    token = create_access_token(identity=str(user_id))
+    user_cache.invalidate()
+    db.session.expunge_all()
+
+    with count_queries() as statements:
+        response = client.get('/whoami', headers=bearer(token))
+    assert response.status_code == 200
+    assert response.get_json() == {'id': user_id, 'admin': False}
+    assert any('FROM users' in statement for statement in statements)
+
+@pytest.mark.parametrize('change', ['role', 'status', 'delete'])
+def test_user_changes_reject_older_tokens(client, change):
+    admin = bearer(create_user_token(add_user('admin', role='admin')))
+    user = add_user('target', role='admin')
+    old_token = create_user_token(user)
+    assert client.get('/whoami', headers=bearer(old_token)).get_json()['admin'] is True
+
+    if change == 'role':
+        response = client.put(f'/auth/user/{user.id}/role', json={'role': 'viewer'}, headers=admin)
+    elif change == 'status':
+        response = client.put(f'/auth/user/{user.id}/status', json={'is_active': False}, headers=admin)
+    else:
+        response = client.delete(f'/auth/user/{user.id}', headers=admin)
+    assert response.status_code == 200
+
+    assert client.get('/whoami', headers=bearer(old_token)).status_code == 401
+    if change == 'role':
+        # A token issued after the change carries the new role
+        response = client.get('/whoami', headers=bearer(create_user_token(user)))
+        assert response.get_json()['admin'] is False
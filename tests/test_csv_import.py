@@ -0,0 +1,29 @@
+from models.customer import Customer
+from services.csv_service import bulk_import_customers, map_simple_row
+
+def rows(*entries):
+    return [{'name': name, 'phone': phone, 'email': ''} for name, phone in entries]
+
+def test_repeated_number_within_a_chunk_keeps_the_first_row(app):
+    result = bulk_import_customers(
+        rows(('Zed One', '801-555-7000'), ('Zed One dup', '(801) 555 7000'), ('Amy Two', '8015557001')),
+        map_simple_row, update_existing=False)
+
+    assert result == {'rows': 3, 'inserted': 2, 'updated': 0, 'skipped': 1}
+    assert Customer.find_by_phone('8015557000').name == 'Zed One'
+    assert Customer.query.count() == 2
+
+def test_repeated_number_is_skipped_when_updating_too(app):
+    result = bulk_import_customers(
+        rows(('Zed One', '801-555-7000'), ('Zed One dup', '8015557000')), map_simple_row)
+
+    assert result['inserted'] == 1 and result['skipped'] == 1
+    assert Customer.find_by_phone('8015557000').name == 'Zed One'
+
+def test_repeat_in_a_later_chunk_matches_the_stored_customer(app):
+    result = bulk_import_customers(
+        rows(('Zed One', '8015557000'), ('Zed One dup', '8015557000')),
+        map_simple_row, update_existing=False, chunk_size=1)
+
+    assert result == {'rows': 2, 'inserted': 1, 'updated': 0, 'skipped': 1}
+    assert Customer.find_by_phone('8015557000').name == 'Zed One'
@@ -0,0 +1,142 @@
+import threading
+import time
+import pytest
+from flask_jwt_extended import JWTManager
+from conftest import add_projects
+from config import Config
+from models import db
+from models.customer import Customer
+from models.user import User, Role
+from services.customer_autocomplete import CustomerPrefixIndex, PRUNE_INTERVAL
+from services.startup_service import ensure_schema, schema_objects
+from services.customer_service import migrate_customer_phones
+from services.token_service import create_user_token
+
+@pytest.fixture(autouse=True)
+def index_enabled(monkeypatch):
+    # The change log is only installed while the index is enabled
+    monkeypatch.setattr(Config, 'CUSTOMER_AUTOCOMPLETE_INDEX', True)
+
+def names(index, term):
+    return [hit['name'] for hit in index.search(term)]
+
+def other_process(sql, *params):
+    """Write behind this process's back, as another worker would."""
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql(sql, params)
+
+def test_sync_replays_inserts_edits_and_deletes_from_other_processes(app):
+    add_projects(2)
+    index = CustomerPrefixIndex(sync_seconds=3600)
+    index.build()
+    assert names(index, 'customer') == ['Customer 0', 'Customer 1']
+
+    other_process("UPDATE customer SET name = 'Quux Renamed' WHERE name = 'Customer 0'")
+    other_process("DELETE FROM customer WHERE name = 'Customer 1'")
+    other_process("INSERT INTO customer (name, phone, phone_e164) VALUES ('Quux New', '8015559999', '+18015559999')")
+    assert index.sync() == 0  # not due yet
+    assert index.sync(force=True) == 3
+
+    assert names(index, 'customer') == []
+    assert sorted(names(index, 'quux')) == ['Quux New', 'Quux Renamed']
+    assert index.stats()['customers'] == 2
+
+def test_sync_rebuilds_when_unseen_changes_were_pruned(app):
+    add_projects(1)
+    index = CustomerPrefixIndex()
+    index.build()
+    other_process("UPDATE customer SET name = 'Quux Renamed'")
+    other_process("DELETE FROM customer_changes")
+
+    index.sync(force=True)
+    assert names(index, 'quux') == ['Quux Renamed']
+
+def test_merged_customers_leave_the_index(app, monkeypatch):
+    index = CustomerPrefixIndex()
+    monkeypatch.setattr('services.customer_service.customer_index', index)
+    # Two numbers that only match once normalized, as in databases before phone_e164
+    other_process("DROP INDEX ix_customer_phone_e164")
+    other_process("INSERT INTO customer (name, phone) VALUES ('Quux First', '801-555-1234')")
+    other_process("INSERT INTO customer (name, phone, email) VALUES ('Quux Second', '8015551234', 'q@example.com')")
+    index.build()
+    assert len(names(index, 'quux')) == 2
+
+    assert migrate_customer_phones()['merged'] == 1
+    hits = index.search('quux')
+    assert [hit['name'] for hit in hits] == ['Quux First']
+    assert hits[0]['email'] == 'q@example.com'
+
+def test_deleting_a_customers_last_project_removes_them(app, client, monkeypatch, tmp_path):
+    index = CustomerPrefixIndex()
+    monkeypatch.setattr('routes.projects.customer_index', index)
+    monkeypatch.setattr(Config, 'EXPORT_DIR', str(tmp_path))
+    JWTManager(app)
+    user = User('admin', 'admin@example.com', role=Role.query.filter_by(name='admin').first())
+    user.set_password('pw')
+    db.session.add(user)
+    project = add_projects(1)[0]
+    db.session.query(Customer).update({'name': 'Quux Only'})
+    db.session.commit()
+    index.build()
+    assert names(index, 'quux') == ['Quux Only']
+
+    response = client.delete(f'/projects/{project.id}',
+                             headers={'Authorization': f'Bearer {create_user_token(user)}'})
+    assert response.status_code == 200
+    assert names(index, 'quux') == []
+
+def test_stats_do_not_wait_for_the_index_lock(app):
+    add_projects(3)
+    index = CustomerPrefixIndex()
+    index.build()
+    held, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        with index._lock:
+            held.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    held.wait(5)
+    try:
+        stats = index.stats()
+    finally:
+        release.set()
+        thread.join()
+    assert stats['customers'] == 3
+    assert stats['memory_bytes'] == stats['bytes_per_customer'] * 3 > 0
+
+def test_index_stats_require_login(app, client):
+    import app as app_module
+    from routes.auth import auth
+    app.register_blueprint(auth, url_prefix='/auth')
+    app.add_url_rule('/search-customers/index-stats', view_func=app_module.search_index_stats)
+    app_module.login_manager.init_app(app)
+
+    response = client.get('/search-customers/index-stats')
+    assert response.status_code == 302
+    assert '/auth/login' in response.headers['Location']
+
+def test_change_log_is_dropped_while_the_index_is_disabled(app):
+    assert 'customer_changes' in schema_objects()['table']
+    app.config['CUSTOMER_AUTOCOMPLETE_INDEX'] = False
+
+    assert 'drop_change_log' in ensure_schema()
+    objects = schema_objects()
+    assert 'customer_changes' not in objects['table']
+    assert not [name for name in objects['trigger'] if name.startswith('customer_changes')]
+    add_projects(1)  # customer writes no longer need the log
+
+def test_sync_prunes_old_changes(app):
+    add_projects(1)
+    index = CustomerPrefixIndex()
+    index.build()
+    other_process("INSERT INTO customer_changes (customer_id, changed_at) VALUES (1, datetime('now', '-2 days'))")
+    index._pruned_at = time.monotonic() - PRUNE_INTERVAL
+
+    index.sync(force=True)
+    with db.engine.connect() as conn:
+        old = conn.exec_driver_sql(
+            "SELECT COUNT(*) FROM customer_changes WHERE changed_at < datetime('now', '-1 day')").scalar()
+    assert old == 0
@@ -0,0 +1,75 @@
+import statistics
+import time
+
+from models import db
+from models.customer import Customer
+from services.customer_search import SEARCH_SQL, build_match_query, search_customers
+
+def names(term):
+    return [hit['name'] for hit in search_customers(term)]
+
+def add(name, phone, email=None):
+    customer = Customer(name=name, phone=phone, email=email)
+    db.session.add(customer)
+    db.session.commit()
+    return customer
+
+def test_triggers_keep_the_index_in_step_with_writes(app):
+    customer = add('Quinn Harlow', '801-555-0101', 'qh@example.com')
+    assert names('harl') == ['Quinn Harlow']
+
+    customer.name = 'Quinn Marsh'
+    customer.phone = '(385) 555-0199'
+    db.session.commit()
+    assert names('harl') == []
+    assert names('mars') == ['Quinn Marsh']
+    assert names('801555') == []
+    assert names('385555') == ['Quinn Marsh']
+
+    db.session.delete(customer)
+    db.session.commit()
+    assert names('quinn') == []
+    assert names('qh@') == []
+    with db.engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM customer_search WHERE customer_search MATCH 'quinn*'").scalar() == 0
+
+def test_phone_digit_prefixes_match_in_any_format(app):
+    add('Pat Phone', '+1 (801) 555-0142')
+    add('Raw Number', '555-0177')  # never normalized
+    for term in ('801555', '1801555', '(801) 555-01', '801.555.0142'):
+        assert names(term) == ['Pat Phone'], term
+    assert names('5550177') == ['Raw Number']
+    assert build_match_query('--') is None
+
+def test_ranking_puts_name_prefixes_first(app):
+    add('Mark Smithson', '8015550001')
+    add('Al Smith', '8015550002')
+    add('Smith Jones', '8015550003')
+    add('Dana Lee', '8015550004', 'smithy@example.com')
+    # Name prefix first, then email prefix, then word matches by name length
+    assert names('smith') == ['Smith Jones', 'Dana Lee', 'Al Smith', 'Mark Smithson']
+    assert names('al smi') == ['Al Smith']
+
+def test_lookups_stay_fast_on_a_large_table(app):
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql(
+            "WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < 49999) "
+            "INSERT INTO customer (name, phone, phone_e164, email) "
+            "SELECT 'Customer ' || i || ' Sm' || (i % 7), '801' || printf('%07d', i), "
+            "'+1801' || printf('%07d', i), 'c' || i || '@example.com' FROM n")
+        plan = [row[-1] for row in conn.exec_driver_sql(
+            'EXPLAIN QUERY PLAN ' + str(SEARCH_SQL.compile()),
+            {'query': 'x', 'prefix': 'x%', 'candidates': 200, 'limit': 10}).fetchall()]
+    # Candidates come from the FTS index and customers by primary key
+    assert any('VIRTUAL TABLE INDEX' in step for step in plan)
+    assert any(step.startswith('SEARCH c USING INTEGER PRIMARY KEY') for step in plan)
+    assert not any(step == 'SCAN c' or step.startswith('SCAN c ') for step in plan)
+
+    timings = []
+    for term in ('sm', 'cu', 'customer 12', '801', 'c4'):
+        for _ in range(5):
+            started = time.perf_counter()
+            assert search_customers(term)
+            timings.append(time.perf_counter() - started)
+    # Sub-millisecond on the reference machine; generous here for slow CI
+    assert statistics.median(timings) < 0.01
@@ -0,0 +1,36 @@
+import pytest
+
+from models import db
+from models.customer import Customer
+from services.customer_service import resolve_customer
+
+def test_new_number_creates_one_customer(app):
+    customer, created = resolve_customer('Ada', '(801) 555-0101', 'ada@example.com')
+    db.session.commit()
+    assert created
+    assert customer.phone_e164 == '+18015550101'
+
+    again, created = resolve_customer('Ada Lovelace', '801.555.0101')
+    db.session.commit()
+    assert not created and again.id == customer.id
+    assert again.name == 'Ada Lovelace' and again.email == 'ada@example.com'
+
+def test_number_created_concurrently_is_reused(app, monkeypatch):
+    def lookup_then_lose_the_race(phone):
+        # Another request commits the same number right after this one's lookup missed
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO customer (name, phone, phone_e164) VALUES ('First Request', '8015550102', '+18015550102')")
+        return None
+
+    monkeypatch.setattr(Customer, 'find_by_phone', staticmethod(lookup_then_lose_the_race))
+    customer, created = resolve_customer('Second Request', '801-555-0102', 'second@example.com')
+    db.session.commit()
+
+    assert not created
+    assert Customer.query.count() == 1
+    assert customer.name == 'Second Request' and customer.email == 'second@example.com'
+
+def test_unreadable_number_is_rejected(app):
+    with pytest.raises(ValueError):
+        resolve_customer('Nobody', '12')
@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+from services.email_service import EmailService
+
+def send(service, i):
+    return service.send_project_confirmation(f'c{i}@example.com', f'C{i}', '2024-05-01', '1 Main St')
+
+def test_sequential_sends_reuse_one_connection(sendgrid):
+    service = EmailService(api_key='test-key', api_url=sendgrid.url)
+    assert all(send(service, i) for i in range(10))
+    assert sendgrid.requests == 10
+    assert sendgrid.connections == 1
+    service.close()
+
+def test_concurrent_sends_stay_within_the_pool(sendgrid):
+    service = EmailService(api_key='test-key', api_url=sendgrid.url, pool_size=3)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        assert all(pool.map(lambda i: send(service, i), range(30)))
+    assert sendgrid.requests == 30
+    assert sendgrid.connections <= 3
+    service.close()
+
+def test_latency_is_recorded_per_call(sendgrid):
+    service = EmailService(api_key='test-key', api_url=sendgrid.url)
+    send(service, 0)
+    send(service, 1)
+    stats = service.latency_stats()
+    assert stats['calls'] == 2
+    assert stats['last_ms'] is not None
+    service.close()
@@ -0,0 +1,69 @@
+import csv
+import glob
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+from services.export_service import (
+    EXPORT_HEADER, _region_lock, append_project_change, export_path, export_regions,
+)
+from conftest import add_projects
+
+LEGACY_HEADER = EXPORT_HEADER[1:]
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+def hold_region_lock(filepath, held, release):
+    with _region_lock(filepath):
+        held.set()
+        release.wait(10)
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_append_waits_for_another_process_holding_the_lock(app, tmp_path):
+    project = add_projects(1)[0]
+    filepath = export_path('north', str(tmp_path))
+    ctx = multiprocessing.get_context('fork')
+    held, release = ctx.Event(), ctx.Event()
+    worker = ctx.Process(target=hold_region_lock, args=(filepath, held, release))
+    worker.start()
+    try:
+        assert held.wait(10)
+
+        def append():
+            with app.app_context():
+                append_project_change('north', 'created', project_id=project.id, export_dir=str(tmp_path))
+
+        appender = threading.Thread(target=append)
+        appender.start()
+        appender.join(0.5)
+        assert appender.is_alive()
+        assert not os.path.exists(filepath)
+    finally:
+        release.set()
+        worker.join(10)
+    appender.join(10)
+    assert not appender.is_alive()
+    rows = read_rows(filepath)
+    assert rows[0] == EXPORT_HEADER
+    assert [row[:2] for row in rows[1:]] == [['created', project.id]]
+
+def test_legacy_file_is_archived_before_compaction(app, tmp_path):
+    projects = add_projects(2)
+    filepath = export_path('north', str(tmp_path))
+    legacy_rows = [LEGACY_HEADER, ['old-1', 'Gone Customer'], ['old-1', 'Gone Customer, renamed']]
+    with open(filepath, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(legacy_rows)
+
+    assert append_project_change('north', 'created', project_id=projects[1].id, export_dir=str(tmp_path))
+
+    archives = glob.glob(str(tmp_path / 'legacy_projects_north_*.csv'))
+    assert len(archives) == 1
+    assert read_rows(archives[0]) == legacy_rows
+    rows = read_rows(filepath)
+    assert rows[0] == EXPORT_HEADER
+    assert sorted(row[1] for row in rows[1:]) == sorted(p.id for p in projects)
+    assert export_regions(str(tmp_path)) == ['north']
@@ -0,0 +1,77 @@
+import gzip
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from models import db
+from models.customer import Customer
+from models.project import Project
+from services.history_export import _arrow, export_history, partition_path
+
+ROWS_PER_DAY = 300
+FIRST_DAY = date(2024, 5, 1)
+
+def add_history(region, days):
+    """ROWS_PER_DAY projects updated on each of `days` consecutive days."""
+    customer = Customer(name=f'{region} customer', phone=f'801555{days:04d}', email=f'{region}@example.com')
+    db.session.add(customer)
+    db.session.flush()
+    rows = []
+    for d in range(days):
+        updated = datetime.combine(FIRST_DAY + timedelta(days=d), datetime.min.time())
+        for i in range(ROWS_PER_DAY):
+            rows.append({
+                'id': f'{region}-{d:03d}-{i:04d}',
+                'date': FIRST_DAY,
+                'address': f'{i} Main St, a reasonably long address line',
+                'region': region,
+                'customer_id': customer.id,
+                'work_type': 'sealing, striping',
+                'job_cost_type': 'labor',
+                'notes': 'x' * 200,
+                'created_at': updated,
+                'updated_at': updated + timedelta(seconds=i),
+            })
+    db.session.execute(db.insert(Project), rows)
+    db.session.commit()
+
+def peak_bytes(fn):
+    tracemalloc.start()
+    try:
+        result = fn()
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+@pytest.mark.parametrize('fmt', [
+    'ndjson',
+    pytest.param('parquet', marks=pytest.mark.skipif(_arrow()[0] is None, reason='needs pyarrow')),
+])
+def test_export_memory_is_bounded_by_one_day(app, tmp_path, fmt):
+    add_history('short', 2)
+    add_history('long', 20)
+    last_day = FIRST_DAY + timedelta(days=19)
+
+    def export(region):
+        return lambda: export_history(region, through=last_day, fmt=fmt,
+                                      export_dir=str(tmp_path), batch_size=100)
+
+    # Warm up imports and caches so they do not count against the first run
+    export_history('short', since=FIRST_DAY, through=FIRST_DAY, fmt=fmt, export_dir=str(tmp_path / 'warm'))
+    short, short_peak = peak_bytes(export('short'))
+    long, long_peak = peak_bytes(export('long'))
+
+    assert sum(short.values()) == 2 * ROWS_PER_DAY
+    assert sum(long.values()) == 20 * ROWS_PER_DAY
+    assert set(long.values()) == {ROWS_PER_DAY}
+    # Ten times the days, about the same peak: one day is held at a time
+    assert long_peak < short_peak * 1.5
+
+def test_ndjson_partition_holds_one_day(app, tmp_path):
+    add_history('north', 2)
+    export_history('north', through=FIRST_DAY + timedelta(days=1), fmt='ndjson', export_dir=str(tmp_path))
+    with gzip.open(partition_path('north', FIRST_DAY, 'ndjson', str(tmp_path)), 'rt') as f:
+        lines = f.readlines()
+    assert len(lines) == ROWS_PER_DAY
+    assert '"work_types":["sealing","striping"]' in lines[0]
@@ -0,0 +1,87 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db
+from models.customer import Customer
+from models.import_job import ImportJob
+from services.import_job_service import ImportJobRunner
+from services.startup_service import ensure_schema, schema_objects
+
+def test_rate_counts_only_rows_since_the_resume():
+    now = datetime.utcnow()
+    job = ImportJob(id='job', path='x.csv', status='running', total_rows=2000, rows_processed=900,
+                    started_at=now - timedelta(seconds=1000), resumed_at=now - timedelta(seconds=10),
+                    resumed_rows=800)
+    progress = job.to_dict()
+    # 100 rows in the 10 seconds since the resume, not 900 rows in 1000 seconds
+    assert 9 <= progress['rows_per_second'] <= 10
+    assert 110 <= progress['eta_seconds'] <= 125
+
+def test_resumed_run_records_its_starting_point(app, tmp_path):
+    path = tmp_path / 'upload.csv'
+    path.write_text('name,phone,email\n' + ''.join(f'C{i},801555{i:04d},\n' for i in range(5)))
+    runner = ImportJobRunner(app, upload_dir=str(tmp_path / 'uploads'))
+    started = datetime.utcnow() - timedelta(hours=1)
+    db.session.add(ImportJob(id='job', path=str(path), status='queued', rows_processed=3,
+                             started_at=started, heartbeat_at=started))
+    db.session.commit()
+
+    runner._process('job')
+    job = db.session.get(ImportJob, 'job')
+    assert job.status == 'completed'
+    assert job.resumed_rows == 3
+    assert job.resumed_at > started and job.started_at == started
+    assert Customer.query.count() == 2
+
+def test_resume_columns_are_added_to_existing_tables(app):
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('ALTER TABLE import_jobs DROP COLUMN resumed_at')
+        conn.exec_driver_sql('ALTER TABLE import_jobs DROP COLUMN resumed_rows')
+
+    assert 'add_columns' in ensure_schema()
+    assert 'resumed_rows' in schema_objects()['table']['import_jobs']
+
+def stalled_job(tmp_path, seconds_ago):
+    path = tmp_path / 'upload.csv'
+    path.write_text('name,phone,email\n')
+    heartbeat = datetime.utcnow() - timedelta(seconds=seconds_ago)
+    db.session.add(ImportJob(id='job', path=str(path), status='running', heartbeat_at=heartbeat))
+    db.session.commit()
+    return db.session.get(ImportJob, 'job')
+
+def test_resume_endpoint_accepts_a_stalled_running_job(app, client, tmp_path):
+    from routes.import_jobs import import_jobs
+    app.register_blueprint(import_jobs)
+    runner = ImportJobRunner(app, upload_dir=str(tmp_path / 'uploads'), stale_seconds=300)
+    submitted = []
+    runner.submit = submitted.append
+    stalled_job(tmp_path, 600)
+
+    response = client.post('/import-jobs/job/resume')
+    assert response.status_code == 202
+    assert response.get_json()['status'] == 'queued'
+    assert submitted == ['job']
+
+def test_resume_rejects_a_job_that_is_still_making_progress(app, tmp_path):
+    runner = ImportJobRunner(app, upload_dir=str(tmp_path / 'uploads'), stale_seconds=300)
+    job = stalled_job(tmp_path, 10)
+    with pytest.raises(ValueError):
+        runner.resume_job(job)
+
+def test_sweeper_picks_up_a_job_that_stalls_after_startup(app, tmp_path):
+    runner = ImportJobRunner(app, upload_dir=str(tmp_path / 'uploads'), stale_seconds=300, sweep_interval=0.05)
+    submitted = threading.Event()
+    runner.submit = lambda job_id: submitted.set()
+    stalled_job(tmp_path, 10)
+    try:
+        runner.start()
+        assert not submitted.is_set()
+        # The process running it dies; its heartbeat goes stale
+        ImportJob.query.update({'heartbeat_at': datetime.utcnow() - timedelta(seconds=600)})
+        db.session.commit()
+        assert submitted.wait(5)
+    finally:
+        runner.shutdown()
+    assert db.session.get(ImportJob, 'job').status == 'queued'
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from conftest import add_user, count_queries
+from models import db
+from models.user import User
+from services.password_service import PasswordVerifier, method_prefix, needs_rehash
+
+@pytest.fixture
+def client(auth_app):
+    return auth_app.test_client()
+
+def login(client, username='alice', password='pw'):
+    return client.post('/auth/login', data={'username': username, 'password': password})
+
+def test_needs_rehash_compares_against_the_configured_method():
+    assert not needs_rehash(generate_password_hash('pw', method='scrypt'), 'scrypt')
+    assert needs_rehash(generate_password_hash('pw', method='pbkdf2'), 'scrypt')
+    assert not needs_rehash(None, 'scrypt')
+
+def test_login_upgrades_an_outdated_hash(client):
+    user = add_user('alice')
+    user.password_hash = generate_password_hash('pw', method='pbkdf2')
+    db.session.commit()
+
+    assert login(client).status_code == 200
+    stored = db.session.get(User, user.id).password_hash
+    assert stored.startswith(method_prefix('scrypt') + '$')
+    assert check_password_hash(stored, 'pw')
+
+def test_current_hash_login_only_reads(client):
+    add_user('alice')
+    with count_queries() as statements:
+        assert login(client).status_code == 200
+    # The user, its role and its token version; no rehash write
+    assert len(statements) <= 3
+    assert all(statement.lstrip().upper().startswith('SELECT') for statement in statements)
+
+def test_wrong_password_is_rejected(client):
+    add_user('alice')
+    assert login(client, password='nope').status_code == 401
+
+def test_saturated_verifier_answers_503_without_waiting(client, monkeypatch):
+    add_user('alice')
+    verifier = PasswordVerifier(workers=1, queue_size=0, timeout=30)
+    monkeypatch.setattr('routes.auth.password_verifier', verifier)
+    # Every slot taken, as by logins still hashing
+    assert verifier._slots.acquire(blocking=False)
+    try:
+        started = time.perf_counter()
+        response = login(client)
+        elapsed = time.perf_counter() - started
+    finally:
+        verifier._slots.release()
+        verifier.shutdown()
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert elapsed < 1
+    assert verifier.stats()['rejected'] == 1
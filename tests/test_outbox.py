@@ -0,0 +1,43 @@
+from datetime import datetime
+from models import db
+from models.notification import NotificationOutbox
+from services.email_service import EmailService
+from services.outbox_service import LiveTransport, OutboxWorker
+
+def update_message():
+    message = NotificationOutbox.enqueue(
+        'project_update', customer_email='c@example.com', customer_name='C',
+        project_date='2024-05-01', address='1 Main St')
+    db.session.commit()
+    return message.id
+
+def live_worker(app, sendgrid):
+    transport = LiveTransport()
+    transport._email_service = EmailService(api_key='test-key', api_url=sendgrid.url)
+    return OutboxWorker(app, transport=transport, max_attempts=3, backoff_seconds=1)
+
+def test_rejected_email_is_retried_with_sendgrid_error(app, sendgrid):
+    worker = live_worker(app, sendgrid)
+    message_id = update_message()
+    sendgrid.status = 400
+    sendgrid.body = b'{"errors":[{"message":"Invalid from address"}]}'
+
+    worker.drain()
+    message = db.session.get(NotificationOutbox, message_id)
+    assert message.status == 'pending'
+    assert '400' in message.last_error and 'Invalid from address' in message.last_error
+
+    # Due again and accepted this time
+    sendgrid.status = 202
+    NotificationOutbox.query.filter_by(id=message_id).update({'next_attempt_at': datetime.utcnow()})
+    db.session.commit()
+    worker.drain()
+    message = db.session.get(NotificationOutbox, message_id)
+    assert message.status == 'sent'
+    assert message.last_error is None
+    assert sendgrid.requests == 2
+
+def test_email_service_keeps_returning_false_for_other_callers(sendgrid):
+    sendgrid.status = 500
+    service = EmailService(api_key='test-key', api_url=sendgrid.url)
+    assert service.send_project_update('c@example.com', 'C', '2024-05-01', '1 Main St') is False
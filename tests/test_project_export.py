@@ -0,0 +1,77 @@
+import csv
+import io
+import tracemalloc
+from datetime import date, timedelta
+
+from conftest import add_projects, count_queries
+from models import db
+from models.customer import Customer
+from models.project import Project
+from services.export_service import DOWNLOAD_HEADER
+
+def insert_projects(region, count):
+    """Bulk-insert count projects, all for one customer."""
+    customer = Customer(name=f'{region} customer', phone=f'801556{count % 10000:04d}', email=f'{region}@example.com')
+    db.session.add(customer)
+    db.session.flush()
+    db.session.execute(db.insert(Project), [
+        {
+            'id': f'{region}-{i:06d}',
+            'date': date(2024, 5, 1) + timedelta(days=i % 60),
+            'address': f'{i} Main St, a reasonably long address line',
+            'region': region,
+            'customer_id': customer.id,
+            'work_type': 'sealing, striping',
+            'job_cost_type': 'labor',
+            'notes': 'x' * 200,
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+def download(client, url):
+    """Read a streamed response chunk by chunk; returns (chunks, bytes, peak traced memory)."""
+    tracemalloc.start()
+    try:
+        response = client.get(url, buffered=False)
+        assert response.status_code == 200
+        chunks = size = 0
+        for chunk in response.response:
+            chunks += 1
+            size += len(chunk)
+        response.close()
+        return chunks, size, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def test_download_memory_does_not_grow_with_the_table(app, client):
+    insert_projects('small', 2_000)
+    insert_projects('large', 20_000)
+    download(client, '/projects/export?region=small')  # warm up imports and caches
+
+    _, small_size, small_peak = download(client, '/projects/export?region=small')
+    chunks, large_size, large_peak = download(client, '/projects/export?region=large')
+
+    assert large_size > small_size * 9
+    assert chunks >= 20  # sent a batch at a time, not as one body
+    # Ten times the rows, about the same peak: one batch is held at a time
+    assert large_peak < small_peak * 1.5
+
+def test_download_is_one_joined_query_with_filters(app, client):
+    projects = add_projects(3, region='north', day=date(2024, 5, 1))
+    add_projects(2, region='south', day=date(2024, 5, 1))
+    add_projects(1, region='north', day=date(2024, 7, 1))
+
+    with count_queries() as statements:
+        response = client.get('/projects/export?region=north&start=2024-05-01&end=2024-05-31')
+        body = response.get_data(as_text=True)
+    assert len(statements) == 1
+
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0] == DOWNLOAD_HEADER
+    assert sorted(row[0] for row in rows[1:]) == sorted(p.id for p in projects)
+    assert {row[1] for row in rows[1:]} == {p.customer.name for p in projects}
+
+def test_bad_filters_are_rejected(app, client):
+    assert client.get('/projects/export?start=yesterday').status_code == 400
+    assert client.get('/projects/export?format=xml').status_code == 400
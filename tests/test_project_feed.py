@@ -0,0 +1,66 @@
+import pytest
+
+from conftest import add_projects, count_queries
+
+def feed_query_count(client, region='north'):
+    with count_queries() as statements:
+        response = client.get(f'/projects/{region}')
+        assert response.status_code == 200
+        rows = response.get_json()
+    return rows, len(statements)
+
+def test_feed_query_count_does_not_grow_with_rows(client):
+    # Before the joined feed this was one query plus one customer load per row
+    add_projects(5)
+    rows, small = feed_query_count(client)
+    assert len(rows) == 5
+
+    add_projects(200)
+    rows, large = feed_query_count(client)
+    assert len(rows) == 205
+    assert large == small == 1
+
+def test_feed_rows_carry_customer_and_types(client):
+    add_projects(1, work_types=('sealing', 'coating'))
+    row = client.get('/projects/north').get_json()[0]
+    assert row['customer_name'] == 'Customer 0'
+    assert row['customer_phone'] == '8015550000'
+    assert row['work_type'] == ['sealing', 'coating']
+
+def test_feed_page_uses_one_query(client):
+    add_projects(30)
+    with count_queries() as statements:
+        response = client.get('/projects/north?limit=10')
+    assert len(response.get_json()) == 10
+    assert response.headers['X-Next-Cursor']
+    assert len(statements) == 1
+
+def failing_on(row_number, monkeypatch):
+    from services import project_feed
+    original = project_feed.feed_row_to_dict
+    seen = []
+
+    def convert(row):
+        seen.append(row)
+        if len(seen) == row_number:
+            raise RuntimeError('bad row')
+        return original(row)
+
+    monkeypatch.setattr(project_feed, 'feed_row_to_dict', convert)
+
+def test_feed_error_in_the_first_batch_is_a_500(client, monkeypatch):
+    add_projects(3)
+    failing_on(2, monkeypatch)
+    response = client.get('/projects/north')
+    assert response.status_code == 500
+    assert response.get_json() == {'error': 'bad row'}
+
+def test_feed_error_after_streaming_starts_is_not_a_complete_array(client, monkeypatch, caplog):
+    from services.project_feed import FEED_BATCH_SIZE
+    add_projects(FEED_BATCH_SIZE + 10)
+    failing_on(FEED_BATCH_SIZE + 5, monkeypatch)
+    response = client.get('/projects/north', buffered=False)
+    assert response.status_code == 200
+    with pytest.raises(RuntimeError):
+        b''.join(response.response)
+    assert 'Project feed failed after the response started' in caplog.text
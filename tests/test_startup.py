@@ -0,0 +1,64 @@
+from conftest import add_projects, count_queries
+from models import db
+from models.project_daily_stat import ProjectDailyStat
+from models.project_type import project_work_types, project_job_cost_types
+from services.analytics_service import get_type_counts
+from services.startup_service import ensure_schema, prepare_database, schema_objects
+
+def from_before_data_version():
+    """Mark the database as one whose data backfills have never run."""
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('PRAGMA user_version = 0')
+
+def test_missing_model_index_is_created_on_existing_table(app):
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('DROP INDEX ix_project_region_date_id')
+    assert 'ix_project_region_date_id' not in schema_objects()['index']
+
+    assert 'indexes' in ensure_schema()
+    assert 'ix_project_region_date_id' in schema_objects()['index']
+
+def test_current_schema_needs_no_steps(app):
+    assert ensure_schema() == []
+
+def test_type_associations_are_backfilled_for_upgraded_databases(app, client):
+    add_projects(1, work_types=('sealing', 'coating'))
+    # A database from before the type tables: comma-joined columns only
+    db.session.execute(project_work_types.delete())
+    db.session.execute(project_job_cost_types.delete())
+    db.session.commit()
+    from_before_data_version()
+    assert client.get('/projects/north?work_type=sealing').get_json() == []
+
+    assert 'project_types' in ensure_schema()
+    assert len(client.get('/projects/north?work_type=sealing').get_json()) == 1
+    assert ensure_schema() == []
+
+def test_single_project_types_keep_submitted_order(client):
+    project = add_projects(1, work_types=('sealing', 'coating'))[0]
+    feed = client.get('/projects/north').get_json()[0]
+    single = client.get(f'/projects/north/{project.id}').get_json()
+    assert single['work_type'] == feed['work_type'] == ['sealing', 'coating']
+
+def test_empty_rollup_is_rebuilt_after_type_backfill(app):
+    add_projects(3, region='North', work_types=('sealing',))
+    # Upgraded database: no associations and no rollup rows yet
+    db.session.execute(project_work_types.delete())
+    db.session.execute(project_job_cost_types.delete())
+    ProjectDailyStat.query.delete()
+    db.session.commit()
+    from_before_data_version()
+
+    steps = ensure_schema()
+    assert steps.index('project_types') < steps.index('daily_stats')
+    counts = get_type_counts('2024-01-01', '2024-12-31')['north']['work_type']
+    assert dict(zip(counts['labels'], counts['values'])) == {'sealing': 3}
+
+def test_warm_start_skips_row_level_checks(app, tmp_path):
+    add_projects(2)
+    with count_queries() as statements:
+        prepare_database(str(tmp_path))  # no seed file here
+    # sqlite_master with the data version, then the roles
+    assert len(statements) == 2
+    assert 'sqlite_master' in statements[0]
+    assert not any('project' in statement for statement in statements)
@@ -0,0 +1,98 @@
+import os
+import tracemalloc
+
+import pytest
+
+import app as app_module
+from models.customer import Customer
+from routes.import_jobs import import_jobs
+from services.import_job_service import ImportJobRunner
+from services.csv_service import bulk_import_customers, iter_upload_rows, map_simple_row
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('name,phone,email\n')
+        for i in range(rows):
+            f.write(f'Customer {i},+1801{i:07d},customer{i}@example.com\n')
+    return path
+
+def peak_bytes(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def test_upload_rows_are_decoded_in_bounded_memory(tmp_path):
+    path = write_csv(tmp_path / 'big.csv', 100_000)
+    size = path.stat().st_size
+
+    def read_all():
+        with open(path, 'rb') as stream:
+            assert sum(1 for _ in iter_upload_rows(stream)) == 100_000
+
+    peak = peak_bytes(read_all)
+    # The file is ~4.5 MB; only one decode buffer and one row are held
+    assert size > 4_000_000
+    assert peak < 1_000_000
+
+def test_import_memory_does_not_grow_with_upload_size(app, tmp_path):
+    small = write_csv(tmp_path / 'small.csv', 1_000)
+    large = write_csv(tmp_path / 'large.csv', 10_000)
+
+    def import_file(path):
+        def run():
+            with open(path, 'rb') as stream:
+                bulk_import_customers(iter_upload_rows(stream), map_simple_row, chunk_size=500)
+        return run
+
+    small_peak = peak_bytes(import_file(small))
+    Customer.query.delete()
+    large_peak = peak_bytes(import_file(large))
+    assert Customer.query.count() == 10_000
+    # Ten times the rows, about the same peak: one chunk is held at a time
+    assert large_peak < small_peak * 1.5
+
+def memory_status(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+
+def peak_rss_growth(fn):
+    """Rise of the process's peak resident memory (VmHWM) above its RSS before fn."""
+    # Writing 5 resets the kernel's peak RSS counter to the current RSS
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+    start = memory_status('VmRSS')
+    fn()
+    return memory_status('VmHWM') - start
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/clear_refs'), reason='reads peak RSS from /proc')
+def test_large_upload_is_spooled_to_disk_not_memory(app, tmp_path):
+    app.register_blueprint(import_jobs)
+    app.add_url_rule('/import-customers', view_func=app_module.import_customers, methods=['POST'])
+    runner = ImportJobRunner(app, upload_dir=str(tmp_path / 'uploads'))
+    runner.submit = lambda job_id: None  # only the upload is measured here
+
+    path = tmp_path / 'huge.csv'
+    line = b'A Customer With A Longish Name,+18015550100,someone@example.com\n'
+    block = line * (1 << 14)
+    with open(path, 'wb') as f:
+        f.write(b'name,phone,email\n')
+        while f.tell() < 256 << 20:
+            f.write(block)
+    size = path.stat().st_size
+
+    def upload():
+        with open(path, 'rb') as stream:
+            response = app.test_client().post('/import-customers', data={'file': (stream, 'huge.csv')},
+                                              content_type='multipart/form-data')
+        assert response.status_code == 202, response.get_data(as_text=True)
+        saved = os.path.join(runner.upload_dir, f"{response.get_json()['job_id']}.csv")
+        assert os.path.getsize(saved) == size
+
+    growth = peak_rss_growth(upload)
+    # 256 MB in and out of spooled temporary files; held in memory it would be hundreds of MB
+    assert growth < 32 << 20
@@ -0,0 +1,44 @@
+import pytest
+from flask import g, jsonify
+from flask_login import current_user, login_required
+
+from conftest import add_user, count_queries
+from services.token_service import create_user_token
+
+@pytest.fixture
+def client(auth_app):
+    @login_required
+    def page():
+        return jsonify(role=current_user.role.name if current_user.role else None)
+
+    auth_app.add_url_rule('/page', view_func=page)
+    return auth_app.test_client()
+
+def get_page(client):
+    # The app fixture keeps one app context (and so one g) across requests;
+    # drop flask-login's per-request user so each request loads it again
+    g.pop('_login_user', None)
+    return client.get('/page')
+
+def test_session_pages_load_the_user_from_the_cache(client):
+    add_user('alice')
+    assert client.post('/auth/login', data={'username': 'alice', 'password': 'pw'}).status_code == 200
+    get_page(client)
+
+    with count_queries() as statements:
+        for _ in range(5):
+            assert get_page(client).get_json() == {'role': 'viewer'}
+    assert statements == []
+
+def test_role_change_and_delete_reach_the_next_page_load(client):
+    admin = {'Authorization': f"Bearer {create_user_token(add_user('admin', role='admin'))}"}
+    user = add_user('alice')
+    client.post('/auth/login', data={'username': 'alice', 'password': 'pw'})
+    assert get_page(client).get_json() == {'role': 'viewer'}
+
+    response = client.put(f'/auth/user/{user.id}/role', json={'role': 'project_manager'}, headers=admin)
+    assert response.status_code == 200
+    assert get_page(client).get_json() == {'role': 'project_manager'}
+
+    assert client.delete(f'/auth/user/{user.id}', headers=admin).status_code == 200
+    assert get_page(client).status_code == 302  # back to the login page
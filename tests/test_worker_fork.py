@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import app as app_module
+from config import Config
+from services.email_service import get_email_service, reset_email_service
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def send(service):
+    return service.send_project_confirmation('c@example.com', 'C', '2024-05-01', '1 Main St')
+
+def test_importing_app_starts_no_threads():
+    result = subprocess.run(
+        [sys.executable, '-c', 'import threading, app; print(threading.active_count())'],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == '1'
+
+def test_after_fork_drops_the_parents_email_client(app, sendgrid, monkeypatch):
+    monkeypatch.setenv('SENDGRID_API_KEY', 'test-key')
+    monkeypatch.setattr(Config, 'SENDGRID_API_URL', sendgrid.url)
+    monkeypatch.setattr(app_module, 'start_background_services', lambda app, scheduler=True: None)
+    reset_email_service()
+    try:
+        parent = get_email_service()
+        assert send(parent)
+
+        app_module.after_fork(app)
+
+        worker = get_email_service()
+        assert worker is not parent
+        # The parent's pooled connection was left open for the parent
+        assert send(parent)
+        assert sendgrid.connections == 1
+        assert send(worker)
+        assert sendgrid.connections == 2
+        parent.close()
+    finally:
+        reset_email_service()
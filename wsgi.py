@@ -0,0 +1,7 @@
+import os
+from app import create_app
+
+# Entry point for WSGI servers: `gunicorn -c gunicorn.conf.py wsgi:app`.
+# gunicorn.conf.py sets APP_DEFER_BACKGROUND so a preloading master builds
+# the app without starting threads; each worker starts its own after fork.
+app = create_app(start_background=os.environ.get('APP_DEFER_BACKGROUND') != '1')